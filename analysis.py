@@ -0,0 +1,954 @@
+import os
+import json
+from flask import Blueprint, request, jsonify
+from extraction import content_hash
+from sse import sse_event, sse_response
+from json_stream import JsonFieldParser
+from llm import LazyModule
+from local_ats import score_resume
+from skills import SkillMatcher, load_taxonomy, skills_html
+from batch import rank_pairs, fan_out
+from jobs import QueueFull
+from resume_model import parse_resume
+from metrics import record_error, timed
+from governance import UpstreamUnavailable, upstream_priority
+from documents import json_object
+from services import document_store, job_queue, llm, resume_from_upload
+
+# --- Analysis Routes ---
+# Resume rewrites, cover letters, skill gap and ATS scoring, batch ranking, the full
+# analysis pipeline and their background-job variants.
+
+bp = Blueprint('analysis', __name__)
+
+# The SDK's types module is the slowest import in the app; it is loaded on the first Gemini call
+types = LazyModule('google.genai.types')
+
+@timed('prompt')
+def build_rewrite_prompt(job_description, resume_text):
+    """Builds the system instruction and user content for a resume rewrite."""
+    # Powerful prompt instruction for the model
+    system_instruction = (
+        "You are an expert HR and professional resume writer. "
+        "Your task is to rewrite the provided 'Existing Resume' to perfectly match "
+        "the 'Job Description'. Use existing content that is suitable. "
+        "If any required skills or projects are missing for the job role, seamlessly add them based on common job requirements. "
+        "Rephrase and reformat content to highlight keywords and relevance. "
+        "Use bullet points and proper professional sections. "
+        "Heading (like project names, technical skills, education, certification, and awards) should be in **bold and uppercase**."
+        "The output must be the full, complete, and rewritten resume text, formatted clearly with Markdown. "
+        "DO NOT include any introductory dialogue or surrounding text—only the resume. "
+        "DO NOT use # symbols for headings - use **bold** formatting instead. "
+        "DO NOT use --- separators anywhere in the resume. "
+        "The resume can be longer than one page if necessary."
+    )
+    
+    # Combine user inputs into the main prompt content
+    user_content = (
+        f"Job Description:\n---\n{job_description}\n---\n\n"
+        f"Existing Resume:\n---\n{resume_text}\n---\n\n"
+        "REWRITTEN PROFESSIONAL RESUME:"
+    )
+    return system_instruction, user_content
+
+def generate_rewritten_resume(job_description, resume_text, routing=None):
+    """Calls the Gemini API to rewrite the resume. Fills `routing`, if given, with the model used."""
+    if not llm.client:
+        return "Gemini API Error: Client not initialized."
+
+    system_instruction, user_content = build_rewrite_prompt(job_description, resume_text)
+    
+    try:
+        response = llm.generate_content(
+            model='gemini-2.5-pro',
+            contents=user_content,
+            config=types.GenerateContentConfig(
+                system_instruction=system_instruction,
+                temperature=0.6,
+            ),
+            cache_namespace='rewrite_resume',
+        )
+        if routing is not None:
+            routing.update(response.routing)
+        return response.text
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
+        record_error('rewrite_resume', e)
+        return f"Gemini API Error: {e}"
+
+def stream_rewritten_resume(job_description, resume_text, routing=None):
+    """Streams the rewritten resume from the Gemini API as text chunks. Fills `routing`, if given, with the model used."""
+    system_instruction, user_content = build_rewrite_prompt(job_description, resume_text)
+    for chunk in llm.generate_content_stream(
+        model='gemini-2.5-pro',
+        contents=user_content,
+        config=types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            temperature=0.6,
+        ),
+        task='rewrite_resume',
+        routing=routing,
+    ):
+        if chunk.text:
+            yield chunk.text
+
+@timed('prompt')
+def build_cover_letter_prompt(job_description, resume_text, template_style="professional"):
+    """Builds the system instruction and user content for a cover letter."""
+    # Define different template styles
+    template_instructions = {
+        "professional": (
+            "Write a professional, formal cover letter with clear structure including: "
+            "proper business letter format with date, recipient address, greeting, "
+            "3-4 paragraphs (introduction, body with specific examples, closing), "
+            "and professional sign-off."
+        ),
+        "modern": (
+            "Write a modern, engaging cover letter that stands out while remaining professional. "
+            "Use a more conversational tone, include specific achievements with metrics, "
+            "and demonstrate passion for the role. Structure: compelling opening, "
+            "2-3 body paragraphs with concrete examples, and strong closing."
+        ),
+        "creative": (
+            "Write a creative cover letter that showcases personality while maintaining professionalism. "
+            "Use storytelling elements, include unique angles about why you're perfect for the role, "
+            "and demonstrate creativity in presentation. Structure: hook opening, "
+            "narrative body with examples, memorable closing."
+        ),
+        "executive": (
+            "Write an executive-level cover letter with strategic focus and leadership emphasis. "
+            "Highlight vision, strategic thinking, and high-level achievements. "
+            "Use confident language and focus on business impact. Structure: "
+            "executive summary opening, strategic body paragraphs, leadership-focused closing."
+        )
+    }
+    
+    template_prompt = template_instructions.get(template_style, template_instructions["professional"])
+    
+    # Powerful prompt instruction for the model
+    system_instruction = (
+        f"You are an expert professional cover letter writer. "
+        f"{template_prompt} "
+        "Extract relevant information from both the job description and resume to create a compelling cover letter. "
+        "Use specific examples from the resume that match job requirements. "
+        "Address the hiring manager directly and demonstrate knowledge of the company/role. "
+        "The output must be the complete cover letter text, properly formatted. "
+        "DO NOT include any introductory dialogue or surrounding text—only the cover letter. "
+        "Use proper business letter formatting with appropriate spacing and structure."
+    )
+    
+    # Combine user inputs into the main prompt content
+    user_content = (
+        f"Job Description:\n---\n{job_description}\n---\n\n"
+        f"Resume Information:\n---\n{resume_text}\n---\n\n"
+        "PROFESSIONAL COVER LETTER:"
+    )
+    return system_instruction, user_content
+
+def generate_cover_letter(job_description, resume_text, template_style="professional", routing=None):
+    """Calls the Gemini API to generate a cover letter. Fills `routing`, if given, with the model used."""
+    if not llm.client:
+        return "Gemini API Error: Client not initialized."
+
+    system_instruction, user_content = build_cover_letter_prompt(job_description, resume_text, template_style)
+    
+    try:
+        response = llm.generate_content(
+            model='gemini-2.5-pro',
+            contents=user_content,
+            config=types.GenerateContentConfig(
+                system_instruction=system_instruction,
+                temperature=0.7,
+            ),
+            cache_namespace='cover_letter',
+        )
+        if routing is not None:
+            routing.update(response.routing)
+        return response.text
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
+        record_error('cover_letter', e)
+        return f"Gemini API Error: {e}"
+
+def stream_cover_letter(job_description, resume_text, template_style="professional", routing=None):
+    """Streams the cover letter from the Gemini API as text chunks. Fills `routing`, if given, with the model used."""
+    system_instruction, user_content = build_cover_letter_prompt(job_description, resume_text, template_style)
+    for chunk in llm.generate_content_stream(
+        model='gemini-2.5-pro',
+        contents=user_content,
+        config=types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            temperature=0.7,
+        ),
+        task='cover_letter',
+        routing=routing,
+    ):
+        if chunk.text:
+            yield chunk.text
+
+def stream_document_events(chunks, result_key, meta=None, routing=None):
+    """Turns a stream of generated text chunks into SSE frames: meta, chunk..., done (or error).
+
+    `routing` is the dict the stream fills in; it is sent with the done event.
+    """
+    if meta:
+        yield sse_event('meta', meta)
+    parts = []
+    try:
+        for text in chunks:
+            parts.append(text)
+            yield sse_event('chunk', {'text': text})
+    except Exception as e:
+        print(f"Gemini Streaming Error: {e}")
+        record_error('gemini_stream', e)
+        yield sse_event('error', {'error': f"Gemini API Error: {e}", **retry_fields(e)})
+        return
+    done = {result_key: "".join(parts)}
+    if routing is not None:
+        done['routing'] = routing
+    yield sse_event('done', done)
+
+def stream_field_events(chunks, error_label, routing=None):
+    """Turns a stream of structured-output JSON chunks into SSE frames: field..., done (or error).
+
+    Each top-level field is sent as {'name', 'value'} as soon as its value is complete; done
+    carries the whole object, as the non-streamed endpoint would have returned it.
+    """
+    parser = JsonFieldParser()
+    try:
+        for text in chunks:
+            for name, value in parser.feed(text):
+                yield sse_event('field', {'name': name, 'value': value})
+        result = parser.result()
+    except Exception as e:
+        print(f"Gemini Streaming Error: {e}")
+        record_error('gemini_stream', e)
+        yield sse_event('error', {'error': f"{error_label}: {e}", **retry_fields(e)})
+        return
+    if routing is not None:
+        result['routing'] = routing
+    yield sse_event('done', result)
+
+def retry_fields(error):
+    """Extra fields for an SSE error event: when Gemini was unavailable, how long to wait before retrying."""
+    return {'retry_after': error.retry_after} if isinstance(error, UpstreamUnavailable) else {}
+
+@bp.route('/rewrite_resume', methods=['POST'])
+def rewrite_resume():
+    """Handles the form submission and Gemini API call."""
+    if 'resume' not in request.files or 'job_description' not in request.form:
+        return jsonify({'error': 'Missing file or job description'}), 400
+
+    job_description = request.form['job_description']
+
+    # 1. Extract text from the uploaded PDF
+    resume_text = resume_from_upload(request.files['resume'])
+
+    # 2. Call Gemini
+    routing = {}
+    rewritten_text = generate_rewritten_resume(job_description, resume_text, routing)
+
+    # 3. Return result
+    if rewritten_text.startswith("Gemini API Error:"):
+         return jsonify({'error': rewritten_text}), 500
+
+    return jsonify({
+        'rewritten_resume': rewritten_text,
+        'original_resume': resume_text,
+        'resume_id': document_store.put(resume_text, 'resume'),
+        'routing': routing,
+    })
+
+@bp.route('/rewrite_resume_stream', methods=['POST'])
+def rewrite_resume_stream():
+    """Streaming variant of /rewrite_resume that sends the rewritten resume as Server-Sent Events."""
+    if not llm.client:
+        return jsonify({'error': 'Gemini Client not initialized.'}), 500
+
+    if 'resume' not in request.files or 'job_description' not in request.form:
+        return jsonify({'error': 'Missing file or job description'}), 400
+
+    job_description = request.form['job_description']
+    # Extraction errors are still reported as plain JSON; only generation is streamed
+    resume_text = resume_from_upload(request.files['resume'])
+
+    routing = {}
+    return sse_response(stream_document_events(
+        stream_rewritten_resume(job_description, resume_text, routing),
+        'rewritten_resume',
+        meta={'original_resume': resume_text, 'resume_id': document_store.put(resume_text, 'resume')},
+        routing=routing,
+    ))
+
+@bp.route('/generate_cover_letter', methods=['POST'])
+def generate_cover_letter_endpoint():
+    """Handles cover letter generation based on job description and resume text."""
+    body = json_object(request.get_json(silent=True))
+    # Either text can be sent inline or as the id returned by an upload / POST /documents
+    job_description = document_store.resolve(body, 'job_description', 'job_description_id')
+    resume_text = document_store.resolve(body, 'resume_text', 'resume_id')
+    template_style = body.get('template_style', 'professional')
+
+    if job_description is None or resume_text is None:
+        return jsonify({'error': 'Missing job description or resume text in JSON body'}), 400
+
+    if not job_description or not resume_text:
+        return jsonify({'error': 'Job description and resume text cannot be empty'}), 400
+
+    # Call Gemini to generate cover letter
+    routing = {}
+    cover_letter_text = generate_cover_letter(job_description, resume_text, template_style, routing)
+    
+    if cover_letter_text.startswith("Gemini API Error:"):
+        return jsonify({'error': cover_letter_text}), 500
+        
+    return jsonify({'cover_letter': cover_letter_text, 'routing': routing})
+
+@bp.route('/generate_cover_letter_stream', methods=['POST'])
+def generate_cover_letter_stream():
+    """Streaming variant of /generate_cover_letter that sends the letter as Server-Sent Events."""
+    if not llm.client:
+        return jsonify({'error': 'Gemini Client not initialized.'}), 500
+
+    body = json_object(request.get_json(silent=True))
+    # Either text can be sent inline or as the id returned by an upload / POST /documents
+    job_description = document_store.resolve(body, 'job_description', 'job_description_id')
+    resume_text = document_store.resolve(body, 'resume_text', 'resume_id')
+    template_style = body.get('template_style', 'professional')
+
+    if job_description is None or resume_text is None:
+        return jsonify({'error': 'Missing job description or resume text in JSON body'}), 400
+
+    if not job_description or not resume_text:
+        return jsonify({'error': 'Job description and resume text cannot be empty'}), 400
+
+    routing = {}
+    return sse_response(stream_document_events(
+        stream_cover_letter(job_description, resume_text, template_style, routing),
+        'cover_letter',
+        routing=routing,
+    ))
+
+# --- SKILL GAP ROUTE ---
+SKILL_GAP_MODES = ('local', 'llm', 'hybrid', 'stream')
+SKILL_GAP_DEFAULT_MODE = os.getenv('SKILL_GAP_DEFAULT_MODE', 'llm')
+# The narrative prompt only needs enough of the JD to know the role and seniority
+SKILL_GAP_JD_EXCERPT_CHARS = 2000
+
+# Compiled once per worker; extend the bundled taxonomy with SKILL_TAXONOMY_EXTRA
+skill_matcher = SkillMatcher(load_taxonomy(extra_path=os.getenv('SKILL_TAXONOMY_EXTRA') or None))
+
+def skill_gap_request(job_description, resume_text):
+    """Returns the prompt and config of the skill gap request, shared by the plain and streamed calls."""
+    # 1. Define the Skill Gap Analysis Prompt
+    system_instruction = (
+        "You are an expert career advisor and skills analyst. "
+        "Your task is to analyze the given resume against the job description to identify: "
+        "1. Skills that match between the resume and job requirements "
+        "2. Missing skills and areas for improvement "
+        "Your output MUST be a single JSON object that strictly conforms to the provided schema."
+    )
+
+    prompt = f"""
+    Job Description:\n---\n{job_description}\n---\n
+    Resume:\n---\n{resume_text}\n---\n
+    
+    Analyze the resume against the job description and provide:
+    1. A comprehensive list of matching skills (technical skills, soft skills, tools, technologies, etc.)
+    2. Missing skills and areas for improvement that would make the candidate more suitable for this role
+    
+    Focus on specific, actionable insights that help the candidate understand their skill alignment.
+    """
+
+    # 2. Define the JSON Response Schema
+    response_schema = types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "matching_skills": types.Schema(
+                type=types.Type.STRING, 
+                description="HTML formatted list of skills that match between resume and job description. Use bullet points and highlight key matches."
+            ),
+            "improvements": types.Schema(
+                type=types.Type.STRING, 
+                description="HTML formatted list of missing skills and areas for improvement. Use bullet points and be specific about what's needed."
+            ),
+        },
+        required=["matching_skills", "improvements"],
+        property_ordering=["matching_skills", "improvements"],
+    )
+
+    return prompt, types.GenerateContentConfig(
+        system_instruction=system_instruction,
+        response_mime_type="application/json",
+        response_schema=response_schema,
+        temperature=0.3 # Keep it focused and analytical
+    )
+
+def generate_skill_gap_analysis(job_description, resume_text):
+    """Asks Gemini for matching skills and improvements and returns them as a dict. Raises on failure."""
+    prompt, config = skill_gap_request(job_description, resume_text)
+    gemini_response = llm.generate_content(
+        model='gemini-2.5-pro',
+        contents=prompt,
+        config=config,
+        cache_namespace='skill_gap',
+    )
+
+    # The response text is a JSON string, parse it
+    analysis = json.loads(gemini_response.text)
+    analysis['routing'] = gemini_response.routing
+    return analysis
+
+def stream_skill_gap_analysis(job_description, resume_text, routing=None):
+    """Streams the skill gap JSON from the Gemini API as text chunks. Fills `routing`, if given, with the model used."""
+    prompt, config = skill_gap_request(job_description, resume_text)
+    for chunk in llm.generate_content_stream(
+        model='gemini-2.5-pro',
+        contents=prompt,
+        config=config,
+        task='skill_gap',
+        routing=routing,
+    ):
+        if chunk.text:
+            yield chunk.text
+
+def local_skill_gap(job_description, resume_text):
+    """Computes matched and missing skills from the taxonomy without calling Gemini."""
+    gap = skill_matcher.skill_gap(job_description, resume_text)
+    return {
+        'matching_skills': skills_html(skill_matcher, gap['matched'], 'No taxonomy skills from the job description were found in the resume.'),
+        'improvements': skills_html(skill_matcher, gap['missing'], 'Your resume already covers every listed skill we recognise.'),
+        'matched': gap['matched'],
+        'missing': gap['missing'],
+        'additional': gap['additional'],
+        'mode': 'local',
+    }
+
+def generate_gap_narrative(job_description, local_gap):
+    """Asks Gemini only for improvement advice over a precomputed skill gap. Raises on failure."""
+    system_instruction = (
+        "You are an expert career advisor and skills analyst. "
+        "The skills that match and the skills that are missing have already been computed. "
+        "Your task is to explain, for the missing skills, how the candidate can close each gap "
+        "or better present related experience. "
+        "Your output MUST be a single JSON object that strictly conforms to the provided schema."
+    )
+
+    # Only the role context and the computed gap are sent, not the full resume
+    prompt = f"""
+    Job Description (excerpt):\n---\n{job_description[:SKILL_GAP_JD_EXCERPT_CHARS]}\n---\n
+    Matching skills: {', '.join(local_gap['matched']) or 'none'}
+    Missing skills: {', '.join(local_gap['missing']) or 'none'}
+    Other skills on the resume: {', '.join(local_gap['additional']) or 'none'}
+
+    Provide specific, actionable improvements for the missing skills and any other gaps implied by the job description.
+    """
+
+    response_schema = types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "improvements": types.Schema(
+                type=types.Type.STRING,
+                description="HTML formatted list of missing skills and areas for improvement. Use bullet points and be specific about what's needed."
+            ),
+        },
+        required=["improvements"]
+    )
+
+    gemini_response = llm.generate_content(
+        model='gemini-2.5-pro',
+        contents=prompt,
+        config=types.GenerateContentConfig(
+            system_instruction=system_instruction,
+            response_mime_type="application/json",
+            response_schema=response_schema,
+            temperature=0.3
+        ),
+        cache_namespace='skill_gap',
+        task='skill_gap_narrative',
+    )
+    narrative = json.loads(gemini_response.text)
+    narrative['routing'] = gemini_response.routing
+    return narrative
+
+def hybrid_skill_gap_events(job_description, local_gap):
+    """Sends the computed skill gap immediately, then the Gemini improvement narrative."""
+    yield sse_event('local', local_gap)
+    try:
+        yield sse_event('llm', generate_gap_narrative(job_description, local_gap))
+    except Exception as e:
+        print(f"Skill Gap Analysis API Error: {e}")
+        record_error('skill_gap', e)
+        yield sse_event('error', {'error': f"Failed to analyze skill gaps: {e}", **retry_fields(e)})
+
+@bp.route('/analyze_skill_gap', methods=['POST'])
+def analyze_skill_gap():
+    """Analyzes skill gaps between resume and job description.
+
+    mode=llm asks Gemini for the full analysis, mode=local matches skills against the bundled
+    taxonomy, mode=hybrid streams the local gap first and a Gemini narrative over it after, and
+    mode=stream streams the Gemini analysis field by field as it is generated.
+    """
+    body = json_object(request.get_json(silent=True))
+    job_description = document_store.resolve(body, 'job_description', 'job_description_id')
+    resume_text = document_store.resolve(body, 'resume_text', 'resume_id')
+    mode = body.get('mode') or request.args.get('mode') or SKILL_GAP_DEFAULT_MODE
+
+    if job_description is None or resume_text is None:
+        return jsonify({'error': 'Missing job description or resume text in JSON body'}), 400
+
+    if not job_description or not resume_text:
+        return jsonify({'error': 'Job description and resume text cannot be empty'}), 400
+
+    if mode not in SKILL_GAP_MODES:
+        return jsonify({'error': f"Invalid mode '{mode}'. Use one of: {', '.join(SKILL_GAP_MODES)}."}), 400
+
+    if mode == 'local':
+        return jsonify(local_skill_gap(job_description, resume_text))
+
+    if not llm.client:
+        return jsonify({'error': 'Gemini Client not initialized.'}), 500
+
+    if mode == 'hybrid':
+        return sse_response(hybrid_skill_gap_events(job_description, local_skill_gap(job_description, resume_text)))
+
+    if mode == 'stream':
+        routing = {}
+        return sse_response(stream_field_events(
+            stream_skill_gap_analysis(job_description, resume_text, routing),
+            'Failed to analyze skill gaps',
+            routing=routing,
+        ))
+
+    try:
+        return jsonify(generate_skill_gap_analysis(job_description, resume_text))
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
+        print(f"Skill Gap Analysis API Error: {e}")
+        record_error('skill_gap', e)
+        return jsonify({'error': f"Failed to analyze skill gaps: {e}"}), 500
+
+# --- ATS SCORING ROUTE ---
+ATS_SCORE_MODES = ('local', 'llm', 'hybrid', 'stream')
+# 'llm' keeps the original Gemini-only behaviour for clients that do not send a mode
+ATS_SCORE_DEFAULT_MODE = os.getenv('ATS_SCORE_DEFAULT_MODE', 'llm')
+
+def ats_scorecard_request(original_resume):
+    """Returns the prompt and config of the ATS scorecard request, shared by the plain and streamed calls."""
+    # 1. Define the General ATS Score Prompt
+    system_instruction = (
+        "You are an expert ATS (Applicant Tracking System) analyst and Senior Recruiter. "
+        "Your task is to evaluate the given resume for general ATS compatibility and overall quality. "
+        "Provide a numerical score out of 100 that represents the likelihood this resume will pass ATS screening for most job applications. "
+        "Focus on technical formatting, keyword optimization, structure, and overall professional presentation. "
+        "Your output MUST be a single JSON object that strictly conforms to the provided schema."
+    )
+
+    prompt = f"""
+    Resume to Analyze:\n---\n{original_resume}\n---\n
+    
+    Analyze this resume for general ATS compatibility. Consider:
+    - Technical formatting (proper headers, consistent structure, clean layout)
+    - Keyword optimization and industry-relevant terms
+    - Contact information completeness
+    - Professional summary quality
+    - Skills section organization
+    - Work experience formatting and detail
+    - Education section completeness
+    - Overall readability and ATS-friendly formatting
+    - Length appropriateness (not too short, not too long)
+    - Action verbs and quantified achievements
+    
+    Generate a score that reflects how well this resume would perform across various job applications and ATS systems.
+    """
+
+    # 2. Define the JSON Response Schema (Structured Output)
+    response_schema = types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "ats_score": types.Schema(type=types.Type.INTEGER, description="The general ATS compatibility score out of 100. Must be between 0 and 100."),
+            "strengths": types.Schema(type=types.Type.STRING, description="List 3-5 key strengths of the resume that make it ATS-friendly."),
+            "improvements": types.Schema(type=types.Type.STRING, description="List 3-5 specific areas for improvement to increase ATS compatibility."),
+            "overall_assessment": types.Schema(type=types.Type.STRING, description="A brief overall assessment of the resume's ATS readiness and professional quality."),
+        },
+        required=["ats_score", "strengths", "improvements", "overall_assessment"],
+        # Generated in this order, so a streamed response delivers the score first
+        property_ordering=["ats_score", "strengths", "improvements", "overall_assessment"],
+    )
+
+    return prompt, types.GenerateContentConfig(
+        system_instruction=system_instruction,
+        response_mime_type="application/json",
+        response_schema=response_schema,
+        temperature=0.2 # Keep it objective/deterministic
+    )
+
+def generate_ats_scorecard(original_resume):
+    """Asks Gemini for the general ATS scorecard and returns it as a dict. Raises on failure."""
+    prompt, config = ats_scorecard_request(original_resume)
+    gemini_response = llm.generate_content(
+        model='gemini-2.5-pro',
+        contents=prompt,
+        config=config,
+        cache_namespace='ats_score',
+    )
+
+    # The response text is a JSON string, parse it
+    scorecard = json.loads(gemini_response.text)
+    scorecard['routing'] = gemini_response.routing
+    return scorecard
+
+def stream_ats_scorecard(original_resume, routing=None):
+    """Streams the ATS scorecard JSON from the Gemini API as text chunks. Fills `routing`, if given, with the model used."""
+    prompt, config = ats_scorecard_request(original_resume)
+    for chunk in llm.generate_content_stream(
+        model='gemini-2.5-pro',
+        contents=prompt,
+        config=config,
+        task='ats_score',
+        routing=routing,
+    ):
+        if chunk.text:
+            yield chunk.text
+
+def hybrid_ats_events(local_scorecard, original_resume):
+    """Sends the local scorecard immediately, then the Gemini narrative once it is ready."""
+    yield sse_event('local', local_scorecard)
+    try:
+        yield sse_event('llm', generate_ats_scorecard(original_resume))
+    except Exception as e:
+        print(f"ATS Score API Error: {e}")
+        record_error('ats_score', e)
+        yield sse_event('error', {'error': f"Failed to generate ATS score: {e}", **retry_fields(e)})
+
+@bp.route('/get_ats_score', methods=['POST'])
+def get_ats_score():
+    """Calculates and returns the general ATS score.
+
+    mode=llm uses Gemini and a JSON schema, mode=local uses the deterministic in-process
+    scorer, mode=hybrid streams the local score first and the Gemini scorecard after it, and
+    mode=stream streams the Gemini scorecard field by field, the score first.
+    """
+    body = json_object(request.get_json(silent=True))
+    original_resume = document_store.resolve(body, 'original_resume', 'resume_id')
+    job_description = document_store.resolve(body, 'job_description', 'job_description_id') or ''
+    mode = body.get('mode') or request.args.get('mode') or ATS_SCORE_DEFAULT_MODE
+
+    if not original_resume:
+        return jsonify({'error': 'Missing original resume input for scoring in JSON body.'}), 400
+
+    if mode not in ATS_SCORE_MODES:
+        return jsonify({'error': f"Invalid mode '{mode}'. Use one of: {', '.join(ATS_SCORE_MODES)}."}), 400
+
+    if mode == 'local':
+        return jsonify(score_resume(original_resume, job_description))
+
+    if not llm.client:
+        return jsonify({'error': 'Gemini Client not initialized.'}), 500
+
+    if mode == 'hybrid':
+        return sse_response(hybrid_ats_events(score_resume(original_resume, job_description), original_resume))
+
+    if mode == 'stream':
+        routing = {}
+        return sse_response(stream_field_events(
+            stream_ats_scorecard(original_resume, routing),
+            'Failed to generate ATS score',
+            routing=routing,
+        ))
+
+    try:
+        return jsonify(generate_ats_scorecard(original_resume))
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
+        print(f"ATS Score API Error: {e}")
+        record_error('ats_score', e)
+        return jsonify({'error': f"Failed to generate ATS score: {e}"}), 500
+
+# --- BATCH SCORING ROUTE ---
+BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '500'))
+BATCH_MAX_TOP_K = int(os.getenv('BATCH_MAX_TOP_K', '50'))
+BATCH_MAX_CONCURRENCY = int(os.getenv('BATCH_MAX_CONCURRENCY', '4'))
+
+def parse_batch_items(values, prefix):
+    """Accepts a list of strings or {'id', 'text'} objects and returns [(id, text)], or None if malformed."""
+    if not isinstance(values, list):
+        return None
+    items = []
+    for index, value in enumerate(values):
+        if isinstance(value, str):
+            items.append((f"{prefix}-{index}", value))
+        elif isinstance(value, dict) and isinstance(value.get('text'), str):
+            items.append((str(value.get('id', f"{prefix}-{index}")), value['text']))
+        else:
+            return None
+    return items
+
+def batch_events(pairs, analysis, top_k, concurrency):
+    """Streams the local ranking, then LLM results for the top-k pairs as each one finishes."""
+    ranking = rank_pairs(skill_matcher, pairs)
+    yield sse_event('ranking', {'analysis': analysis, 'ranking': ranking})
+
+    texts = {item_id: (jd, resume) for item_id, jd, resume in pairs}
+    shortlist = ranking[:top_k]
+
+    def analyze(item):
+        job_description, resume_text = texts[item['id']]
+        # Batch items wait behind interactive requests when Gemini quota is short
+        with upstream_priority('batch'):
+            if analysis == 'ats_score':
+                return generate_ats_scorecard(resume_text)
+            return generate_skill_gap_analysis(job_description, resume_text)
+
+    completed = 0
+    for item, result, error in fan_out(shortlist, analyze, concurrency):
+        completed += 1
+        if error is not None:
+            print(f"Batch {analysis} API Error for {item['id']}: {error}")
+            record_error('batch', error)
+            yield sse_event('item_error', {'id': item['id'], 'rank': item['rank'], 'error': f"Failed to analyze: {error}", **retry_fields(error)})
+        else:
+            yield sse_event('result', {'id': item['id'], 'rank': item['rank'], analysis: result})
+
+    yield sse_event('done', {'analyzed': completed, 'total': len(ranking)})
+
+@bp.route('/batch_score', methods=['POST'])
+def batch_score():
+    """Ranks one resume against many job descriptions, or many resumes against one.
+
+    Every pair is ranked locally first; only the top_k pairs are sent to Gemini, with bounded
+    concurrency, and results are streamed back as Server-Sent Events as they complete.
+    """
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json'}), 400
+
+    body = json_object(request.get_json(silent=True))
+    analysis = body.get('analysis', 'skill_gap')
+    if analysis not in ('skill_gap', 'ats_score'):
+        return jsonify({'error': "Invalid analysis. Use 'skill_gap' or 'ats_score'."}), 400
+
+    resume_text = document_store.resolve(body, 'resume_text', 'resume_id')
+    job_description = document_store.resolve(body, 'job_description', 'job_description_id')
+
+    if 'job_descriptions' in body and resume_text:
+        job_descriptions = parse_batch_items(body['job_descriptions'], 'jd')
+        if job_descriptions is None:
+            return jsonify({'error': 'job_descriptions must be a list of strings or {id, text} objects'}), 400
+        pairs = [(item_id, text, resume_text) for item_id, text in job_descriptions]
+    elif 'resumes' in body and job_description:
+        resumes = parse_batch_items(body['resumes'], 'resume')
+        if resumes is None:
+            return jsonify({'error': 'resumes must be a list of strings or {id, text} objects'}), 400
+        pairs = [(item_id, job_description, text) for item_id, text in resumes]
+    else:
+        return jsonify({'error': 'Provide resume_text with job_descriptions, or job_description with resumes'}), 400
+
+    if not pairs:
+        return jsonify({'error': 'The batch is empty'}), 400
+    if len(pairs) > BATCH_MAX_ITEMS:
+        return jsonify({'error': f"A batch can contain at most {BATCH_MAX_ITEMS} items"}), 400
+
+    try:
+        top_k = max(0, min(int(body.get('top_k', 5)), BATCH_MAX_TOP_K))
+        concurrency = max(1, min(int(body.get('concurrency', BATCH_MAX_CONCURRENCY)), BATCH_MAX_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'top_k and concurrency must be integers'}), 400
+
+    # top_k=0 returns only the local ranking and needs no Gemini client
+    if top_k and not llm.client:
+        return jsonify({'error': 'Gemini Client not initialized.'}), 500
+
+    return sse_response(batch_events(pairs, analysis, top_k, concurrency))
+
+# --- FULL ANALYSIS PIPELINE ROUTE ---
+PIPELINE_STAGES = ('rewrite_resume', 'ats_score', 'skill_gap', 'cover_letter')
+
+def run_pipeline_stage(stage, job_description, resume_text, template_style):
+    """Runs one pipeline stage and returns (result, routing). Raises on failure."""
+    if stage == 'ats_score':
+        result = generate_ats_scorecard(resume_text)
+        return result, result.pop('routing', None)
+    if stage == 'skill_gap':
+        result = generate_skill_gap_analysis(job_description, resume_text)
+        return result, result.pop('routing', None)
+
+    routing = {}
+    if stage == 'rewrite_resume':
+        text = generate_rewritten_resume(job_description, resume_text, routing)
+    else:
+        text = generate_cover_letter(job_description, resume_text, template_style, routing)
+    # The document generators report failures in-band rather than raising
+    if text.startswith("Gemini API Error:"):
+        raise RuntimeError(text[len("Gemini API Error:"):].strip())
+    return text, routing
+
+def pipeline_events(stages, job_description, resume_text, resume_id, template_style):
+    """Runs the selected stages concurrently and streams each result as soon as it completes."""
+    yield sse_event('meta', {'stages': list(stages), 'resume_id': resume_id, 'resume': parse_resume(resume_text).to_dict()})
+
+    completed, failed = [], []
+    for stage, outcome, error in fan_out(
+        stages,
+        lambda stage: run_pipeline_stage(stage, job_description, resume_text, template_style),
+        len(stages),
+    ):
+        if error is not None:
+            print(f"Pipeline {stage} API Error: {error}")
+            record_error('pipeline', error)
+            failed.append(stage)
+            yield sse_event('stage_error', {'stage': stage, 'error': f"Gemini API Error: {error}", **retry_fields(error)})
+        else:
+            completed.append(stage)
+            result, routing = outcome
+            yield sse_event('stage', {'stage': stage, 'result': result, 'routing': routing})
+
+    yield sse_event('done', {'completed': completed, 'failed': failed})
+
+@bp.route('/full_analysis', methods=['POST'])
+def full_analysis():
+    """Runs rewrite, ATS score, skill gap and cover letter for one resume in a single request.
+
+    The resume is extracted once and the stages run concurrently, so the total wait is about
+    that of the slowest stage. Results are streamed as Server-Sent Events in completion order.
+    Accepts a multipart form with a 'resume' PDF, or a JSON body with resume_text / resume_id.
+    """
+    if not llm.client:
+        return jsonify({'error': 'Gemini Client not initialized.'}), 500
+
+    if request.files:
+        body = request.form
+        resume_text = resume_from_upload(request.files.get('resume'))
+    else:
+        body = json_object(request.get_json(silent=True))
+        resume_text = document_store.resolve(body, 'resume_text', 'resume_id')
+
+    job_description = document_store.resolve(body, 'job_description', 'job_description_id')
+    if not job_description or not resume_text:
+        return jsonify({'error': 'Missing job description or resume'}), 400
+
+    # stages may be a JSON list or a comma-separated string; the default runs everything
+    requested = body.get('stages') or list(PIPELINE_STAGES)
+    if isinstance(requested, str):
+        requested = [stage.strip() for stage in requested.split(',') if stage.strip()]
+    if not isinstance(requested, list) or any(stage not in PIPELINE_STAGES for stage in requested):
+        return jsonify({'error': f"Invalid stages. Use any of: {', '.join(PIPELINE_STAGES)}."}), 400
+    stages = [stage for stage in PIPELINE_STAGES if stage in requested]
+
+    return sse_response(pipeline_events(
+        stages,
+        job_description,
+        resume_text,
+        document_store.put(resume_text, 'resume'),
+        body.get('template_style', 'professional'),
+    ))
+
+# --- BACKGROUND JOB ROUTES ---
+def streaming_job(chunks, result_key, extra=None):
+    """Builds a job body that records streamed chunks as progress and checks the deadline between them."""
+    def run(job):
+        stream = chunks()
+        try:
+            for text in stream:
+                job.emit(text)
+                job.check_deadline()
+        finally:
+            # Closing the generator aborts the upstream request if the job timed out
+            stream.close()
+        result = {result_key: "".join(job.output)}
+        result.update(extra or {})
+        return result
+    return run
+
+def job_accepted(job, created):
+    """202 response pointing the client at the job's status and event stream."""
+    return jsonify({
+        'job_id': job.id,
+        'status': job.status,
+        'reattached': not created,
+        'status_url': f"/jobs/{job.id}",
+        'events_url': f"/jobs/{job.id}/events",
+    }), 202
+
+@bp.route('/jobs/rewrite_resume', methods=['POST'])
+def submit_rewrite_job():
+    """Queues a resume rewrite and returns a job id immediately."""
+    if not llm.client:
+        return jsonify({'error': 'Gemini Client not initialized.'}), 500
+
+    if 'resume' not in request.files or 'job_description' not in request.form:
+        return jsonify({'error': 'Missing file or job description'}), 400
+
+    job_description = request.form['job_description']
+    resume_text = resume_from_upload(request.files['resume'])
+
+    # Filled in by the stream once a model is chosen, and stored with the job's result
+    routing = {}
+    try:
+        job, created = job_queue.submit(
+            'rewrite_resume',
+            streaming_job(
+                lambda: stream_rewritten_resume(job_description, resume_text, routing),
+                'rewritten_resume',
+                extra={'original_resume': resume_text, 'resume_id': document_store.put(resume_text, 'resume'), 'routing': routing},
+            ),
+            # Identical inputs re-attach to the job already running (or finished) for them
+            dedupe_key=content_hash(f"rewrite_resume\0{job_description}\0{resume_text}".encode('utf-8')),
+            priority=request.form.get('priority', 'normal'),
+        )
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    return job_accepted(job, created)
+
+@bp.route('/jobs/generate_cover_letter', methods=['POST'])
+def submit_cover_letter_job():
+    """Queues a cover letter generation and returns a job id immediately."""
+    if not llm.client:
+        return jsonify({'error': 'Gemini Client not initialized.'}), 500
+
+    body = json_object(request.get_json(silent=True))
+    # Either text can be sent inline or as the id returned by an upload / POST /documents
+    job_description = document_store.resolve(body, 'job_description', 'job_description_id')
+    resume_text = document_store.resolve(body, 'resume_text', 'resume_id')
+    template_style = body.get('template_style', 'professional')
+
+    if job_description is None or resume_text is None:
+        return jsonify({'error': 'Missing job description or resume text in JSON body'}), 400
+
+    if not job_description or not resume_text:
+        return jsonify({'error': 'Job description and resume text cannot be empty'}), 400
+
+    routing = {}
+    try:
+        job, created = job_queue.submit(
+            'generate_cover_letter',
+            streaming_job(
+                lambda: stream_cover_letter(job_description, resume_text, template_style, routing),
+                'cover_letter',
+                extra={'routing': routing},
+            ),
+            dedupe_key=content_hash(f"cover_letter\0{template_style}\0{job_description}\0{resume_text}".encode('utf-8')),
+            priority=body.get('priority', 'normal'),
+        )
+    except QueueFull as e:
+        return jsonify({'error': str(e)}), 503
+    return job_accepted(job, created)
+
+@bp.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Returns a job's status, and its result once it has finished."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return jsonify(job.snapshot())
+
+@bp.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    """Streams a job's progress as Server-Sent Events, replaying any output produced so far."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return sse_response(job_queue.events(job))
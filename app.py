@@ -1,560 +1,210 @@
-import os
-import json 
-from flask import Flask, request, jsonify, render_template
-from werkzeug.utils import secure_filename
-from google import genai
-from google.genai import types
-from PyPDF2 import PdfReader
-from dotenv import load_dotenv
-
-# --- Setup ---
-load_dotenv()
-app = Flask(__name__)
-# NOTE: To run this, you need to create a folder named 'templates' 
-# and put the merged HTML file inside it, named 'index.html'.
-app.config['UPLOAD_FOLDER'] = 'uploads' 
-os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
-
-# 1. Initialize Gemini Client
-client = None
-try:
-    # Client will automatically pick up GEMINI_API_KEY from the .env file
-    client = genai.Client()
-    print("Gemini Client initialized successfully.")
-except Exception as e:
-    print(f"Error initializing Gemini Client: {e}")
-    
-# --- Helper Functions ---
-
-def pdf_to_text(pdf_path):
-    """Extracts all text from a local PDF file."""
-    text = ""
-    try:
-        reader = PdfReader(pdf_path)
-        for page in reader.pages:
-            # Handle potential None or non-string return from extract_text
-            extracted = page.extract_text()
-            if extracted:
-                text += extracted + "\n"
-    except Exception as e:
-        print(f"Error reading PDF: {e}")
-        return None
-    return text
-
-def generate_rewritten_resume(job_description, resume_text):
-    """Calls the Gemini API to rewrite the resume."""
-    if not client:
-        return "Gemini API Error: Client not initialized."
-        
-    # Powerful prompt instruction for the model
-    system_instruction = (
-        "You are an expert HR and professional resume writer. "
-        "Your task is to rewrite the provided 'Existing Resume' to perfectly match "
-        "the 'Job Description'. Use existing content that is suitable. "
-        "If any required skills or projects are missing for the job role, seamlessly add them based on common job requirements. "
-        "Rephrase and reformat content to highlight keywords and relevance. "
-        "Use bullet points and proper professional sections. "
-        "Heading (like project names, technical skills, education, certification, and awards) should be in **bold and uppercase**."
-        "The output must be the full, complete, and rewritten resume text, formatted clearly with Markdown. "
-        "DO NOT include any introductory dialogue or surrounding text—only the resume. "
-        "DO NOT use # symbols for headings - use **bold** formatting instead. "
-        "DO NOT use --- separators anywhere in the resume. "
-        "The resume can be longer than one page if necessary."
-    )
-    
-    # Combine user inputs into the main prompt content
-    user_content = (
-        f"Job Description:\n---\n{job_description}\n---\n\n"
-        f"Existing Resume:\n---\n{resume_text}\n---\n\n"
-        "REWRITTEN PROFESSIONAL RESUME:"
-    )
-    
-    try:
-        response = client.models.generate_content(
-            model='gemini-2.5-pro',
-            contents=user_content,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                temperature=0.6,
-            ),
-        )
-        return response.text
-    except Exception as e:
-        return f"Gemini API Error: {e}"
-
-def generate_cover_letter(job_description, resume_text, template_style="professional"):
-    """Calls the Gemini API to generate a cover letter."""
-    if not client:
-        return "Gemini API Error: Client not initialized."
-    
-    # Define different template styles
-    template_instructions = {
-        "professional": (
-            "Write a professional, formal cover letter with clear structure including: "
-            "proper business letter format with date, recipient address, greeting, "
-            "3-4 paragraphs (introduction, body with specific examples, closing), "
-            "and professional sign-off."
-        ),
-        "modern": (
-            "Write a modern, engaging cover letter that stands out while remaining professional. "
-            "Use a more conversational tone, include specific achievements with metrics, "
-            "and demonstrate passion for the role. Structure: compelling opening, "
-            "2-3 body paragraphs with concrete examples, and strong closing."
-        ),
-        "creative": (
-            "Write a creative cover letter that showcases personality while maintaining professionalism. "
-            "Use storytelling elements, include unique angles about why you're perfect for the role, "
-            "and demonstrate creativity in presentation. Structure: hook opening, "
-            "narrative body with examples, memorable closing."
-        ),
-        "executive": (
-            "Write an executive-level cover letter with strategic focus and leadership emphasis. "
-            "Highlight vision, strategic thinking, and high-level achievements. "
-            "Use confident language and focus on business impact. Structure: "
-            "executive summary opening, strategic body paragraphs, leadership-focused closing."
-        )
-    }
-    
-    template_prompt = template_instructions.get(template_style, template_instructions["professional"])
-    
-    # Powerful prompt instruction for the model
-    system_instruction = (
-        f"You are an expert professional cover letter writer. "
-        f"{template_prompt} "
-        "Extract relevant information from both the job description and resume to create a compelling cover letter. "
-        "Use specific examples from the resume that match job requirements. "
-        "Address the hiring manager directly and demonstrate knowledge of the company/role. "
-        "The output must be the complete cover letter text, properly formatted. "
-        "DO NOT include any introductory dialogue or surrounding text—only the cover letter. "
-        "Use proper business letter formatting with appropriate spacing and structure."
-    )
-    
-    # Combine user inputs into the main prompt content
-    user_content = (
-        f"Job Description:\n---\n{job_description}\n---\n\n"
-        f"Resume Information:\n---\n{resume_text}\n---\n\n"
-        "PROFESSIONAL COVER LETTER:"
-    )
-    
-    try:
-        response = client.models.generate_content(
-            model='gemini-2.5-pro',
-            contents=user_content,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                temperature=0.7,
-            ),
-        )
-        return response.text
-    except Exception as e:
-        return f"Gemini API Error: {e}"
-
-# --- Flask Routes ---
-
-@app.route('/')
-def index():
-    """Renders the home page."""
-    return render_template('home.html')
-
-@app.route('/ats-checker')
-def ats_checker():
-    """Renders the ATS Score Checker page."""
-    return render_template('ats_checker.html')
-
-@app.route('/resume-generator')
-def resume_generator():
-    """Renders the Resume Generator page."""
-    return render_template('resume_generator.html')
-
-@app.route('/cover-letter')
-def cover_letter():
-    """Renders the Cover Letter Generator page."""
-    return render_template('cover_letter.html')
-
-@app.route('/skill-gap')
-def skill_gap():
-    """Renders the Skill Gap Analysis page."""
-    return render_template('skill_gap.html')
-
-@app.route('/rewrite_resume', methods=['POST'])
-def rewrite_resume():
-    """Handles the form submission and Gemini API call."""
-    if 'resume' not in request.files or 'job_description' not in request.form:
-        return jsonify({'error': 'Missing file or job description'}), 400
-
-    job_description = request.form['job_description']
-    resume_file = request.files['resume']
-
-    if resume_file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-
-    if resume_file and resume_file.filename.endswith('.pdf'):
-        # 1. Save and extract text from PDF
-        filename = secure_filename(resume_file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        resume_file.save(filepath)
-        
-        resume_text = pdf_to_text(filepath)
-        
-        if not resume_text:
-            os.remove(filepath)
-            return jsonify({'error': 'Could not extract text from PDF. The file might be corrupted or image-only.'}), 500
-
-        # 2. Call Gemini
-        rewritten_text = generate_rewritten_resume(job_description, resume_text)
-        
-        # 3. Clean up the uploaded file
-        os.remove(filepath) 
-
-        # 4. Return result
-        if rewritten_text.startswith("Gemini API Error:"):
-             return jsonify({'error': rewritten_text}), 500
-             
-        return jsonify({
-            'rewritten_resume': rewritten_text,
-            'original_resume': resume_text
-        })
-
-    return jsonify({'error': 'Unsupported file type. Please upload a PDF file.'}), 400
-
-@app.route('/upload_resume_for_ats', methods=['POST'])
-def upload_resume_for_ats():
-    """Handles resume upload for ATS analysis only."""
-    if 'resume' not in request.files:
-        return jsonify({'error': 'No file uploaded'}), 400
-
-    resume_file = request.files['resume']
-    if resume_file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-
-    if resume_file and resume_file.filename.endswith('.pdf'):
-        filename = secure_filename(resume_file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        resume_file.save(filepath)
-        
-        resume_text = pdf_to_text(filepath)
-        
-        if not resume_text:
-            os.remove(filepath)
-            return jsonify({'error': 'Could not extract text from PDF. The file might be corrupted or image-only.'}), 500
-
-        os.remove(filepath)
-        return jsonify({'original_resume': resume_text})
-
-    return jsonify({'error': 'Unsupported file type. Please upload a PDF file.'}), 400
-
-@app.route('/upload_resume_for_cover_letter', methods=['POST'])
-def upload_resume_for_cover_letter():
-    """Handles resume upload for cover letter generation only."""
-    if 'resume' not in request.files:
-        return jsonify({'error': 'No file uploaded'}), 400
-
-    resume_file = request.files['resume']
-    if resume_file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-
-    if resume_file and resume_file.filename.endswith('.pdf'):
-        filename = secure_filename(resume_file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        resume_file.save(filepath)
-        
-        resume_text = pdf_to_text(filepath)
-        
-        if not resume_text:
-            os.remove(filepath)
-            return jsonify({'error': 'Could not extract text from PDF. The file might be corrupted or image-only.'}), 500
-
-        os.remove(filepath)
-        return jsonify({'resume_text': resume_text})
-
-    return jsonify({'error': 'Unsupported file type. Please upload a PDF file.'}), 400
-
-@app.route('/upload_resume_for_skill_gap', methods=['POST'])
-def upload_resume_for_skill_gap():
-    """Handles resume upload for skill gap analysis only."""
-    if 'resume' not in request.files:
-        return jsonify({'error': 'No file uploaded'}), 400
-
-    resume_file = request.files['resume']
-    if resume_file.filename == '':
-        return jsonify({'error': 'No selected file'}), 400
-
-    if resume_file and resume_file.filename.endswith('.pdf'):
-        filename = secure_filename(resume_file.filename)
-        filepath = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-        resume_file.save(filepath)
-        
-        resume_text = pdf_to_text(filepath)
-        
-        if not resume_text:
-            os.remove(filepath)
-            return jsonify({'error': 'Could not extract text from PDF. The file might be corrupted or image-only.'}), 500
-
-        os.remove(filepath)
-        return jsonify({'resume_text': resume_text})
-
-    return jsonify({'error': 'Unsupported file type. Please upload a PDF file.'}), 400
-
-@app.route('/generate_cover_letter', methods=['POST'])
-def generate_cover_letter_endpoint():
-    """Handles cover letter generation based on job description and resume text."""
-    if not request.json or 'job_description' not in request.json or 'resume_text' not in request.json:
-        return jsonify({'error': 'Missing job description or resume text in JSON body'}), 400
-
-    job_description = request.json['job_description']
-    resume_text = request.json['resume_text']
-    template_style = request.json.get('template_style', 'professional')
-
-    if not job_description or not resume_text:
-        return jsonify({'error': 'Job description and resume text cannot be empty'}), 400
-
-    # Call Gemini to generate cover letter
-    cover_letter_text = generate_cover_letter(job_description, resume_text, template_style)
-    
-    if cover_letter_text.startswith("Gemini API Error:"):
-        return jsonify({'error': cover_letter_text}), 500
-        
-    return jsonify({'cover_letter': cover_letter_text})
-
-@app.route('/analyze_skill_gap', methods=['POST'])
-def analyze_skill_gap():
-    """Analyzes skill gaps between resume and job description."""
-    if not client:
-        return jsonify({'error': 'Gemini Client not initialized.'}), 500
-
-    if not request.json or 'job_description' not in request.json or 'resume_text' not in request.json:
-        return jsonify({'error': 'Missing job description or resume text in JSON body'}), 400
-
-    job_description = request.json['job_description']
-    resume_text = request.json['resume_text']
-
-    if not job_description or not resume_text:
-        return jsonify({'error': 'Job description and resume text cannot be empty'}), 400
-
-    # 1. Define the Skill Gap Analysis Prompt
-    system_instruction = (
-        "You are an expert career advisor and skills analyst. "
-        "Your task is to analyze the given resume against the job description to identify: "
-        "1. Skills that match between the resume and job requirements "
-        "2. Missing skills and areas for improvement "
-        "Your output MUST be a single JSON object that strictly conforms to the provided schema."
-    )
-
-    prompt = f"""
-    Job Description:\n---\n{job_description}\n---\n
-    Resume:\n---\n{resume_text}\n---\n
-    
-    Analyze the resume against the job description and provide:
-    1. A comprehensive list of matching skills (technical skills, soft skills, tools, technologies, etc.)
-    2. Missing skills and areas for improvement that would make the candidate more suitable for this role
-    
-    Focus on specific, actionable insights that help the candidate understand their skill alignment.
-    """
-
-    # 2. Define the JSON Response Schema
-    response_schema = types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "matching_skills": types.Schema(
-                type=types.Type.STRING, 
-                description="HTML formatted list of skills that match between resume and job description. Use bullet points and highlight key matches."
-            ),
-            "improvements": types.Schema(
-                type=types.Type.STRING, 
-                description="HTML formatted list of missing skills and areas for improvement. Use bullet points and be specific about what's needed."
-            ),
-        },
-        required=["matching_skills", "improvements"]
-    )
+import time
 
-    try:
-        gemini_response = client.models.generate_content(
-            model='gemini-2.5-pro',
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                response_mime_type="application/json",
-                response_schema=response_schema,
-                temperature=0.3 # Keep it focused and analytical
-            ),
-        )
-
-        # The response text is a JSON string, parse it
-        skill_analysis = json.loads(gemini_response.text)
-        return jsonify(skill_analysis)
-
-    except Exception as e:
-        print(f"Skill Gap Analysis API Error: {e}")
-        return jsonify({'error': f"Failed to analyze skill gaps: {e}"}), 500
-
-# --- ATS SCORING ROUTE ---
-@app.route('/get_ats_score', methods=['POST'])
-def get_ats_score():
-    """Calculates and returns the general ATS score using Gemini and JSON schema."""
-    if not client:
-        return jsonify({'error': 'Gemini Client not initialized.'}), 500
-
-    if not request.json or 'original_resume' not in request.json:
-        return jsonify({'error': 'Missing original resume input for scoring in JSON body.'}), 400
-
-    original_resume = request.json['original_resume']
-
-    # 1. Define the General ATS Score Prompt
-    system_instruction = (
-        "You are an expert ATS (Applicant Tracking System) analyst and Senior Recruiter. "
-        "Your task is to evaluate the given resume for general ATS compatibility and overall quality. "
-        "Provide a numerical score out of 100 that represents the likelihood this resume will pass ATS screening for most job applications. "
-        "Focus on technical formatting, keyword optimization, structure, and overall professional presentation. "
-        "Your output MUST be a single JSON object that strictly conforms to the provided schema."
-    )
-
-    prompt = f"""
-    Resume to Analyze:\n---\n{original_resume}\n---\n
-    
-    Analyze this resume for general ATS compatibility. Consider:
-    - Technical formatting (proper headers, consistent structure, clean layout)
-    - Keyword optimization and industry-relevant terms
-    - Contact information completeness
-    - Professional summary quality
-    - Skills section organization
-    - Work experience formatting and detail
-    - Education section completeness
-    - Overall readability and ATS-friendly formatting
-    - Length appropriateness (not too short, not too long)
-    - Action verbs and quantified achievements
-    
-    Generate a score that reflects how well this resume would perform across various job applications and ATS systems.
-    """
-
-    # 2. Define the JSON Response Schema (Structured Output)
-    response_schema = types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "ats_score": types.Schema(type=types.Type.INTEGER, description="The general ATS compatibility score out of 100. Must be between 0 and 100."),
-            "strengths": types.Schema(type=types.Type.STRING, description="List 3-5 key strengths of the resume that make it ATS-friendly."),
-            "improvements": types.Schema(type=types.Type.STRING, description="List 3-5 specific areas for improvement to increase ATS compatibility."),
-            "overall_assessment": types.Schema(type=types.Type.STRING, description="A brief overall assessment of the resume's ATS readiness and professional quality."),
-        },
-        required=["ats_score", "strengths", "improvements", "overall_assessment"]
-    )
+IMPORT_STARTED = time.perf_counter()
 
+import os
+import resource
+import tempfile
+from flask import Flask, Request, current_app, request, jsonify, got_request_exception
+from werkzeug.exceptions import RequestEntityTooLarge
+from extraction import ExtractionError
+from export import ExportError
+from documents import DocumentNotFound, DocumentTooLarge, InvalidRequest
+from metrics import record_error, registry, start_request, current_timings
+from governance import UpstreamUnavailable
+import services
+import pages
+import upload
+import analysis
+import chat
+import matching
+
+# --- App Factory ---
+# create_app() builds the Flask app from the five blueprints. Importing this module is cheap:
+# the Gemini SDK, its client and PyPDF2 are loaded on first use (or by services.warm_up()),
+# so gunicorn workers boot quickly and each one creates its own client after the fork.
+# `gunicorn app:app` keeps working; the module-level `app` is created on first access.
+
+BLUEPRINTS = (pages.bp, upload.bp, analysis.bp, chat.bp, matching.bp)
+
+# Whole request bodies over this are refused (413) from Content-Length, before they are read
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', str(12 * 1024 * 1024)))
+# Uploaded files are held in memory up to this size; only larger ones spill to a temp file
+UPLOAD_SPOOL_BYTES = int(os.getenv('UPLOAD_SPOOL_BYTES', str(UPLOAD_MAX_BYTES)))
+
+
+class UploadRequest(Request):
+    """Parses uploaded files into memory instead of Werkzeug's default 500 KB spill-to-disk buffer."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_BYTES, mode='rb+')
+
+
+# --- Instrumentation ---
+# Every request is timed by stage (upload, extract, prompt, compact, gemini) and the stages
+# are returned in a Server-Timing header. Streamed responses send their headers before
+# Gemini runs, so their Gemini time only shows up in /metrics.
+
+def start_request_timing():
+    start_request()
+
+def finish_request_timing(response):
+    """Adds the Server-Timing header and records the request once its body has been sent."""
+    timings = current_timings()
+    if timings is None:
+        return response
+    response.headers['Server-Timing'] = timings.header()
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    method, status = request.method, str(response.status_code)
+
+    def record():
+        registry.inc('http_requests_total', route=route, method=method, status=status)
+        registry.observe('http_request_duration_seconds', time.perf_counter() - timings.started, route=route, method=method)
+
+    response.call_on_close(record)
+    return response
+
+def count_unhandled_exception(sender, exception, **extra):
+    record_error('unhandled', exception)
+
+def resident_memory_bytes():
+    """This process's current resident set size, or None where /proc is unavailable."""
     try:
-        gemini_response = client.models.generate_content(
-            model='gemini-2.5-pro',
-            contents=prompt,
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                response_mime_type="application/json",
-                response_schema=response_schema,
-                temperature=0.2 # Keep it objective/deterministic
-            ),
-        )
-
-        # The response text is a JSON string, parse it
-        scorecard = json.loads(gemini_response.text)
-        return jsonify(scorecard)
-
-    except Exception as e:
-        print(f"ATS Score API Error: {e}")
-        return jsonify({'error': f"Failed to generate ATS score: {e}"}), 500
-
-# --- CHAT BOT ROUTE (Integration of your chat logic) ---
-@app.route('/chat', methods=['POST'])
-def chat():
-    """Conversational endpoint to assist with resume editing and advice."""
-    if not client:
-        return jsonify({'error': 'Gemini Client not initialized.'}), 500
-
-    if not request.is_json:
-        return jsonify({'error': 'Content-Type must be application/json'}), 400
-
-    body = request.get_json(silent=True) or {}
-    user_message = body.get('message', '').strip()
-    job_description = body.get('job_description', '').strip()
-    # The current preview is sent as HTML from the editable box
-    current_preview = body.get('current_preview', '').strip()
-
-    if not user_message:
-        return jsonify({'error': 'Missing message'}), 400
-
-    # System instruction for the chat model
-    system_instruction = (
-        "You are a friendly, concise resume and cover letter writing copilot for end users. "
-        "Help improve the user's resume or cover letter for a given job description. "
-        "When the user asks for a change, produce the updated full text (resume or cover letter), formatted with clear Markdown (bold for sections, bullet points). "
-        "For cover letters, maintain proper business letter formatting with appropriate spacing and structure. "
-        "If the user is only asking for advice, set 'updated_preview' to an empty string. "
-        "Keep the tone professional and helpful. "
-        "Determine from context whether the user is editing a resume or cover letter."
-    )
-
-    # Structured output for predictable response handling in the frontend
-    response_schema = types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "reply_text": types.Schema(type=types.Type.STRING, description="Short assistant reply to display in chat."),
-            "updated_preview": types.Schema(type=types.Type.STRING, description="If the user requested edits, the fully updated resume text in Markdown. Otherwise empty string."),
-            "reasoning_summary": types.Schema(type=types.Type.STRING, description="One or two concise sentences that explain the assistant's approach."),
-            "deliberation_steps": types.Schema(type=types.Type.INTEGER, description="Rough step-count the model considered (1-10)."),
-        },
-        required=["reply_text", "updated_preview", "reasoning_summary", "deliberation_steps"]
-    )
-
-    prompt_parts = []
-    if job_description:
-        prompt_parts.append(f"Job Description:\n---\n{job_description}\n---\n")
-    if current_preview:
-        # Check if this is a cover letter or resume based on prefix
-        if current_preview.startswith("COVER_LETTER:"):
-            content = current_preview.replace("COVER_LETTER:", "")
-            prompt_parts.append(f"Current Cover Letter Preview (Raw HTML/Text):\n---\n{content}\n---\n")
-        elif current_preview.startswith("RESUME:"):
-            content = current_preview.replace("RESUME:", "")
-            prompt_parts.append(f"Current Resume Preview (Raw HTML/Text):\n---\n{content}\n---\n")
-        else:
-            # Legacy support for old format
-            prompt_parts.append(f"Current Resume Preview (Raw HTML/Text):\n---\n{current_preview}\n---\n")
-    prompt_parts.append(f"User Message:\n---\n{user_message}\n---\n")
-    prompt_parts.append(
-        "If the user's message requests modifications, update the document fully and return it as updated_preview in Markdown format. "
-        "Prefix your response with 'COVER_LETTER:' if editing a cover letter, or 'RESUME:' if editing a resume. "
-        "If no update is needed, set updated_preview to an empty string. "
-        "Do not include any introductory dialogue in the 'updated_preview' field."
-    )
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize()
+    except (OSError, ValueError, IndexError):
+        return None
 
-    try:
-        gemini_response = client.models.generate_content(
-            model='gemini-2.5-pro',
-            contents="\n\n".join(prompt_parts),
-            config=types.GenerateContentConfig(
-                system_instruction=system_instruction,
-                response_mime_type="application/json",
-                response_schema=response_schema,
-                temperature=0.4
-            ),
-        )
-
-        data = json.loads(gemini_response.text)
-        
-        # Prepare response data, using 'None' for empty strings to simplify frontend logic
-        reply_text = (data.get('reply_text') or '').strip()
-        updated_preview = (data.get('updated_preview') or '').strip()
-        reasoning_summary = (data.get('reasoning_summary') or '').strip()
-        deliberation_steps = data.get('deliberation_steps')
-
-        return jsonify({
-            'reply_text': reply_text,
-            'updated_preview': updated_preview or None, # Use None for empty strings
-            'reasoning_summary': reasoning_summary or None,
-            'deliberation_steps': deliberation_steps if isinstance(deliberation_steps, int) else None
-        })
-    except Exception as e:
-        print(f"Chat API Error: {e}")
-        return jsonify({'error': f"Failed to process chat: {e}"}), 500
+def cache_metrics():
+    """Current counters of the response, extraction and export caches, the Gemini governor, the job queue and the stores."""
+    caches = {'extraction': services.extraction_service.cache.stats(), 'export': services.export_cache.stats()}
+    if services.llm.cache is not None:
+        caches['llm_response'] = services.llm.cache.stats()
+    for name, stats in caches.items():
+        hits = stats['hits'] + stats.get('disk_hits', 0)
+        lookups = hits + stats['misses']
+        yield 'app_cache_hits_total', 'counter', 'Cache hits (memory and disk).', {'cache': name}, hits
+        yield 'app_cache_misses_total', 'counter', 'Cache misses.', {'cache': name}, stats['misses']
+        yield 'app_cache_hit_ratio', 'gauge', 'Hits / lookups since the worker started.', {'cache': name}, hits / lookups if lookups else 0.0
+        yield 'app_cache_entries', 'gauge', 'Entries currently cached.', {'cache': name}, stats['entries']
+    if services.llm.governor is not None:
+        governor = services.llm.governor.stats()
+        yield 'gemini_retries_total', 'counter', 'Gemini requests retried after a transient failure.', {}, governor['retried']
+        for model, state in governor['models'].items():
+            yield 'gemini_circuit_open', 'gauge', '1 while the model\'s circuit breaker rejects calls.', {'model': model}, int(state['circuit'] == 'open')
+            yield 'gemini_circuit_opened_total', 'counter', 'Times the model\'s circuit breaker opened.', {'model': model}, state['times_opened']
+            yield 'gemini_queue_waiting', 'gauge', 'Requests waiting for the model\'s rate limit.', {'model': model}, state['waiting']
+    for status, count in services.job_queue.stats().items():
+        yield 'app_jobs', 'gauge', 'Background jobs by status.', {'status': status}, count
+    yield 'app_documents', 'gauge', 'Documents in the server-side store.', {}, services.document_store.stats()['documents']
+    postings = services.posting_index.stats()
+    yield 'app_postings', 'gauge', 'Job postings in the search index.', {}, postings['postings']
+    yield 'app_postings_compressed_bytes', 'gauge', 'Compressed text of the indexed job postings.', {}, postings['compressed_bytes']
+
+def process_metrics():
+    """Startup durations and memory of this worker process."""
+    for phase, seconds in services.startup_stats.items():
+        yield 'app_startup_seconds', 'gauge', 'Time spent starting this worker, by phase.', {'phase': phase.replace('_seconds', '')}, seconds
+    rss = resident_memory_bytes()
+    if rss is not None:
+        yield 'process_resident_memory_bytes', 'gauge', 'Resident memory of this worker.', {}, rss
+    # ru_maxrss is in KiB on Linux
+    yield 'process_max_resident_memory_bytes', 'gauge', 'Peak resident memory of this worker.', {}, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+registry.add_collector(cache_metrics)
+registry.add_collector(process_metrics)
+
+def metrics():
+    """Prometheus scrape endpoint for this worker's request, stage, Gemini, error and cache metrics."""
+    return current_app.response_class(registry.render(), mimetype='text/plain; version=0.0.4')
+
+
+# --- Error Handlers ---
+
+def document_not_found(e):
+    """Unknown or expired document ids are reported as 404 so the client knows to upload again."""
+    record_error('documents', e)
+    return jsonify({'error': str(e), 'document_id': e.document_id}), 404
+
+def document_too_large(e):
+    """A document the store cannot hold is refused, rather than handing out an id that is already evicted."""
+    record_error('documents', e)
+    return jsonify({'error': str(e)}), 413
+
+def invalid_request(e):
+    """A JSON body, text or id of the wrong type is the client's mistake, not a 500."""
+    record_error('request', e)
+    return jsonify({'error': str(e)}), 400
+
+def upstream_unavailable(e):
+    """Gemini is over quota or unhealthy: tell the client when to come back instead of returning a 500."""
+    record_error('upstream', e)
+    response = jsonify({'error': str(e), 'retry_after': e.retry_after})
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response, 503
+
+def extraction_refused(e):
+    """Documents that are too large or too slow to read are refused with the reason."""
+    record_error('extraction', e)
+    return jsonify({'error': str(e)}), e.status
+
+def export_refused(e):
+    """Documents the PDF fonts cannot set are refused with the characters, instead of exporting '?' in their place."""
+    record_error('export', e)
+    return jsonify({'error': str(e)}), e.status
+
+def request_too_large(e):
+    """Bodies over MAX_CONTENT_LENGTH get a JSON reason like every other refused upload."""
+    record_error('upload', e)
+    limit = current_app.config['MAX_CONTENT_LENGTH'] / (1024 * 1024)
+    return jsonify({'error': f"Upload is too large. The limit is {limit:g} MB."}), 413
+
+
+def create_app(config=None):
+    """Builds the Flask app: blueprints, error handlers, request timing and /metrics."""
+    started = time.perf_counter()
+    app = Flask(__name__)
+    app.request_class = UploadRequest
+    # NOTE: To run this, you need to create a folder named 'templates'
+    # and put the merged HTML file inside it, named 'index.html'.
+    app.config['MAX_CONTENT_LENGTH'] = UPLOAD_MAX_BYTES
+    app.config.update(config or {})
+
+    for blueprint in BLUEPRINTS:
+        app.register_blueprint(blueprint)
+    app.register_error_handler(DocumentNotFound, document_not_found)
+    app.register_error_handler(DocumentTooLarge, document_too_large)
+    app.register_error_handler(InvalidRequest, invalid_request)
+    app.register_error_handler(UpstreamUnavailable, upstream_unavailable)
+    app.register_error_handler(ExtractionError, extraction_refused)
+    app.register_error_handler(ExportError, export_refused)
+    app.register_error_handler(RequestEntityTooLarge, request_too_large)
+    app.before_request(start_request_timing)
+    app.after_request(finish_request_timing)
+    got_request_exception.connect(count_unhandled_exception, app)
+    app.add_url_rule('/metrics', 'metrics', metrics)
+
+    services.startup_stats['import_seconds'] = IMPORT_FINISHED - IMPORT_STARTED
+    services.startup_stats['create_app_seconds'] = time.perf_counter() - started
+    rss = resident_memory_bytes()
+    print(f"App created in {(IMPORT_FINISHED - IMPORT_STARTED + services.startup_stats['create_app_seconds']) * 1000:.0f} ms "
+          f"(pid {os.getpid()}, RSS {rss / (1024 * 1024) if rss else 0:.1f} MB)")
+    return app
+
+
+def __getattr__(name):
+    """Creates the module-level `app` on first access, for `gunicorn app:app` and `flask run`."""
+    if name == 'app':
+        globals()['app'] = create_app()
+        return globals()['app']
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+IMPORT_FINISHED = time.perf_counter()
 
 if __name__ == '__main__':
     # You will use a file named .env to store your GEMINI_API_KEY
     if not os.getenv("GEMINI_API_KEY"):
          print("WARNING: GEMINI_API_KEY environment variable not set. Please create a .env file with your key.")
     # IMPORTANT: Flask will look for 'index.html' in a folder named 'templates'
-    app.run(debug=True)
\ No newline at end of file
+    create_app().run(debug=True)
@@ -0,0 +1,51 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from local_ats import tfidf_similarity
+
+# --- Batch Ranking ---
+# Ranking one resume against many postings (or many resumes against one posting) is done
+# in two stages: a cheap local prefilter over every pair, then LLM analysis for the top-k only.
+
+
+def prefilter_score(matcher, job_description, resume_text):
+    """Cheap relevance score in [0, 1] combining taxonomy skill coverage and TF-IDF similarity."""
+    similarity, _, _ = tfidf_similarity(resume_text, job_description)
+    gap = matcher.skill_gap(job_description, resume_text)
+    required = len(gap['matched']) + len(gap['missing'])
+    coverage = len(gap['matched']) / required if required else 0.0
+    # With no recognised skills in the JD, fall back to text similarity alone
+    score = 0.5 * coverage + 0.5 * similarity if required else similarity
+    return {
+        'score': round(score, 4),
+        'skill_coverage': round(coverage, 4),
+        'similarity': round(similarity, 4),
+        'matched': gap['matched'],
+        'missing': gap['missing'],
+    }
+
+
+def rank_pairs(matcher, pairs):
+    """Scores (item_id, job_description, resume_text) tuples and returns them best first."""
+    ranked = []
+    for item_id, job_description, resume_text in pairs:
+        ranked.append({'id': item_id, **prefilter_score(matcher, job_description, resume_text)})
+    ranked.sort(key=lambda item: item['score'], reverse=True)
+    for rank, item in enumerate(ranked, start=1):
+        item['rank'] = rank
+    return ranked
+
+
+def fan_out(items, fn, concurrency):
+    """Runs fn(item) for each item on a bounded pool, yielding (item, result, error) as each completes."""
+    with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+        futures = {pool.submit(fn, item): item for item in items}
+        try:
+            for future in as_completed(futures):
+                item = futures[future]
+                try:
+                    yield item, future.result(), None
+                except Exception as e:
+                    yield item, None, e
+        finally:
+            # If the consumer stops early (e.g. the client disconnected), drop work that has not started
+            for future in futures:
+                future.cancel()
@@ -0,0 +1,133 @@
+import os
+import random
+import itertools
+from export import render_pdf
+from skills import load_taxonomy
+
+# --- Synthetic Resume Corpus ---
+# Deterministic resumes of increasing length, rendered to real text-layer PDFs so the
+# upload routes exercise the same extraction path as user files.
+
+SIZES = {'1_page': 4, '2_pages': 14, '5_pages': 42, '20_pages': 190}
+
+FIRST_NAMES = ['Jane', 'Arjun', 'Maria', 'Wei', 'Fatima', 'Lukas', 'Aisha', 'Diego', 'Priya', 'Tom']
+LAST_NAMES = ['Doe', 'Sharma', 'Garcia', 'Chen', 'Khan', 'Müller', 'Okafor', 'Silva', 'Reddy', 'Nguyen']
+COMPANIES = ['Acme Corp', 'Globex', 'Initech', 'Umbrella Labs', 'Hooli', 'Stark Industries', 'Wayne Enterprises', 'Soylent']
+TITLES = ['Software Engineer', 'Senior Software Engineer', 'Backend Engineer', 'Data Engineer', 'Platform Engineer']
+SKILLS = ['Python', 'Flask', 'Django', 'PostgreSQL', 'Redis', 'Docker', 'Kubernetes', 'AWS', 'GCP', 'Terraform',
+          'React', 'TypeScript', 'Kafka', 'Spark', 'Airflow', 'Git', 'CI/CD', 'GraphQL', 'gRPC', 'Linux']
+VERBS = ['Led', 'Built', 'Designed', 'Reduced', 'Migrated', 'Automated', 'Scaled', 'Optimized', 'Launched', 'Mentored']
+OBJECTS = ['the billing platform', 'a real-time analytics pipeline', 'customer-facing REST APIs', 'the CI/CD pipeline',
+           'an internal developer portal', 'the search service', 'a multi-region deployment', 'data ingestion jobs']
+RESULTS = ['cutting costs by {n}%', 'serving {n}M monthly users', 'reducing latency by {n}%', 'saving {n} engineer-hours a month',
+           'improving availability to 99.9{n}%', 'increasing throughput {n}x']
+
+JOB_DESCRIPTION = """Senior Backend Engineer
+
+We are looking for a Senior Backend Engineer to design and scale the APIs behind our hiring platform.
+
+Requirements:
+- 5+ years of experience with Python and Flask or Django
+- Strong PostgreSQL and Redis skills
+- Experience with Docker, Kubernetes and AWS
+- Familiarity with CI/CD, Terraform and observability tooling
+- Excellent communication and mentoring skills
+
+We are an equal opportunity employer and value diversity at our company.
+"""
+
+
+def synthetic_resume(roles, seed=0):
+    """Returns a Markdown resume with the given number of roles."""
+    rng = random.Random(seed)
+    name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+    lines = [
+        f"**{name.upper()}**",
+        f"{name.split()[0].lower()}@example.com | (555) {rng.randint(100, 999)}-{rng.randint(1000, 9999)} | linkedin.com/in/{name.replace(' ', '').lower()}",
+        "",
+        "**PROFESSIONAL SUMMARY**",
+        f"{rng.choice(TITLES)} with {rng.randint(3, 15)} years of experience building reliable backend systems.",
+        "",
+        "**EXPERIENCE**",
+    ]
+    year = 2024
+    for _ in range(roles):
+        start = year - rng.randint(1, 3)
+        lines.append(f"**{rng.choice(COMPANIES)}** — {rng.choice(TITLES)}, {start} - {year}")
+        for _ in range(rng.randint(3, 5)):
+            result = rng.choice(RESULTS).format(n=rng.randint(2, 60))
+            lines.append(f"- {rng.choice(VERBS)} {rng.choice(OBJECTS)}, {result}.")
+        lines.append("")
+        year = start
+    lines += [
+        "**TECHNICAL SKILLS**",
+        ", ".join(rng.sample(SKILLS, 10)),
+        "",
+        "**EDUCATION**",
+        f"B.S. Computer Science, State University, {year - 4} - {year}",
+    ]
+    return "\n".join(lines)
+
+
+LOCATIONS = ['Remote', 'New York, NY', 'Austin, TX', 'Seattle, WA', 'London, UK', 'Berlin, Germany', 'Bangalore, India', 'Toronto, Canada']
+SENIORITY = ['Junior', '', 'Senior', 'Staff', 'Lead', 'Principal']
+SYLLABLES = ['ba', 'ko', 'ri', 'ten', 'mo', 'lu', 'sa', 'ver', 'di', 'na', 'pol', 'ex', 'tra', 'quin', 'zo', 'gen']
+
+
+def posting_vocabulary(size=20000):
+    """Deterministic pseudo-words standing in for the long tail of domain vocabulary."""
+    words = (''.join(parts) for length in (2, 3, 4) for parts in itertools.product(SYLLABLES, repeat=length))
+    return list(itertools.islice(words, size))
+
+
+def synthetic_job_postings(count, seed=0, filler_words=150):
+    """Returns `count` job postings ({'id', 'title', 'company', 'location', 'text'}) with realistic term statistics.
+
+    Requirements are drawn from the skill taxonomy; the rest of each posting from a
+    Zipf-distributed vocabulary, so a few terms are in most postings and most are rare.
+    """
+    rng = random.Random(seed)
+    skills = [skill for group in load_taxonomy().values() for skill in group]
+    vocabulary = posting_vocabulary()
+    cumulative = list(itertools.accumulate(1 / rank for rank in range(1, len(vocabulary) + 1)))
+    postings = []
+    for index in range(count):
+        title = f"{rng.choice(SENIORITY)} {rng.choice(TITLES)}".strip()
+        required = rng.sample(skills, rng.randint(4, 8))
+        filler = rng.choices(vocabulary, cum_weights=cumulative, k=filler_words)
+        text = "\n".join([
+            title,
+            f"We are hiring a {title} to {rng.choice(VERBS).lower()} {rng.choice(OBJECTS)}.",
+            "Requirements:",
+            *(f"- {rng.randint(2, 8)}+ years with {skill}" for skill in required),
+            " ".join(filler),
+        ])
+        postings.append({
+            'id': f"job-{seed}-{index}",
+            'title': title,
+            'company': rng.choice(COMPANIES),
+            'location': rng.choice(LOCATIONS),
+            'text': text,
+        })
+    return postings
+
+
+def build_corpus(seed=0):
+    """Returns {size_name: (markdown, pdf_bytes)} for every corpus size."""
+    corpus = {}
+    for index, (size, roles) in enumerate(SIZES.items()):
+        markdown = synthetic_resume(roles, seed=seed + index)
+        corpus[size] = (markdown, render_pdf(markdown, title=f"Synthetic resume ({size})"))
+    return corpus
+
+
+def write_corpus(directory, seed=0):
+    """Writes the corpus PDFs to a directory (for use with other tools) and returns their paths."""
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for size, (_, pdf) in build_corpus(seed).items():
+        path = os.path.join(directory, f"resume_{size}.pdf")
+        with open(path, 'wb') as f:
+            f.write(pdf)
+        paths.append(path)
+    return paths
@@ -0,0 +1,170 @@
+import time
+import json
+import random
+import asyncio
+import threading
+
+# --- Local Gemini Stand-In ---
+# Implements the parts of genai.Client the app uses (models.generate_content,
+# models.generate_content_stream and their client.aio equivalents) with configurable
+# latency, chunk timing and error injection, and answers structured-output calls with
+# canned JSON built from the request's response_schema.
+
+# Canned values for the schema fields used by /get_ats_score, /analyze_skill_gap and /chat
+CANNED_FIELDS = {
+    'ats_score': 78,
+    'deliberation_steps': 3,
+    'strengths': "<ul><li>Clear section headers</li><li>Quantified achievements</li><li>Relevant keywords</li></ul>",
+    'improvements': "<ul><li>Add a professional summary</li><li>Include Kubernetes experience</li><li>Tighten older roles</li></ul>",
+    'overall_assessment': "A well-structured resume that should parse cleanly in most ATS systems.",
+    'matching_skills': "<ul><li>Python</li><li>Flask</li><li>PostgreSQL</li></ul>",
+    'reply_text': "I tightened the summary and emphasised your backend experience.",
+    'updated_preview': "",
+    'reasoning_summary': "Kept the structure and strengthened the most relevant section.",
+}
+
+CANNED_DOCUMENT = """**JANE DOE**
+jane.doe@example.com | (555) 123-4567 | linkedin.com/in/janedoe
+
+**PROFESSIONAL SUMMARY**
+Backend engineer with 8 years of experience building Python services and data platforms.
+
+**EXPERIENCE**
+**Acme Corp** — Senior Software Engineer
+- Led the migration of 40 services to Kubernetes, cutting infrastructure costs by 30%.
+- Built Flask and PostgreSQL APIs serving 2M monthly users with 99.95% availability.
+- Mentored 5 engineers and introduced code review standards adopted across the team.
+
+**TECHNICAL SKILLS**
+Python, Flask, PostgreSQL, Docker, Kubernetes, AWS, Redis, CI/CD
+
+**EDUCATION**
+B.S. Computer Science, State University
+"""
+
+
+class FakeUsage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class FakeResponse:
+    """Quacks like a GenerateContentResponse (or one streamed chunk of it)."""
+
+    def __init__(self, text, prompt_tokens=0):
+        self.text = text
+        self.usage_metadata = FakeUsage(prompt_tokens, len(text) // 4)
+
+
+def canned_value(name, schema):
+    """Builds a value that satisfies a types.Schema, preferring the canned field values."""
+    kind = str(schema.type).rsplit('.', 1)[-1].upper()
+    if kind == 'OBJECT':
+        return {key: canned_value(key, value) for key, value in (schema.properties or {}).items()}
+    if kind == 'ARRAY':
+        # Empty lists are valid for every array in the app's schemas (e.g. "no patches")
+        return []
+    if name in CANNED_FIELDS:
+        return CANNED_FIELDS[name]
+    if kind in ('INTEGER', 'NUMBER'):
+        return 50
+    if kind == 'BOOLEAN':
+        return True
+    if schema.enum:
+        return schema.enum[0]
+    return f"Canned {name.replace('_', ' ')}."
+
+
+class FakeModels:
+    """Synchronous models API with latency and error injection."""
+
+    def __init__(self, latency=0.8, jitter=0.2, first_chunk_latency=0.3, chunk_delay=0.03, chunk_chars=40,
+                 error_rate=0.0, rate_limit_rate=0.0, seed=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.first_chunk_latency = first_chunk_latency
+        self.chunk_delay = chunk_delay
+        self.chunk_chars = chunk_chars
+        self.error_rate = error_rate
+        self.rate_limit_rate = rate_limit_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _roll(self):
+        """Counts the call, raises an injected error if one is due, and returns this call's latency."""
+        with self._lock:
+            self.calls += 1
+            roll = self._random.random()
+            latency = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+        if roll < self.rate_limit_rate + self.error_rate:
+            # Imported only when needed, so the stand-in does not load the SDK ahead of the app
+            from google.genai import errors
+        if roll < self.rate_limit_rate:
+            raise errors.ClientError(429, {'error': {'code': 429, 'message': 'Resource exhausted (injected)', 'status': 'RESOURCE_EXHAUSTED'}})
+        if roll < self.rate_limit_rate + self.error_rate:
+            raise errors.ServerError(503, {'error': {'code': 503, 'message': 'The model is overloaded (injected)', 'status': 'UNAVAILABLE'}})
+        return latency
+
+    def _text(self, contents, config):
+        schema = getattr(config, 'response_schema', None) if config is not None else None
+        if schema is not None:
+            return json.dumps(canned_value('', schema))
+        return CANNED_DOCUMENT
+
+    def _chunks(self, text):
+        return [text[index:index + self.chunk_chars] for index in range(0, len(text), self.chunk_chars)]
+
+    def generate_content(self, model, contents, config=None):
+        latency = self._roll()
+        time.sleep(latency)
+        return FakeResponse(self._text(contents, config), len(str(contents)) // 4)
+
+    def generate_content_stream(self, model, contents, config=None):
+        self._roll()
+        text = self._text(contents, config)
+        time.sleep(self.first_chunk_latency)
+        for index, chunk in enumerate(self._chunks(text)):
+            if index:
+                time.sleep(self.chunk_delay)
+            yield FakeResponse(chunk)
+
+
+class FakeAsyncModels:
+    """client.aio.models counterpart sharing the same settings and counters."""
+
+    def __init__(self, models):
+        self._models = models
+
+    async def generate_content(self, model, contents, config=None):
+        latency = self._models._roll()
+        await asyncio.sleep(latency)
+        return FakeResponse(self._models._text(contents, config), len(str(contents)) // 4)
+
+    async def generate_content_stream(self, model, contents, config=None):
+        models = self._models
+        models._roll()
+        text = models._text(contents, config)
+
+        async def chunks():
+            await asyncio.sleep(models.first_chunk_latency)
+            for index, chunk in enumerate(models._chunks(text)):
+                if index:
+                    await asyncio.sleep(models.chunk_delay)
+                yield FakeResponse(chunk)
+        return chunks()
+
+
+class FakeAio:
+    def __init__(self, models):
+        self.models = FakeAsyncModels(models)
+
+
+class FakeGeminiClient:
+    """Drop-in replacement for genai.Client in benchmarks. Never touches the network."""
+
+    def __init__(self, **settings):
+        self.models = FakeModels(**settings)
+        self.aio = FakeAio(self.models)
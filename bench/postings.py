@@ -0,0 +1,83 @@
+import sys
+import json
+import time
+import resource
+import argparse
+import statistics
+
+from bench.corpus import synthetic_job_postings, synthetic_resume
+from bench.run import percentile
+
+# --- Posting Index Benchmark ---
+# Indexes synthetic job postings at increasing corpus sizes and reports ingest time, index
+# size, memory and resume query latency, so matching can be checked at 100k postings.
+# Everything runs in-process; no Flask, no Gemini.
+#
+#   python -m bench.postings
+#   python -m bench.postings --sizes 1000,10000 --queries 50 --json
+
+DEFAULT_SIZES = '1000,10000,100000'
+
+
+def measure(size, queries, batch, top_k):
+    """Indexes `size` postings in batches and times `queries` resume searches against them."""
+    from postings import PostingIndex
+
+    index = PostingIndex()
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    ingest_seconds = 0.0
+    for start in range(0, size, batch):
+        # Generated per batch, so the generator's memory does not count against the index
+        postings = synthetic_job_postings(min(batch, size - start), seed=start)
+        started = time.perf_counter()
+        index.add(postings)
+        ingest_seconds += time.perf_counter() - started
+
+    latencies = []
+    for seed in range(queries + 1):
+        resume = synthetic_resume(6, seed=seed)
+        started = time.perf_counter()
+        index.search(resume, top_k)
+        latencies.append((time.perf_counter() - started) * 1000)
+    # The first query computes every term's BM25 impacts; later ones reuse them
+    first, latencies = latencies[0], latencies[1:]
+
+    return {
+        'postings': size,
+        'ingest_s': round(ingest_seconds, 2),
+        'ingest_per_s': round(size / ingest_seconds) if ingest_seconds else None,
+        **{key: value for key, value in index.stats().items() if key != 'postings'},
+        'max_rss_growth_mib': round((resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024, 1),
+        'first_query_ms': round(first, 2),
+        'p50_ms': round(statistics.median(latencies), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'max_ms': round(max(latencies), 2),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure job posting ingest and resume matching at scale.')
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help=f"Comma-separated corpus sizes (default: {DEFAULT_SIZES}).")
+    parser.add_argument('--queries', type=int, default=30, help='Resume queries per size (default: 30).')
+    parser.add_argument('--batch', type=int, default=1000, help='Postings per ingest call (default: 1000).')
+    parser.add_argument('--top-k', type=int, default=10, help='Postings returned per query (default: 10).')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+    args = parser.parse_args(argv)
+
+    results = []
+    for size in (int(value) for value in args.sizes.split(',') if value.strip()):
+        print(f"Indexing {size} postings...", file=sys.stderr)
+        results.append(measure(size, args.queries, args.batch, args.top_k))
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return 0
+    keys = list(results[0])
+    print(''.join(f"{key:>20}" for key in keys))
+    for result in results:
+        print(''.join(f"{str(result[key]):>20}" for key in keys))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,309 @@
+import io
+import os
+import sys
+import json
+import time
+import resource
+import argparse
+import tracemalloc
+import contextlib
+from concurrent.futures import ThreadPoolExecutor
+
+from export import render_docx
+from bench.corpus import JOB_DESCRIPTION, build_corpus, synthetic_job_postings
+from bench.fake_gemini import CANNED_DOCUMENT, FakeGeminiClient
+
+# --- Offline Benchmark ---
+# Drives every route in-process through Flask's test client with Gemini replaced by a local
+# stand-in, then reports latency percentiles, throughput, errors and memory per route.
+#
+#   python -m bench.run                              # every route, cold caches
+#   python -m bench.run --routes get_ats_score[llm] --concurrency 16 --requests 200
+#   python -m bench.run --json > baseline.json
+#   python -m bench.run --compare baseline.json      # exits 1 on a regression
+
+# Markers of a failure reported inside a 200 Server-Sent Events stream
+STREAM_ERROR_MARKERS = (b'event: error', b'event: stage_error')
+# Postings indexed for the matching routes; bench.postings measures the index at scale
+MATCH_POSTINGS = 2000
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+
+def job_description(index):
+    # A distinct JD per request, so request deduplication and response caches never short-circuit a call
+    return f"{JOB_DESCRIPTION}\nRequisition #{index}"
+
+
+class Scenarios:
+    """One callable per benchmarked route: each takes (client, index) and returns the final response."""
+
+    def __init__(self, services, corpus, resume_size):
+        self.services = services
+        self.corpus = corpus
+        self.resume_markdown, self.resume_pdf = corpus[resume_size]
+
+    def upload(self, document, index, filename='resume.pdf', **form):
+        return {'resume': (io.BytesIO(document), filename), **form}
+
+    def resume_id(self):
+        return self.services.document_store.put(self.resume_markdown, 'resume')
+
+    def build(self):
+        scenarios = {
+            'index': lambda c, i: c.get('/'),
+            'ats_checker_page': lambda c, i: c.get('/ats-checker'),
+            'resume_generator_page': lambda c, i: c.get('/resume-generator'),
+            'cover_letter_page': lambda c, i: c.get('/cover-letter'),
+            'skill_gap_page': lambda c, i: c.get('/skill-gap'),
+            'rewrite_resume': lambda c, i: c.post(
+                '/rewrite_resume', data=self.upload(self.resume_pdf, i, job_description=job_description(i))),
+            'rewrite_resume_stream': lambda c, i: c.post(
+                '/rewrite_resume_stream', data=self.upload(self.resume_pdf, i, job_description=job_description(i))),
+            'upload_resume_for_cover_letter': lambda c, i: c.post(
+                '/upload_resume_for_cover_letter', data=self.upload(self.resume_pdf, i)),
+            'upload_resume_for_skill_gap': lambda c, i: c.post(
+                '/upload_resume_for_skill_gap', data=self.upload(self.resume_pdf, i)),
+            'documents': lambda c, i: c.post('/documents', json={'text': job_description(i)}),
+            'document_structure': lambda c, i: c.get(f"/documents/{self.resume_id()}/structure"),
+            'generate_cover_letter': lambda c, i: c.post('/generate_cover_letter', json={
+                'job_description': job_description(i), 'resume_id': self.resume_id()}),
+            'generate_cover_letter_stream': lambda c, i: c.post('/generate_cover_letter_stream', json={
+                'job_description': job_description(i), 'resume_id': self.resume_id()}),
+            'batch_score': lambda c, i: c.post('/batch_score', json={
+                'resume_id': self.resume_id(),
+                'job_descriptions': [job_description(i * 10 + n) for n in range(10)],
+                'top_k': 3,
+            }),
+            'full_analysis': lambda c, i: c.post('/full_analysis', json={
+                'job_description': job_description(i), 'resume_id': self.resume_id()}),
+            'jobs_rewrite_resume': lambda c, i: self.job(c, c.post(
+                '/jobs/rewrite_resume', data=self.upload(self.resume_pdf, i, job_description=job_description(i)))),
+            'jobs_generate_cover_letter': lambda c, i: self.job(c, c.post('/jobs/generate_cover_letter', json={
+                'job_description': job_description(i), 'resume_id': self.resume_id()})),
+            'chat': lambda c, i: c.post('/chat', json={
+                'message': f"Make the summary punchier ({i})",
+                'current_preview': self.resume_markdown,
+                'job_description': job_description(i),
+            }),
+            'chat_edit': lambda c, i: c.post('/chat/edit', json={
+                'message': f"Make the summary punchier ({i})",
+                'current_preview': self.resume_markdown,
+                'job_description': job_description(i),
+            }),
+            'export_pdf': lambda c, i: c.post('/export', json={
+                'markdown': f"{CANNED_DOCUMENT}\nRevision {i}", 'format': 'pdf', 'filename': 'resume'}),
+            'export_docx': lambda c, i: c.post('/export', json={
+                'markdown': f"{CANNED_DOCUMENT}\nRevision {i}", 'format': 'docx', 'filename': 'resume'}),
+        }
+        for mode in ('local', 'llm', 'hybrid', 'stream'):
+            scenarios[f"get_ats_score[{mode}]"] = lambda c, i, mode=mode: c.post('/get_ats_score', json={
+                'original_resume': self.resume_markdown, 'job_description': job_description(i), 'mode': mode})
+            scenarios[f"analyze_skill_gap[{mode}]"] = lambda c, i, mode=mode: c.post('/analyze_skill_gap', json={
+                'resume_id': self.resume_id(), 'job_description': job_description(i), 'mode': mode})
+        # Extraction cost grows with the PDF, so the ATS upload runs once per corpus size
+        for size, (_, pdf) in self.corpus.items():
+            scenarios[f"upload_resume_for_ats[{size}]"] = lambda c, i, pdf=pdf: c.post(
+                '/upload_resume_for_ats', data=self.upload(pdf, i))
+        # Word resumes are streamed from their XML instead of going through PyPDF2
+        docx = render_docx(self.resume_markdown)
+        scenarios['upload_resume_for_ats[docx]'] = lambda c, i: c.post(
+            '/upload_resume_for_ats', data=self.upload(docx, i, filename='resume.docx'))
+        # Matching searches a fixed posting index; only the ranked shortlist is analysed
+        self.services.posting_index.add(synthetic_job_postings(MATCH_POSTINGS))
+        scenarios['postings_match'] = lambda c, i: c.post('/postings/match', json={
+            'resume_text': f"{self.resume_markdown}\nRevision {i}", 'top_k': 10})
+        for mode in ('local', 'llm'):
+            scenarios[f"postings_match[{mode}]"] = lambda c, i, mode=mode: c.post('/postings/match', json={
+                'resume_text': f"{self.resume_markdown}\nRevision {i}", 'top_k': 10, 'skill_gap': mode, 'skill_gap_top': 3})
+        return scenarios
+
+    def job(self, client, submitted):
+        """Follows a submitted job's event stream to the end, so the job's full latency is measured."""
+        if submitted.status_code != 202:
+            return submitted
+        return client.get(submitted.get_json()['events_url'])
+
+
+def run_once(flask_app, scenario, index):
+    """Runs one request, reading streamed bodies to the end. Returns (seconds, ok)."""
+    started = time.perf_counter()
+    try:
+        response = scenario(flask_app.test_client(), index)
+        body = response.get_data()
+        ok = response.status_code < 400 and not any(marker in body for marker in STREAM_ERROR_MARKERS)
+    except Exception as e:
+        print(f"Benchmark request failed: {e}", file=sys.stderr)
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+def measure_latency(flask_app, scenario, requests, concurrency, offset):
+    """Runs `requests` calls with `concurrency` in flight and returns the latency / throughput summary."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(lambda index: run_once(flask_app, scenario, offset + index), range(requests)))
+    elapsed = time.perf_counter() - started
+    latencies = [seconds * 1000 for seconds, _ in results]
+    return {
+        'requests': requests,
+        'errors': sum(1 for _, ok in results if not ok),
+        'p50_ms': round(percentile(latencies, 0.50), 2),
+        'p95_ms': round(percentile(latencies, 0.95), 2),
+        'p99_ms': round(percentile(latencies, 0.99), 2),
+        'throughput_rps': round(requests / elapsed, 2) if elapsed else None,
+    }
+
+
+def measure_memory(flask_app, scenario, requests, offset):
+    """Runs requests one at a time under tracemalloc and returns the peak Python allocation and RSS growth.
+
+    Kept separate from the latency pass: tracemalloc slows every allocation down.
+    """
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    try:
+        for index in range(requests):
+            run_once(flask_app, scenario, offset + index)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is a high-water mark (KiB on Linux), so this only shows growth beyond earlier routes
+    return {
+        'peak_alloc_kib': round(peak / 1024, 1),
+        'max_rss_growth_kib': rss_after - rss_before,
+    }
+
+
+def load_app(args):
+    """Builds the app with Gemini replaced by the stand-in and caches set up for the run.
+
+    Returns (services module, Flask app, stand-in client).
+    """
+    os.environ.setdefault('GEMINI_API_KEY', 'benchmark')
+    import services
+    from app import create_app
+    from extraction import ExtractionCache
+    from llm import AsyncRunner
+
+    fake = FakeGeminiClient(
+        latency=args.latency,
+        jitter=args.jitter,
+        first_chunk_latency=args.first_chunk_latency,
+        chunk_delay=args.chunk_delay,
+        chunk_chars=args.chunk_chars,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        seed=args.seed,
+    )
+    services.llm.client = fake
+    if args.async_llm:
+        services.llm.use_async = True
+        services.llm.runner = services.llm.runner or AsyncRunner()
+    if not args.warm_caches:
+        # Cold runs measure the real work: no response, extraction or export cache hits
+        services.llm.cached_namespaces = set()
+        services.extraction_service.cache = ExtractionCache(max_entries=0)
+        services.export_cache.max_bytes = 0
+    return services, create_app(), fake
+
+
+def compare(results, baseline_path, threshold):
+    """Returns regression messages for routes whose p95 grew, or throughput fell, by more than threshold."""
+    with open(baseline_path, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)['routes']
+    regressions = []
+    for route, current in results.items():
+        before = baseline.get(route)
+        if not before:
+            continue
+        if current['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            regressions.append(f"{route}: p95 {before['p95_ms']}ms -> {current['p95_ms']}ms")
+        if before['throughput_rps'] and current['throughput_rps'] < before['throughput_rps'] * (1 - threshold):
+            regressions.append(f"{route}: throughput {before['throughput_rps']} -> {current['throughput_rps']} req/s")
+        if current['errors'] > before['errors']:
+            regressions.append(f"{route}: errors {before['errors']} -> {current['errors']}")
+    return regressions
+
+
+def print_table(results):
+    columns = ('requests', 'errors', 'p50_ms', 'p95_ms', 'p99_ms', 'throughput_rps', 'peak_alloc_kib', 'max_rss_growth_kib')
+    width = max(len(route) for route in results) + 2
+    print('route'.ljust(width) + ''.join(column.rjust(19) for column in columns))
+    for route, result in results.items():
+        print(route.ljust(width) + ''.join(str(result.get(column, '-')).rjust(19) for column in columns))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline latency / throughput / memory benchmark for every route.')
+    parser.add_argument('--routes', help='Comma-separated route names to run (default: all). Use --list to see them.')
+    parser.add_argument('--list', action='store_true', help='List route names and exit.')
+    parser.add_argument('--requests', type=int, default=20, help='Requests per route (default: 20).')
+    parser.add_argument('--concurrency', type=int, default=4, help='Requests in flight per route (default: 4).')
+    parser.add_argument('--memory-requests', type=int, default=3, help='Sequential requests per route for the memory pass; 0 skips it.')
+    parser.add_argument('--resume-size', default='2_pages', help='Corpus resume used by non-size routes (default: 2_pages).')
+    parser.add_argument('--latency', type=float, default=0.8, help='Fake Gemini latency in seconds (default: 0.8).')
+    parser.add_argument('--jitter', type=float, default=0.2, help='Uniform +/- latency jitter in seconds (default: 0.2).')
+    parser.add_argument('--first-chunk-latency', type=float, default=0.3, help='Seconds before the first streamed chunk.')
+    parser.add_argument('--chunk-delay', type=float, default=0.03, help='Seconds between streamed chunks.')
+    parser.add_argument('--chunk-chars', type=int, default=40, help='Characters per streamed chunk.')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Fraction of calls failing with 503.')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Fraction of calls failing with 429.')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for the corpus, jitter and error injection.')
+    parser.add_argument('--async-llm', action='store_true', help='Send Gemini calls through the async client (LLM_ASYNC=1).')
+    parser.add_argument('--warm-caches', action='store_true', help='Keep the response / extraction / export caches on.')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON (usable as a --compare baseline).')
+    parser.add_argument('--compare', help='Baseline JSON from an earlier --json run; exits 1 on a regression.')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed p95 / throughput change for --compare (default: 0.2).')
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.seed)
+    if args.resume_size not in corpus:
+        parser.error(f"--resume-size must be one of: {', '.join(corpus)}")
+    # The app logs with print(); keep stdout for the report so --json output stays parseable
+    with contextlib.redirect_stdout(sys.stderr):
+        services, flask_app, fake = load_app(args)
+    scenarios = Scenarios(services, corpus, args.resume_size).build()
+
+    if args.list:
+        print('\n'.join(scenarios))
+        return 0
+    selected = [name.strip() for name in args.routes.split(',')] if args.routes else list(scenarios)
+    unknown = [name for name in selected if name not in scenarios]
+    if unknown:
+        parser.error(f"Unknown routes: {', '.join(unknown)}. Use --list to see them.")
+
+    results = {}
+    with contextlib.redirect_stdout(sys.stderr):
+        for name in selected:
+            print(f"Running {name}...")
+            results[name] = measure_latency(flask_app, scenarios[name], args.requests, args.concurrency, offset=0)
+            if args.memory_requests:
+                results[name].update(measure_memory(flask_app, scenarios[name], args.memory_requests, offset=args.requests))
+
+    report = {
+        'settings': {key: value for key, value in vars(args).items() if key not in ('json', 'compare', 'list')},
+        'gemini_calls': fake.models.calls,
+        'routes': results,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_table(results)
+        print(f"\nFake Gemini calls: {fake.models.calls}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for message in regressions:
+            print(f"REGRESSION {message}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
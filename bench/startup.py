@@ -0,0 +1,100 @@
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+import contextlib
+
+# --- Worker Startup Benchmark ---
+# Starts the app in fresh interpreters, as a gunicorn worker would, and reports how long the
+# import and create_app() take, resident memory, and the latency of the first requests, with
+# and without warm-up. Gemini is replaced by the local stand-in; nothing leaves the machine.
+#
+#   python -m bench.startup
+#   python -m bench.startup --runs 10 --json
+
+
+def resident_kib():
+    with open('/proc/self/statm') as f:
+        return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') // 1024
+
+
+def child(warm):
+    """Runs inside the fresh interpreter and prints one JSON measurement."""
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        from app import create_app
+        flask_app = create_app()
+    result = {'create_app_ms': (time.perf_counter() - started) * 1000, 'rss_after_create_kib': resident_kib()}
+
+    import services
+    if warm:
+        with contextlib.redirect_stdout(sys.stderr):
+            services.warm_up()
+        result['warm_up_ms'] = services.startup_stats['warmup_seconds'] * 1000
+    result['rss_ready_kib'] = resident_kib()
+
+    from bench.corpus import JOB_DESCRIPTION, build_corpus
+    from bench.fake_gemini import FakeGeminiClient
+    services.llm.client = FakeGeminiClient(latency=0, jitter=0)
+    client = flask_app.test_client()
+
+    started = time.perf_counter()
+    client.get('/healthz')
+    result['first_healthz_ms'] = (time.perf_counter() - started) * 1000
+
+    _, pdf = build_corpus()['1_page']
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(sys.stderr):
+        response = client.post('/rewrite_resume', data={
+            'job_description': JOB_DESCRIPTION,
+            'resume': (io.BytesIO(pdf), f"startup_{os.getpid()}.pdf"),
+        })
+    result['first_gemini_request_ms'] = (time.perf_counter() - started) * 1000
+    result['first_gemini_request_ok'] = response.status_code == 200
+    result['rss_after_requests_kib'] = resident_kib()
+    print(json.dumps(result))
+
+
+def measure(warm, runs):
+    """Runs the child `runs` times and returns the median of each measurement."""
+    samples = []
+    env = dict(os.environ, GEMINI_API_KEY=os.getenv('GEMINI_API_KEY', 'benchmark'))
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-m', 'bench.startup', '--child'] + (['--warm'] if warm else []),
+            capture_output=True, text=True, check=True, env=env,
+        ).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+    return {key: (round(statistics.median(s[key] for s in samples), 1) if not isinstance(samples[0][key], bool)
+                  else all(s[key] for s in samples)) for key in samples[0]}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Measure worker startup time and memory in fresh processes.')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh processes per mode (default: 5).')
+    parser.add_argument('--json', action='store_true', help='Print results as JSON.')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--warm', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        child(args.warm)
+        return 0
+
+    report = {'runs': args.runs, 'lazy': measure(False, args.runs), 'warmed': measure(True, args.runs)}
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0
+    keys = list(report['warmed'])
+    print(f"{'metric (median of ' + str(args.runs) + ' runs)':<32}{'lazy':>14}{'warmed':>14}")
+    for key in keys:
+        print(f"{key:<32}{str(report['lazy'].get(key, '-')):>14}{str(report['warmed'][key]):>14}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+import os
+import json
+from flask import Blueprint, request, jsonify
+from llm import LazyModule
+from chat_edits import ChatSessionStore, PATCH_OPERATIONS, apply_patches, label_sections, split_sections
+from metrics import record_error
+from governance import UpstreamUnavailable
+from documents import json_object
+from services import document_store, llm
+
+# --- Chat Routes ---
+# The conversational copilot: full-document replies (/chat) and section patches over a
+# server-side session (/chat/edit).
+
+bp = Blueprint('chat', __name__)
+
+# Loaded on the first Gemini call rather than at worker startup
+types = LazyModule('google.genai.types')
+
+# --- CHAT BOT ROUTE (Integration of your chat logic) ---
+@bp.route('/chat', methods=['POST'])
+def chat():
+    """Conversational endpoint to assist with resume editing and advice."""
+    if not llm.client:
+        return jsonify({'error': 'Gemini Client not initialized.'}), 500
+
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json'}), 400
+
+    body = json_object(request.get_json(silent=True))
+    user_message = body.get('message', '').strip()
+    job_description = (document_store.resolve(body, 'job_description', 'job_description_id') or '').strip()
+    # The current preview is sent as HTML from the editable box, or as the id of a stored preview
+    current_preview = (document_store.resolve(body, 'current_preview', 'preview_id') or '').strip()
+
+    if not user_message:
+        return jsonify({'error': 'Missing message'}), 400
+
+    # System instruction for the chat model
+    system_instruction = (
+        "You are a friendly, concise resume and cover letter writing copilot for end users. "
+        "Help improve the user's resume or cover letter for a given job description. "
+        "When the user asks for a change, produce the updated full text (resume or cover letter), formatted with clear Markdown (bold for sections, bullet points). "
+        "For cover letters, maintain proper business letter formatting with appropriate spacing and structure. "
+        "If the user is only asking for advice, set 'updated_preview' to an empty string. "
+        "Keep the tone professional and helpful. "
+        "Determine from context whether the user is editing a resume or cover letter."
+    )
+
+    # Structured output for predictable response handling in the frontend
+    response_schema = types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "reply_text": types.Schema(type=types.Type.STRING, description="Short assistant reply to display in chat."),
+            "updated_preview": types.Schema(type=types.Type.STRING, description="If the user requested edits, the fully updated resume text in Markdown. Otherwise empty string."),
+            "reasoning_summary": types.Schema(type=types.Type.STRING, description="One or two concise sentences that explain the assistant's approach."),
+            "deliberation_steps": types.Schema(type=types.Type.INTEGER, description="Rough step-count the model considered (1-10)."),
+        },
+        required=["reply_text", "updated_preview", "reasoning_summary", "deliberation_steps"]
+    )
+
+    prompt_parts = []
+    if job_description:
+        prompt_parts.append(f"Job Description:\n---\n{job_description}\n---\n")
+    if current_preview:
+        # Check if this is a cover letter or resume based on prefix
+        if current_preview.startswith("COVER_LETTER:"):
+            content = current_preview.replace("COVER_LETTER:", "")
+            prompt_parts.append(f"Current Cover Letter Preview (Raw HTML/Text):\n---\n{content}\n---\n")
+        elif current_preview.startswith("RESUME:"):
+            content = current_preview.replace("RESUME:", "")
+            prompt_parts.append(f"Current Resume Preview (Raw HTML/Text):\n---\n{content}\n---\n")
+        else:
+            # Legacy support for old format
+            prompt_parts.append(f"Current Resume Preview (Raw HTML/Text):\n---\n{current_preview}\n---\n")
+    prompt_parts.append(f"User Message:\n---\n{user_message}\n---\n")
+    prompt_parts.append(
+        "If the user's message requests modifications, update the document fully and return it as updated_preview in Markdown format. "
+        "Prefix your response with 'COVER_LETTER:' if editing a cover letter, or 'RESUME:' if editing a resume. "
+        "If no update is needed, set updated_preview to an empty string. "
+        "Do not include any introductory dialogue in the 'updated_preview' field."
+    )
+
+    try:
+        gemini_response = llm.generate_content(
+            model='gemini-2.5-pro',
+            contents="\n\n".join(prompt_parts),
+            config=types.GenerateContentConfig(
+                system_instruction=system_instruction,
+                response_mime_type="application/json",
+                response_schema=response_schema,
+                temperature=0.4
+            ),
+            cache_namespace='chat',
+        )
+
+        data = json.loads(gemini_response.text)
+        
+        # Prepare response data, using 'None' for empty strings to simplify frontend logic
+        reply_text = (data.get('reply_text') or '').strip()
+        updated_preview = (data.get('updated_preview') or '').strip()
+        reasoning_summary = (data.get('reasoning_summary') or '').strip()
+        deliberation_steps = data.get('deliberation_steps')
+
+        return jsonify({
+            'reply_text': reply_text,
+            'updated_preview': updated_preview or None, # Use None for empty strings
+            # Lets the client refer to the new preview by id on the next turn instead of resending it
+            'preview_id': document_store.put(updated_preview, 'preview') if updated_preview else None,
+            'reasoning_summary': reasoning_summary or None,
+            'deliberation_steps': deliberation_steps if isinstance(deliberation_steps, int) else None,
+            'routing': gemini_response.routing,
+        })
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
+        print(f"Chat API Error: {e}")
+        record_error('chat', e)
+        return jsonify({'error': f"Failed to process chat: {e}"}), 500
+
+# --- INCREMENTAL CHAT EDIT ROUTE ---
+CHAT_RECENT_TURNS = int(os.getenv('CHAT_RECENT_TURNS', '4'))
+chat_sessions = ChatSessionStore(
+    max_sessions=int(os.getenv('CHAT_MAX_SESSIONS', '2000')),
+    ttl=int(os.getenv('CHAT_SESSION_TTL', str(2 * 3600))),
+    # Set when several workers serve the app (gunicorn.conf.py does so by default)
+    sqlite_path=os.getenv('CHAT_SESSION_SQLITE') or None,
+)
+
+@bp.route('/chat/edit', methods=['POST'])
+def chat_edit():
+    """Chat endpoint that edits a server-side copy of the document with section-level patches.
+
+    The first turn sends the document (inline or as preview_id) and gets a session_id back;
+    later turns only need the session_id and the message. The model returns just the
+    sections it changes, so a small edit costs a small response.
+    """
+    if not llm.client:
+        return jsonify({'error': 'Gemini Client not initialized.'}), 500
+
+    body = json_object(request.get_json(silent=True))
+    if not isinstance(body.get('message') or '', str) or not isinstance(body.get('session_id') or '', str):
+        return jsonify({'error': 'message and session_id must be strings'}), 400
+    user_message = (body.get('message') or '').strip()
+    kind = body.get('document_kind', 'resume')
+
+    if not user_message:
+        return jsonify({'error': 'Missing message'}), 400
+    if kind not in ('resume', 'cover_letter'):
+        return jsonify({'error': "Invalid document_kind. Use 'resume' or 'cover_letter'."}), 400
+
+    document = document_store.resolve(body, 'current_preview', 'preview_id')
+    job_description = document_store.resolve(body, 'job_description', 'job_description_id')
+    session = chat_sessions.get(body['session_id']) if body.get('session_id') else None
+
+    if session is None:
+        if not document:
+            return jsonify({'error': 'Missing document for a new chat session (the previous session may have expired)'}), 400
+        session = chat_sessions.create(kind, document, document_store.put(document, 'preview'), job_description or '')
+    else:
+        # The user may have edited the document by hand, or switched to the cover letter, since the last turn
+        if document and (document_store.put(document, 'preview') != session.document_id or kind != session.kind):
+            session.document, session.kind = document, kind
+            session.document_id = document_store.put(document, 'preview')
+        if job_description is not None:
+            session.job_description = job_description
+
+    document_label = 'Cover Letter' if session.kind == 'cover_letter' else 'Resume'
+    system_instruction = (
+        "You are a friendly, concise resume and cover letter writing copilot for end users. "
+        "Help improve the user's resume or cover letter for a given job description. "
+        "The document is split into numbered sections labelled [SECTION n: TITLE]; name the section a patch applies to by that label, e.g. '3: EXPERIENCE'. "
+        "When the user asks for a change, return ONLY the sections that change as patches: "
+        "'replace' a section with its complete new text (including its header line), "
+        "'insert_after' a section to add a complete new section, or 'delete' a section. "
+        "Never return sections that do not change. Use clear Markdown (bold for section headers, bullet points). "
+        "If the user is only asking for advice, return an empty patches list. "
+        "Keep the tone professional and helpful."
+    )
+
+    # Stable content (job description, then document) goes first so repeated turns share a prompt prefix
+    prompt_parts = []
+    if session.job_description:
+        prompt_parts.append(f"Job Description:\n---\n{session.job_description}\n---\n")
+    prompt_parts.append(
+        f"Current {document_label} (sections labelled):\n---\n"
+        f"{label_sections(split_sections(session.document, session.kind))}\n---\n"
+    )
+    history = session.history_prompt()
+    if history:
+        prompt_parts.append(f"Conversation so far:\n---\n{history}\n---\n")
+    prompt_parts.append(f"User Message:\n---\n{user_message}\n---\n")
+
+    response_schema = types.Schema(
+        type=types.Type.OBJECT,
+        properties={
+            "reply_text": types.Schema(type=types.Type.STRING, description="Short assistant reply to display in chat."),
+            "patches": types.Schema(
+                type=types.Type.ARRAY,
+                description="Section-level edits to apply. Empty if no change is needed.",
+                items=types.Schema(
+                    type=types.Type.OBJECT,
+                    properties={
+                        "operation": types.Schema(type=types.Type.STRING, enum=list(PATCH_OPERATIONS)),
+                        "section": types.Schema(type=types.Type.STRING, description="Number label of the section to change, or to insert after, as in its [SECTION n: ...] tag, e.g. '3: EXPERIENCE'."),
+                        "content": types.Schema(type=types.Type.STRING, description="Complete new section text in Markdown, including its header line. Empty for delete."),
+                    },
+                    required=["operation", "section"],
+                ),
+            ),
+            "reasoning_summary": types.Schema(type=types.Type.STRING, description="One or two concise sentences that explain the assistant's approach."),
+        },
+        required=["reply_text", "patches", "reasoning_summary"]
+    )
+
+    try:
+        gemini_response = llm.generate_content(
+            model='gemini-2.5-pro',
+            contents="\n\n".join(prompt_parts),
+            config=types.GenerateContentConfig(
+                system_instruction=system_instruction,
+                response_mime_type="application/json",
+                response_schema=response_schema,
+                temperature=0.4
+            ),
+            cache_namespace='chat',
+        )
+        data = json.loads(gemini_response.text)
+    except UpstreamUnavailable:
+        raise
+    except Exception as e:
+        print(f"Chat Edit API Error: {e}")
+        record_error('chat_edit', e)
+        return jsonify({'error': f"Failed to process chat: {e}"}), 500
+
+    reply_text = (data.get('reply_text') or '').strip()
+    patches = [patch for patch in (data.get('patches') or []) if isinstance(patch, dict)]
+    updated_document, applied, skipped = apply_patches(session.document, patches, session.kind)
+
+    if applied:
+        session.document = updated_document
+        session.document_id = document_store.put(updated_document, 'preview')
+    session.add_turn(user_message, reply_text, [patch.get('section', '') for patch in applied], CHAT_RECENT_TURNS)
+    chat_sessions.save(session)
+
+    return jsonify({
+        'session_id': session.id,
+        'reply_text': reply_text,
+        'patches': applied,
+        'skipped_patches': skipped,
+        # The full document is returned for rendering; only the patches came from the model
+        'updated_preview': updated_document if applied else None,
+        'preview_id': session.document_id,
+        'document_kind': session.kind,
+        'reasoning_summary': (data.get('reasoning_summary') or '').strip() or None,
+        'routing': gemini_response.routing,
+    })
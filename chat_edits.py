@@ -0,0 +1,296 @@
+import re
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from collections import OrderedDict
+
+# --- Incremental Chat Edits ---
+# Instead of regenerating the whole document on every chat turn, the model returns
+# section-level patches which the server applies to its own copy of the document.
+# Conversation state lives server-side; older turns are condensed so the prompt does
+# not grow without bound. With a SQLite file configured, sessions are kept there instead of
+# in the worker's memory, so any worker can serve the next turn.
+
+PATCH_OPERATIONS = ('replace', 'insert_after', 'delete')
+
+# Resume section headers: **BOLD** lines, short ALL-CAPS lines, or short Title lines ending in a colon.
+# Caps headers have no commas, so a skills line such as "AWS, GCP, SQL" stays content.
+_HEADER_RE = re.compile(
+    r'^\s*(?:\*\*\s*(?P<bold>[^*\n]{2,60}?)\s*\*\*\s*:?'
+    r'|(?P<caps>[A-Z][A-Z0-9 &/\-]{2,60}?)\s*:?'
+    r'|(?P<colon>[A-Z][A-Za-z &/\-]{2,40}):)\s*$'
+)
+PREAMBLE = 'HEADER'
+# A patch's section as label_sections numbers it: "3: EXPERIENCE", "SECTION 3", or just "3"
+_LABEL_RE = re.compile(r'^\s*\[?\s*(?:section\s*)?(\d+)\s*(?::|\]|$)', re.IGNORECASE)
+
+
+def _header_title(line):
+    """Returns the upper-cased section title if the line is a section header, else None."""
+    match = _HEADER_RE.match(line)
+    if not match:
+        return None
+    return (match.group('bold') or match.group('caps') or match.group('colon')).strip().upper()
+
+
+def _normalize_title(title):
+    return re.sub(r'[^a-z0-9]+', ' ', title.lower()).strip()
+
+
+def _split_layout(text, kind):
+    """Splits a document into (prefix, [[title, body, separator]], suffix), keeping its original spacing.
+
+    The document is prefix + body + separator + ... + body + suffix: each separator is the
+    whitespace that followed its section, and is None for the last section.
+    """
+    if kind == 'cover_letter':
+        # Paragraphs and the blank-line runs between them alternate
+        parts = re.split(r'(\n\s*\n)', text)
+        chunks, count = [], 0
+        for index, part in enumerate(parts):
+            if index % 2 == 0 and part.strip():
+                count += 1
+                chunks.append((f"PARAGRAPH {count}", part))
+            else:
+                chunks.append((None, part))
+    else:
+        chunks, title, lines = [], PREAMBLE, []
+        for line in text.splitlines(keepends=True):
+            if _header_title(line) and lines:
+                chunks.append((title, ''.join(lines)))
+                lines = []
+            if _header_title(line):
+                title = _header_title(line)
+            lines.append(line)
+        chunks.append((title, ''.join(lines)))
+
+    prefix, sections, pending = '', [], ''
+    for title, chunk in chunks:
+        if title is None or not chunk.strip():
+            pending += chunk
+            continue
+        body = chunk.strip('\n')
+        leading = chunk[:len(chunk) - len(chunk.lstrip('\n'))]
+        if sections:
+            sections[-1][2] = pending + leading
+        else:
+            prefix = pending + leading
+        sections.append([title, body, None])
+        pending = chunk[len(leading) + len(body):]
+    return prefix, sections, pending
+
+
+def split_sections(text, kind='resume'):
+    """Splits a document into [(title, section_text)].
+
+    Resumes are split at section headers (anything before the first header is the HEADER
+    section); cover letters have no headers, so each paragraph is its own section.
+    """
+    _, sections, _ = _split_layout(text, kind)
+    return [(title, body) for title, body, _ in sections]
+
+
+def label_sections(sections):
+    """Renders sections with numbered labels ("[SECTION 3: EXPERIENCE]") so the model can name the one it wants to change.
+
+    The number is what identifies a section: resumes often repeat a title (two EXPERIENCE blocks, say).
+    """
+    return '\n\n'.join(f"[SECTION {number}: {title}]\n{body}" for number, (title, body) in enumerate(sections, 1))
+
+
+def _find_section(sections, label):
+    """Returns (position, None) of the section a patch names, or (None, reason) if it names none.
+
+    Numbers refer to the document as labelled, before any patch moved sections around. A bare
+    title is accepted only when a single section has it.
+    """
+    match = _LABEL_RE.match(label)
+    if match:
+        number = int(match.group(1))
+        position = next((i for i, section in enumerate(sections) if section[3] == number), None)
+        return (position, None) if position is not None else (None, 'section not found')
+    target = _normalize_title(label)
+    positions = [i for i, section in enumerate(sections) if _normalize_title(section[0]) == target]
+    if len(positions) > 1:
+        return None, 'ambiguous section title; use its number'
+    return (positions[0], None) if positions else (None, 'section not found')
+
+
+def apply_patches(text, patches, kind='resume'):
+    """Applies patches to a document and returns (new_text, applied, skipped).
+
+    Each patch is {'operation': 'replace'|'insert_after'|'delete', 'section': label, 'content': text},
+    where the label is a section's number from label_sections (or its title, if no other section has it).
+    For 'insert_after', 'content' is the complete new section including its header line.
+    Untouched sections keep their original spacing; new ones are separated by a blank line.
+    """
+    prefix, sections, suffix = _split_layout(text, kind)
+    for number, section in enumerate(sections, 1):
+        section.append(number)
+    applied, skipped = [], []
+    for patch in patches:
+        operation = patch.get('operation')
+        content = (patch.get('content') or '').strip('\n')
+        index, reason = _find_section(sections, str(patch.get('section') or ''))
+
+        if operation not in PATCH_OPERATIONS:
+            skipped.append({**patch, 'reason': 'unknown operation'})
+        elif operation == 'insert_after' and content:
+            # Inserting after a missing (or ambiguous) section appends at the end rather than losing the content
+            position = len(sections) if index is None else index + 1
+            title = _header_title(content.splitlines()[0]) if kind != 'cover_letter' else None
+            sections.insert(position, [title or 'NEW SECTION', content, None, None])
+            applied.append(patch)
+        elif index is None:
+            skipped.append({**patch, 'reason': reason})
+        elif operation == 'replace' and content:
+            sections[index][1] = content
+            applied.append(patch)
+        elif operation == 'delete':
+            del sections[index]
+            applied.append(patch)
+        else:
+            skipped.append({**patch, 'reason': 'missing content'})
+
+    parts = [prefix]
+    for position, (_, body, separator, _) in enumerate(sections):
+        parts.append(body)
+        if position < len(sections) - 1:
+            parts.append(separator if separator is not None else '\n\n')
+    parts.append(suffix)
+    return ''.join(parts), applied, skipped
+
+
+class ChatSession:
+    """Server-side state of one editing conversation."""
+
+    def __init__(self, kind, document, document_id, job_description):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.document = document
+        self.document_id = document_id
+        self.job_description = job_description
+        self.turns = []
+        self.summary = []
+        self.touched_at = time.time()
+
+    def to_dict(self):
+        return {
+            'id': self.id, 'kind': self.kind, 'document': self.document, 'document_id': self.document_id,
+            'job_description': self.job_description, 'turns': self.turns, 'summary': self.summary,
+            'touched_at': self.touched_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        session = cls(data['kind'], data['document'], data['document_id'], data['job_description'])
+        session.id = data['id']
+        session.turns = [tuple(turn) for turn in data['turns']]
+        session.summary = data['summary']
+        session.touched_at = data['touched_at']
+        return session
+
+    def add_turn(self, user_message, reply_text, changed_sections, keep_recent):
+        """Records a turn, condensing the oldest turns into one-line summaries beyond keep_recent."""
+        self.turns.append((user_message, reply_text, changed_sections))
+        while len(self.turns) > keep_recent:
+            old_message, _, old_changes = self.turns.pop(0)
+            change_note = f" (changed: {', '.join(old_changes)})" if old_changes else ""
+            self.summary.append(f"- User asked: {old_message[:160]}{change_note}")
+
+    def history_prompt(self):
+        """Condensed older turns followed by the recent turns verbatim."""
+        parts = []
+        if self.summary:
+            parts.append("Earlier in this conversation:\n" + "\n".join(self.summary))
+        for user_message, reply_text, changed_sections in self.turns:
+            change_note = f"\n(Sections changed: {', '.join(changed_sections)})" if changed_sections else ""
+            parts.append(f"User: {user_message}\nAssistant: {reply_text}{change_note}")
+        return "\n\n".join(parts)
+
+
+class ChatSessionStore:
+    """Bounded, TTL-based map of session id to ChatSession, optionally kept in a SQLite file shared across workers.
+
+    Sessions change on every turn, so with a file configured it is the only copy: each get()
+    reads the latest state and save() writes it back.
+    """
+
+    def __init__(self, max_sessions=2000, ttl=2 * 3600, sqlite_path=None):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.sqlite_path = sqlite_path
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        if sqlite_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS chat_sessions ("
+                    "id TEXT PRIMARY KEY, data TEXT NOT NULL, touched_at REAL NOT NULL)"
+                )
+
+    def _connect(self):
+        # A short-lived connection per operation keeps this safe across threads and forked workers
+        return sqlite3.connect(self.sqlite_path, timeout=5)
+
+    def create(self, kind, document, document_id, job_description):
+        """Starts a new session, evicting the least recently used one if the store is full."""
+        session = ChatSession(kind, document, document_id, job_description)
+        if self.sqlite_path:
+            self.save(session)
+            return session
+        with self._lock:
+            self._sessions[session.id] = session
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+        return session
+
+    def save(self, session):
+        """Persists a session's changes. Only needed with a SQLite file; in memory the session is shared as is."""
+        if not self.sqlite_path:
+            return
+        session.touched_at = time.time()
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO chat_sessions (id, data, touched_at) VALUES (?, ?, ?)",
+                    (session.id, json.dumps(session.to_dict()), session.touched_at),
+                )
+                conn.execute("DELETE FROM chat_sessions WHERE touched_at < ?", (time.time() - self.ttl,))
+                conn.execute(
+                    "DELETE FROM chat_sessions WHERE id NOT IN (SELECT id FROM chat_sessions ORDER BY touched_at DESC LIMIT ?)",
+                    (self.max_sessions,),
+                )
+        except sqlite3.Error as e:
+            # The reply has already been produced; losing this turn's edit beats failing the request
+            print(f"Chat session write failed: {e}")
+
+    def get(self, session_id):
+        """Returns a live session (refreshing its TTL), or None."""
+        now = time.time()
+        if self.sqlite_path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT data FROM chat_sessions WHERE id = ? AND touched_at >= ?", (session_id, now - self.ttl),
+                    ).fetchone()
+            except sqlite3.Error as e:
+                print(f"Chat session read failed: {e}")
+                row = None
+            if row is None:
+                return None
+            session = ChatSession.from_dict(json.loads(row[0]))
+            session.touched_at = now
+            return session
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                return None
+            if session.touched_at + self.ttl < now:
+                del self._sessions[session_id]
+                return None
+            session.touched_at = now
+            self._sessions.move_to_end(session_id)
+            return session
@@ -0,0 +1,216 @@
+import time
+import zlib
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# --- Server-Side Document Store ---
+# Uploaded resumes and pasted job descriptions are stored once and referred to by id,
+# so clients do not resend (and the server does not re-parse) the full text on every call.
+# Ids are content-addressed, which also gives downstream caches a stable key.
+#
+# With a SQLite file configured, documents are also written there, so an id handed out by
+# one gunicorn worker can be resolved by any other. Documents never change once stored, so
+# each worker keeps its own memory tier in front of the shared file.
+
+ID_PREFIXES = {'resume': 'res', 'job_description': 'jd', 'preview': 'prv'}
+
+
+class DocumentNotFound(Exception):
+    """Raised when a request refers to a document id that is unknown or has expired."""
+
+    def __init__(self, document_id):
+        super().__init__(f"Document '{document_id}' was not found or has expired. Please upload it again.")
+        self.document_id = document_id
+
+
+class DocumentTooLarge(Exception):
+    """Raised when a document would not fit in the store even on its own; reported as 413."""
+
+
+class InvalidRequest(Exception):
+    """Raised when a JSON body, or a text or id in it, has the wrong type; reported as 400."""
+
+
+def json_object(body):
+    """Returns a parsed JSON request body, or {} if there was none. Raises InvalidRequest unless it is an object."""
+    if body is None:
+        return {}
+    if not isinstance(body, dict):
+        raise InvalidRequest('The JSON body must be an object.')
+    return body
+
+
+class DocumentStore:
+    """Bounded, TTL-based store of zlib-compressed text documents with byte-size accounting,
+    optionally backed by a SQLite file shared across workers.
+    """
+
+    def __init__(self, max_bytes=128 * 1024 * 1024, ttl=24 * 3600, compress_level=6, sqlite_path=None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.compress_level = compress_level
+        self.sqlite_path = sqlite_path
+        self._documents = OrderedDict()
+        self._lock = threading.Lock()
+        self.stored_bytes = 0
+        self.raw_bytes = 0
+        self.evictions = 0
+        if sqlite_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS documents ("
+                    "id TEXT PRIMARY KEY, blob BLOB NOT NULL, raw_size INTEGER NOT NULL, expires_at REAL NOT NULL)"
+                )
+
+    def _connect(self):
+        # A short-lived connection per operation keeps this safe across threads and forked workers
+        return sqlite3.connect(self.sqlite_path, timeout=5)
+
+    def put(self, text, kind='resume'):
+        """Stores text (if not already stored) and returns its id. Re-storing refreshes the TTL.
+
+        Raises DocumentTooLarge if the compressed text alone is over the store's byte budget.
+        """
+        raw = text.encode('utf-8')
+        document_id = f"{ID_PREFIXES.get(kind, 'doc')}_{hashlib.sha256(raw).hexdigest()[:32]}"
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            entry = self._documents.get(document_id)
+            if entry is not None:
+                blob = entry[0]
+                self._documents[document_id] = (blob, entry[1], expires_at, expires_at)
+                self._documents.move_to_end(document_id)
+            else:
+                blob = zlib.compress(raw, self.compress_level)
+                # It would be evicted at once, leaving the caller with an id that never resolves
+                if len(blob) > self.max_bytes:
+                    raise DocumentTooLarge(
+                        f"Document is too large to store. The limit is {self.max_bytes / (1024 * 1024):g} MB after compression.")
+                self._documents[document_id] = (blob, len(raw), expires_at, expires_at)
+                self.stored_bytes += len(blob)
+                self.raw_bytes += len(raw)
+                self._evict(time.time())
+
+        if self.sqlite_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO documents (id, blob, raw_size, expires_at) VALUES (?, ?, ?, ?)",
+                        (document_id, blob, len(raw), expires_at),
+                    )
+                    conn.execute("DELETE FROM documents WHERE expires_at <= ?", (time.time(),))
+                    # The shared file gets the same byte budget; the documents closest to expiry go first
+                    excess = conn.execute("SELECT COALESCE(SUM(LENGTH(blob)), 0) FROM documents").fetchone()[0] - self.max_bytes
+                    if excess > 0:
+                        doomed = []
+                        for old_id, size in conn.execute("SELECT id, LENGTH(blob) FROM documents ORDER BY expires_at"):
+                            if excess <= 0:
+                                break
+                            doomed.append((old_id,))
+                            excess -= size
+                        conn.executemany("DELETE FROM documents WHERE id = ?", doomed)
+            except sqlite3.Error as e:
+                print(f"Document store write failed: {e}")
+        return document_id
+
+    def _evict(self, now):
+        """Drops expired documents, then least-recently-used ones while over budget. Caller holds the lock."""
+        for document_id in [key for key, (_, _, expires_at, _) in self._documents.items() if expires_at <= now]:
+            self._remove(document_id)
+        while self.stored_bytes > self.max_bytes and self._documents:
+            self._remove(next(iter(self._documents)))
+            self.evictions += 1
+
+    def _remove(self, document_id):
+        blob, raw_size, _, _ = self._documents.pop(document_id)
+        self.stored_bytes -= len(blob)
+        self.raw_bytes -= raw_size
+
+    def get(self, document_id):
+        """Returns the document text, or None if it is unknown or expired. Access extends the TTL."""
+        now = time.time()
+        with self._lock:
+            entry = self._documents.get(document_id)
+            if entry is not None:
+                blob, raw_size, expires_at, shared_expires_at = entry
+                if expires_at <= now:
+                    self._remove(document_id)
+                    entry = None
+                else:
+                    self._documents[document_id] = (blob, raw_size, now + self.ttl, shared_expires_at)
+                    self._documents.move_to_end(document_id)
+        if entry is not None:
+            self._extend(document_id, shared_expires_at, now)
+            return zlib.decompress(blob).decode('utf-8')
+
+        if not self.sqlite_path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT blob, raw_size, expires_at FROM documents WHERE id = ? AND expires_at > ?", (document_id, now),
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Document store read failed: {e}")
+            row = None
+        if row is None:
+            return None
+        blob, raw_size, shared_expires_at = row
+        with self._lock:
+            if document_id not in self._documents:
+                self._documents[document_id] = (blob, raw_size, now + self.ttl, shared_expires_at)
+                self.stored_bytes += len(blob)
+                self.raw_bytes += raw_size
+                self._evict(now)
+        self._extend(document_id, shared_expires_at, now)
+        return zlib.decompress(blob).decode('utf-8')
+
+    def _extend(self, document_id, shared_expires_at, now):
+        """Pushes the document's expiry in the shared file out to a full TTL once less than half of it is left.
+
+        Another worker may be the next to serve this id, so it must not expire there first; waiting
+        for the halfway point keeps every read from costing a SQLite write.
+        """
+        if not self.sqlite_path or shared_expires_at - now >= self.ttl / 2:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute("UPDATE documents SET expires_at = ? WHERE id = ?", (now + self.ttl, document_id))
+        except sqlite3.Error as e:
+            print(f"Document store write failed: {e}")
+            return
+        with self._lock:
+            entry = self._documents.get(document_id)
+            if entry is not None:
+                self._documents[document_id] = (*entry[:3], now + self.ttl)
+
+    def resolve(self, body, text_key, id_key):
+        """Returns body[text_key] if sent inline, else the stored document named by body[id_key].
+
+        Returns None when neither key is present, raises DocumentNotFound for an unknown id and
+        InvalidRequest if the body is not an object or the text or id is not a string.
+        """
+        body = json_object(body)
+        text = body.get(text_key)
+        if text is not None and not isinstance(text, str):
+            raise InvalidRequest(f"{text_key} must be a string.")
+        if text or not body.get(id_key):
+            return text
+        if not isinstance(body[id_key], str):
+            raise InvalidRequest(f"{id_key} must be a string.")
+        stored = self.get(body[id_key])
+        if stored is None:
+            raise DocumentNotFound(body[id_key])
+        return stored
+
+    def stats(self):
+        """Returns document count and byte accounting."""
+        with self._lock:
+            return {
+                'documents': len(self._documents),
+                'raw_bytes': self.raw_bytes,
+                'stored_bytes': self.stored_bytes,
+                'evictions': self.evictions,
+            }
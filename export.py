@@ -0,0 +1,640 @@
+import io
+import os
+import re
+import zlib
+import struct
+import hashlib
+import zipfile
+import threading
+from collections import OrderedDict
+from xml.sax.saxutils import escape
+
+# --- Server-Side Document Export ---
+# Generated resumes and cover letters are Markdown. They are rendered here to PDFs with
+# a real text layer and to DOCX, so ATS parsers can read the result and the browser does
+# not have to rasterize the preview. PDFs use the standard Helvetica fonts (nothing to
+# embed, but WinAnsi characters only) unless a Unicode TrueType font is configured.
+
+EXPORT_FORMATS = {
+    'pdf': 'application/pdf',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+
+_BOLD_RE = re.compile(r'\*\*(.+?)\*\*')
+_BULLET_RE = re.compile(r'^\s*(?:[-*•●▪]|\d+[.)])\s+(.*)$')
+_HEADING_RE = re.compile(r'^\s*#{1,6}\s+(.*)$')
+# Control characters are not allowed in XML and have no glyph in a PDF
+_CONTROL_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def parse_runs(text):
+    """Splits a line of Markdown into [(text, bold)] runs."""
+    runs, position = [], 0
+    for match in _BOLD_RE.finditer(text):
+        if match.start() > position:
+            runs.append((text[position:match.start()], False))
+        runs.append((match.group(1), True))
+        position = match.end()
+    if position < len(text):
+        runs.append((text[position:], False))
+    return [(part.replace('**', ''), bold) for part, bold in runs if part]
+
+
+def parse_blocks(markdown):
+    """Turns Markdown into ('heading' | 'bullet' | 'paragraph' | 'blank', runs) blocks.
+
+    A line that is bold from start to end, or a '#' heading, is a heading.
+    """
+    blocks = []
+    for line in _CONTROL_RE.sub('', markdown).splitlines():
+        stripped = line.strip()
+        if not stripped or stripped == '---':
+            if blocks and blocks[-1][0] != 'blank':
+                blocks.append(('blank', []))
+            continue
+        heading = _HEADING_RE.match(stripped)
+        bullet = _BULLET_RE.match(stripped)
+        if heading:
+            blocks.append(('heading', [(heading.group(1).replace('**', ''), True)]))
+        elif bullet:
+            blocks.append(('bullet', parse_runs(bullet.group(1))))
+        else:
+            runs = parse_runs(stripped)
+            kind = 'heading' if len(runs) == 1 and runs[0][1] and stripped.startswith('**') and stripped.rstrip(':').endswith('**') else 'paragraph'
+            blocks.append((kind, runs))
+    while blocks and blocks[-1][0] == 'blank':
+        blocks.pop()
+    return blocks
+
+
+# --- PDF ---
+
+# Advance widths (1/1000 em) of Helvetica and Helvetica-Bold for ASCII 32-126, from the standard AFM files
+_HELVETICA_WIDTHS = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD_WIDTHS = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+# Common non-ASCII WinAnsi glyphs (same width in both weights); anything else is measured as 556
+_WINANSI_WIDTHS = {'•': 350, '–': 556, '—': 1000, '‘': 222, '’': 222, '“': 333, '”': 333, '…': 1000, '€': 556}
+
+PAGE_WIDTH, PAGE_HEIGHT = 595, 842  # A4 in points
+MARGIN = 50
+BODY_SIZE, HEADING_SIZE = 10.5, 12
+LEADING = 1.35
+BULLET_INDENT = 14
+
+
+class ExportError(Exception):
+    """Raised when a document cannot be rendered faithfully, e.g. characters the PDF font has no glyph for."""
+
+    def __init__(self, message, status=422):
+        super().__init__(message)
+        self.status = status
+
+
+def text_width(text, bold, size):
+    """Width of a string in points when set in Helvetica (or Helvetica-Bold) at the given size."""
+    widths = _HELVETICA_BOLD_WIDTHS if bold else _HELVETICA_WIDTHS
+    total = 0
+    for char in text:
+        code = ord(char)
+        total += widths[code - 32] if 32 <= code <= 126 else _WINANSI_WIDTHS.get(char, 556)
+    return total * size / 1000
+
+
+def _pdf_string(text):
+    """Encodes text as a PDF literal string in WinAnsiEncoding. Raises UnicodeEncodeError outside cp1252."""
+    data = text.encode('cp1252')
+    out = bytearray(b'(')
+    for byte in data:
+        if byte in b'()\\':
+            out += b'\\' + bytes([byte])
+        elif byte > 126:
+            out += b'\\%03o' % byte
+        else:
+            out.append(byte)
+    return bytes(out + b')')
+
+
+def _pdf_text_string(text):
+    """Encodes document metadata such as the title: WinAnsi when possible, else UTF-16 with a byte order mark."""
+    if _encodable(text):
+        return _pdf_string(text)
+    return b'<FEFF%s>' % text.encode('utf-16-be').hex().upper().encode()
+
+
+class StandardFont:
+    """Helvetica or Helvetica-Bold: built into every PDF reader, so nothing is embedded, but limited to WinAnsi."""
+
+    def __init__(self, bold=False):
+        self.bold = bold
+        self.name = 'Helvetica-Bold' if bold else 'Helvetica'
+
+    def width(self, text, size):
+        return text_width(text, self.bold, size)
+
+    def missing(self, chars):
+        """Returns the characters WinAnsiEncoding cannot represent."""
+        return {char for char in chars if not _encodable(char)}
+
+    def encode(self, text):
+        return _pdf_string(text)
+
+    def objects(self, font_id, next_id, chars):
+        """Returns ({object_id: object}, next free id) for the font dictionary at font_id."""
+        return {font_id: b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>' % self.name.encode()}, next_id
+
+
+def _encodable(char):
+    try:
+        char.encode('cp1252')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+# TrueType tables a PDF reader needs to draw glyphs (cmap is not needed with the Identity CID mapping)
+_EMBEDDED_TABLES = (b'head', b'hhea', b'loca', b'maxp', b'cvt ', b'fpgm', b'prep', b'glyf', b'hmtx')
+
+
+class TrueTypeFont:
+    """A TrueType font file embedded as a Type0 (Identity-H) font, so any character it has a glyph for can be set.
+
+    Only the glyphs a document uses are embedded, and a ToUnicode map keeps the text layer
+    searchable and readable by ATS parsers.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as handle:
+            self.data = handle.read()
+        self.name = re.sub(r'[^A-Za-z0-9\-]', '', os.path.splitext(os.path.basename(path))[0]) or 'Font'
+        self.tables = self._read_tables()
+        if b'glyf' not in self.tables or b'loca' not in self.tables:
+            raise ValueError(f"{path} has no TrueType outlines (CFF / OpenType-PS fonts are not supported)")
+        if b'OS/2' in self.tables and self._unpack('OS/2', 8, '>H')[0] & 0x000f == 0x0002:
+            raise ValueError(f"The license of {path} does not allow embedding")
+
+        self.units_per_em = self._unpack('head', 18, '>H')[0]
+        self.bbox = self._unpack('head', 36, '>hhhh')
+        self.ascent, self.descent = self._unpack('hhea', 4, '>hh')
+        self.italic_angle = self._unpack('post', 4, '>i')[0] / 65536 if b'post' in self.tables else 0
+        glyph_count = self._unpack('maxp', 4, '>H')[0]
+        metric_count = self._unpack('hhea', 34, '>H')[0]
+        offset = self.tables[b'hmtx'][0]
+        advances = [struct.unpack_from('>H', self.data, offset + 4 * index)[0] for index in range(metric_count)]
+        self.advances = advances + [advances[-1]] * (glyph_count - metric_count)
+        self.glyphs = self._read_cmap()
+
+    def _read_tables(self):
+        count = struct.unpack_from('>H', self.data, 4)[0]
+        tables = {}
+        for index in range(count):
+            tag, _, offset, length = struct.unpack_from('>4sIII', self.data, 12 + 16 * index)
+            tables[tag] = (offset, length)
+        return tables
+
+    def _unpack(self, tag, offset, fmt):
+        return struct.unpack_from(fmt, self.data, self.tables[tag.encode()][0] + offset)
+
+    def _read_cmap(self):
+        """Returns {character: glyph id} from the font's Unicode cmap (format 12, else format 4)."""
+        start = self.tables[b'cmap'][0]
+        subtables = {}
+        for index in range(struct.unpack_from('>H', self.data, start + 2)[0]):
+            platform, encoding, offset = struct.unpack_from('>HHI', self.data, start + 4 + 8 * index)
+            subtables[(platform, encoding)] = start + offset
+        glyphs = {}
+        for key in ((3, 10), (0, 4), (0, 6), (3, 1), (0, 3)):
+            offset = subtables.get(key)
+            if offset is None:
+                continue
+            fmt = struct.unpack_from('>H', self.data, offset)[0]
+            if fmt == 12:
+                for group in range(struct.unpack_from('>I', self.data, offset + 12)[0]):
+                    first, last, glyph = struct.unpack_from('>III', self.data, offset + 16 + 12 * group)
+                    for code in range(first, min(last, 0x10ffff) + 1):
+                        glyphs[chr(code)] = glyph + code - first
+            elif fmt == 4:
+                segments = struct.unpack_from('>H', self.data, offset + 6)[0] // 2
+                ends = offset + 14
+                starts = ends + 2 * segments + 2
+                deltas = starts + 2 * segments
+                range_offsets = deltas + 2 * segments
+                for segment in range(segments):
+                    last, = struct.unpack_from('>H', self.data, ends + 2 * segment)
+                    first, = struct.unpack_from('>H', self.data, starts + 2 * segment)
+                    delta, = struct.unpack_from('>h', self.data, deltas + 2 * segment)
+                    range_offset, = struct.unpack_from('>H', self.data, range_offsets + 2 * segment)
+                    for code in range(first, min(last, 0xfffe) + 1):
+                        if range_offset:
+                            position = range_offsets + 2 * segment + range_offset + 2 * (code - first)
+                            glyph, = struct.unpack_from('>H', self.data, position)
+                            glyph = (glyph + delta) & 0xffff if glyph else 0
+                        else:
+                            glyph = (code + delta) & 0xffff
+                        if glyph and not 0xd800 <= code <= 0xdfff:
+                            glyphs[chr(code)] = glyph
+            else:
+                continue
+            break
+        return {char: glyph for char, glyph in glyphs.items() if 0 < glyph < len(self.advances)}
+
+    def width(self, text, size):
+        advances, glyphs = self.advances, self.glyphs
+        return sum(advances[glyphs.get(char, 0)] for char in text) * size / self.units_per_em
+
+    def missing(self, chars):
+        """Returns the characters the font has no glyph for."""
+        return {char for char in chars if char not in self.glyphs}
+
+    def encode(self, text):
+        """Two-byte glyph ids as a hex string (Identity-H)."""
+        return b'<%s>' % ''.join(f"{self.glyphs.get(char, 0):04X}" for char in text).encode()
+
+    def objects(self, font_id, next_id, chars):
+        """Returns the Type0 font at font_id, its CID font, descriptor, subset font file and ToUnicode map."""
+        cid_id, descriptor_id, file_id, unicode_id = range(next_id, next_id + 4)
+        used = {}
+        for char in sorted(chars):
+            if char in self.glyphs:
+                used.setdefault(self.glyphs[char], char)
+        # A deterministic subset tag keeps identical documents byte-identical
+        tag = ''.join(chr(65 + byte % 26) for byte in hashlib.sha256(repr(sorted(used)).encode()).digest()[:6])
+        name = f"{tag}+{self.name}".encode()
+        scale = 1000 / self.units_per_em
+
+        widths = b' '.join(b'%d [%d]' % (glyph, round(self.advances[glyph] * scale)) for glyph in sorted(used))
+        font_file = self._subset(set(used))
+        compressed = zlib.compress(font_file)
+        mappings = [b'<%04X> <%s>' % (glyph, char.encode('utf-16-be').hex().upper().encode()) for glyph, char in sorted(used.items())]
+        to_unicode = b'\n'.join([
+            b'/CIDInit /ProcSet findresource begin 12 dict begin begincmap',
+            b'/CIDSystemInfo << /Registry (Adobe) /Ordering (UCS) /Supplement 0 >> def',
+            b'/CMapName /Adobe-Identity-UCS def /CMapType 2 def',
+            b'1 begincodespacerange <0000> <FFFF> endcodespacerange',
+            *(b'%d beginbfchar\n%s\nendbfchar' % (len(mappings[start:start + 100]), b'\n'.join(mappings[start:start + 100]))
+              for start in range(0, len(mappings), 100)),
+            b'endcmap CMapName currentdict /CMap defineresource pop end end',
+        ])
+        unicode_stream = zlib.compress(to_unicode)
+
+        objects = {
+            font_id: b'<< /Type /Font /Subtype /Type0 /BaseFont /%s /Encoding /Identity-H /DescendantFonts [%d 0 R] /ToUnicode %d 0 R >>'
+                     % (name, cid_id, unicode_id),
+            cid_id: b'<< /Type /Font /Subtype /CIDFontType2 /BaseFont /%s /CIDSystemInfo << /Registry (Adobe) /Ordering (Identity) /Supplement 0 >> '
+                    b'/FontDescriptor %d 0 R /CIDToGIDMap /Identity /DW %d /W [%s] >>'
+                    % (name, descriptor_id, round(self.advances[0] * scale), widths),
+            descriptor_id: b'<< /Type /FontDescriptor /FontName /%s /Flags 32 /FontBBox [%d %d %d %d] /ItalicAngle %d '
+                           b'/Ascent %d /Descent %d /CapHeight %d /StemV 80 /FontFile2 %d 0 R >>'
+                           % (name, *(round(value * scale) for value in self.bbox), round(self.italic_angle),
+                              round(self.ascent * scale), round(self.descent * scale), round(self.ascent * scale), file_id),
+            file_id: b'<< /Length %d /Length1 %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(compressed), len(font_file), compressed),
+            unicode_id: b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(unicode_stream), unicode_stream),
+        }
+        return objects, next_id + 4
+
+    def _glyph_data(self, glyph, locations):
+        start = self.tables[b'glyf'][0]
+        return self.data[start + locations[glyph]:start + locations[glyph + 1]]
+
+    def _subset(self, glyphs):
+        """Returns a TrueType file with only the given glyphs (plus .notdef and composite parts) kept in glyf."""
+        long_offsets = self._unpack('head', 50, '>h')[0] == 1
+        count = len(self.advances)
+        offset = self.tables[b'loca'][0]
+        if long_offsets:
+            locations = struct.unpack_from('>%dI' % (count + 1), self.data, offset)
+        else:
+            locations = [value * 2 for value in struct.unpack_from('>%dH' % (count + 1), self.data, offset)]
+
+        # Composite glyphs are drawn from other glyphs, which must be kept too
+        keep, pending = set(), [0, *glyphs]
+        while pending:
+            glyph = pending.pop()
+            if glyph in keep or glyph >= count:
+                continue
+            keep.add(glyph)
+            data = self._glyph_data(glyph, locations)
+            if len(data) < 10 or struct.unpack_from('>h', data, 0)[0] >= 0:
+                continue
+            position = 10
+            while True:
+                flags, component = struct.unpack_from('>HH', data, position)
+                pending.append(component)
+                position += 4 + (4 if flags & 0x0001 else 2)
+                position += 2 if flags & 0x0008 else 4 if flags & 0x0040 else 8 if flags & 0x0080 else 0
+                if not flags & 0x0020:
+                    break
+
+        glyf, loca = bytearray(), []
+        for glyph in range(count):
+            loca.append(len(glyf))
+            if glyph in keep:
+                glyf += self._glyph_data(glyph, locations)
+                glyf += b'\0' * (-len(glyf) % 4)
+        loca.append(len(glyf))
+
+        tables = {}
+        for tag in _EMBEDDED_TABLES:
+            if tag in self.tables:
+                start, length = self.tables[tag]
+                tables[tag] = self.data[start:start + length]
+        tables[b'glyf'] = bytes(glyf)
+        tables[b'loca'] = struct.pack('>%dI' % len(loca), *loca)
+        # Long loca offsets, and no whole-file checksum (it would have to be recomputed)
+        head = bytearray(tables[b'head'])
+        head[8:12] = b'\0\0\0\0'
+        head[50:52] = struct.pack('>h', 1)
+        tables[b'head'] = bytes(head)
+        return _build_font_file(tables)
+
+
+def _build_font_file(tables):
+    """Assembles TrueType tables into a font file with a valid table directory."""
+    tags = sorted(tables)
+    power = 1 << (len(tags).bit_length() - 1)
+    out = bytearray(struct.pack('>IHHHH', 0x00010000, len(tags), power * 16, power.bit_length() - 1, len(tags) * 16 - power * 16))
+    offset = 12 + 16 * len(tags)
+    body = bytearray()
+    for tag in tags:
+        data = tables[tag]
+        padded = data + b'\0' * (-len(data) % 4)
+        checksum = sum(struct.unpack('>%dI' % (len(padded) // 4), padded)) & 0xffffffff
+        out += struct.pack('>4sIII', tag, checksum, offset + len(body), len(data))
+        body += padded
+    return bytes(out + body)
+
+
+HELVETICA = (StandardFont(), StandardFont(bold=True))
+
+
+def load_pdf_fonts(path, bold_path=None):
+    """Returns the (regular, bold) fonts for PDF export: the TrueType files if configured, else Helvetica.
+
+    Without a bold file the regular face is used for bold text too. A font that cannot be
+    loaded is reported and Helvetica is used instead.
+    """
+    if not path:
+        return HELVETICA
+    try:
+        regular = TrueTypeFont(path)
+        return regular, TrueTypeFont(bold_path) if bold_path else regular
+    except (OSError, ValueError, struct.error) as e:
+        print(f"Could not load PDF font {path!r} ({e}); falling back to Helvetica (WinAnsi characters only)")
+        return HELVETICA
+
+
+def wrap_runs(runs, width, size, fonts=HELVETICA):
+    """Greedy word wrap of styled runs; returns lines as lists of (text, bold) segments."""
+    words = []
+    for text, bold in runs:
+        words.extend((word, bold) for word in text.split())
+    lines, current, current_width = [], [], 0.0
+    space = fonts[0].width(' ', size)
+    for word, bold in words:
+        word_width = fonts[bold].width(word, size)
+        gap = space if current else 0.0
+        if current and current_width + gap + word_width > width:
+            lines.append(current)
+            current, current_width, gap = [], 0.0, 0.0
+        if current and current[-1][1] == bold:
+            current[-1] = (f"{current[-1][0]} {word}", bold)
+        else:
+            current.append(((' ' if current else '') + word, bold))
+        current_width += gap + word_width
+    if current:
+        lines.append(current)
+    return lines
+
+
+def render_pdf(markdown, title='', fonts=HELVETICA):
+    """Renders Markdown to a text-layer PDF and returns its bytes.
+
+    fonts is the (regular, bold) pair from load_pdf_fonts(). Raises ExportError, naming the
+    characters, if the text has characters the fonts cannot set, rather than dropping them.
+    """
+    blocks = parse_blocks(markdown)
+    # Whitespace only separates words; they are set with single spaces
+    used = (set(), set())
+    for _, runs in blocks:
+        for text, bold in runs:
+            used[bold].update(''.join(text.split()))
+    missing = sorted(fonts[0].missing(used[0]) | fonts[1].missing(used[1]))
+    if missing:
+        shown = ' '.join(f"{char} (U+{ord(char):04X})" for char in missing[:10])
+        more = f" and {len(missing) - 10} more" if len(missing) > 10 else ''
+        hint = '' if isinstance(fonts[0], TrueTypeFont) else ', or set PDF_FONT to a Unicode TrueType font on the server'
+        raise ExportError(f"The PDF font has no glyphs for: {shown}{more}. Export as DOCX instead{hint}.")
+    bullet_char = '-' if fonts[0].missing('•') else '•'
+    used[0].update(' ' + bullet_char)
+    used[1].add(' ')
+
+    pages, commands = [], []
+    y = PAGE_HEIGHT - MARGIN
+
+    def new_page():
+        nonlocal commands, y
+        commands = []
+        pages.append(commands)
+        y = PAGE_HEIGHT - MARGIN
+
+    def emit_line(segments, x, size, bullet=False):
+        nonlocal y
+        if y - size < MARGIN:
+            new_page()
+        y -= size
+        parts = [b'BT', b'%.2f %.2f Td' % (x, y)]
+        if bullet:
+            parts = [b'BT', b'%.2f %.2f Td /F1 %.1f Tf %s Tj ET' % (MARGIN + 2, y, size, fonts[0].encode(bullet_char))] + parts
+        for text, bold in segments:
+            parts.append(b'/%s %.1f Tf %s Tj' % (b'F2' if bold else b'F1', size, fonts[bold].encode(text)))
+        parts.append(b'ET')
+        commands.append(b' '.join(parts))
+        y -= size * (LEADING - 1)
+
+    new_page()
+    content_width = PAGE_WIDTH - 2 * MARGIN
+    for kind, runs in blocks:
+        if kind == 'blank':
+            y -= BODY_SIZE * 0.6
+        elif kind == 'heading':
+            y -= HEADING_SIZE * 0.4
+            for line in wrap_runs(runs, content_width, HEADING_SIZE, fonts):
+                emit_line(line, MARGIN, HEADING_SIZE)
+        elif kind == 'bullet':
+            for index, line in enumerate(wrap_runs(runs, content_width - BULLET_INDENT, BODY_SIZE, fonts)):
+                emit_line(line, MARGIN + BULLET_INDENT, BODY_SIZE, bullet=index == 0)
+        else:
+            for line in wrap_runs(runs, content_width, BODY_SIZE, fonts):
+                emit_line(line, MARGIN, BODY_SIZE)
+
+    return _assemble_pdf([b'\n'.join(page) for page in pages], title, fonts, used)
+
+
+def _assemble_pdf(streams, title, fonts, used):
+    # Objects: 1 catalog, 2 page tree, 3/4 fonts, 5 info, a (page, content) pair per page, then embedded font data
+    objects = {
+        5: b'<< /Title ' + _pdf_text_string(title) + b' /Producer (Match My Resume) >>',
+    }
+    kids = []
+    for index, stream in enumerate(streams):
+        page_id, content_id = 6 + 2 * index, 7 + 2 * index
+        kids.append(b'%d 0 R' % page_id)
+        objects[page_id] = (
+            b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] '
+            b'/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>' % (PAGE_WIDTH, PAGE_HEIGHT, content_id)
+        )
+        compressed = zlib.compress(stream)
+        objects[content_id] = b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(compressed), compressed)
+    objects[1] = b'<< /Type /Catalog /Pages 2 0 R >>'
+    objects[2] = b'<< /Type /Pages /Kids [%s] /Count %d >>' % (b' '.join(kids), len(kids))
+    next_id = 6 + 2 * len(streams)
+    for font_id, font, chars in ((3, fonts[0], used[0]), (4, fonts[1], used[1])):
+        font_objects, next_id = font.objects(font_id, next_id, chars)
+        objects.update(font_objects)
+
+    out = bytearray(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+    offsets = {}
+    for object_id in sorted(objects):
+        offsets[object_id] = len(out)
+        out += b'%d 0 obj\n%s\nendobj\n' % (object_id, objects[object_id])
+    xref_offset = len(out)
+    out += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    for object_id in sorted(objects):
+        out += b'%010d 00000 n \n' % offsets[object_id]
+    out += b'trailer\n<< /Size %d /Root 1 0 R /Info 5 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (len(objects) + 1, xref_offset)
+    return bytes(out)
+
+
+# --- DOCX ---
+
+_W_NS = 'http://schemas.openxmlformats.org/wordprocessingml/2006/main'
+_DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/numbering.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.numbering+xml"/>'
+    '</Types>'
+)
+_DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>'
+    '</Relationships>'
+)
+_DOCX_DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/numbering" Target="numbering.xml"/>'
+    '</Relationships>'
+)
+_DOCX_NUMBERING = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<w:numbering xmlns:w="{_W_NS}">'
+    '<w:abstractNum w:abstractNumId="0"><w:lvl w:ilvl="0"><w:start w:val="1"/><w:numFmt w:val="bullet"/>'
+    '<w:lvlText w:val="•"/><w:lvlJc w:val="left"/><w:pPr><w:ind w:left="360" w:hanging="360"/></w:pPr></w:lvl></w:abstractNum>'
+    '<w:num w:numId="1"><w:abstractNumId w:val="0"/></w:num>'
+    '</w:numbering>'
+)
+
+
+def _docx_runs(runs, size_half_points):
+    return ''.join(
+        f'<w:r><w:rPr><w:rFonts w:ascii="Arial" w:hAnsi="Arial"/>{"<w:b/>" if bold else ""}'
+        f'<w:sz w:val="{size_half_points}"/></w:rPr><w:t xml:space="preserve">{escape(text)}</w:t></w:r>'
+        for text, bold in runs
+    )
+
+
+def render_docx(markdown):
+    """Renders Markdown to a DOCX (real headings, bullet lists and bold runs) and returns its bytes."""
+    paragraphs = []
+    for kind, runs in parse_blocks(markdown):
+        if kind == 'blank':
+            continue
+        if kind == 'heading':
+            properties = '<w:pPr><w:keepNext/><w:spacing w:before="200" w:after="60"/></w:pPr>'
+            paragraphs.append(f'<w:p>{properties}{_docx_runs(runs, 24)}</w:p>')
+        elif kind == 'bullet':
+            properties = '<w:pPr><w:numPr><w:ilvl w:val="0"/><w:numId w:val="1"/></w:numPr><w:spacing w:after="40"/></w:pPr>'
+            paragraphs.append(f'<w:p>{properties}{_docx_runs(runs, 21)}</w:p>')
+        else:
+            paragraphs.append(f'<w:p><w:pPr><w:spacing w:after="80"/></w:pPr>{_docx_runs(runs, 21)}</w:p>')
+
+    # A4 with 0.7" margins (sizes in twentieths of a point)
+    section = '<w:sectPr><w:pgSz w:w="11906" w:h="16838"/><w:pgMar w:top="1000" w:right="1000" w:bottom="1000" w:left="1000" w:header="0" w:footer="0" w:gutter="0"/></w:sectPr>'
+    document = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<w:document xmlns:w="{_W_NS}"><w:body>{"".join(paragraphs)}{section}</w:body></w:document>'
+    )
+
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        # Fixed timestamps keep the output byte-identical for identical input
+        for name, data in (
+            ('[Content_Types].xml', _DOCX_CONTENT_TYPES),
+            ('_rels/.rels', _DOCX_RELS),
+            ('word/_rels/document.xml.rels', _DOCX_DOCUMENT_RELS),
+            ('word/numbering.xml', _DOCX_NUMBERING),
+            ('word/document.xml', document),
+        ):
+            archive.writestr(zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0)), data, zipfile.ZIP_DEFLATED)
+    return buffer.getvalue()
+
+
+def render_document(markdown, export_format, title='', fonts=HELVETICA):
+    """Renders Markdown in the requested format ('pdf' or 'docx')."""
+    if export_format == 'pdf':
+        return render_pdf(markdown, title, fonts)
+    return render_docx(markdown)
+
+
+class ExportCache:
+    """Bounded LRU of rendered files keyed by the hash of their source and format."""
+
+    def __init__(self, max_bytes=32 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_render(self, key, render):
+        """Returns the cached bytes for key, calling render() and caching its result on a miss."""
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+
+        data = render()
+        with self._lock:
+            if key not in self._entries and len(data) <= self.max_bytes:
+                self._entries[key] = data
+                self._bytes += len(data)
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._entries.popitem(last=False)
+                    self._bytes -= len(evicted)
+        return data
+
+    def stats(self):
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            return {'entries': len(self._entries), 'bytes': self._bytes, 'hits': self.hits, 'misses': self.misses}
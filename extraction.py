@@ -0,0 +1,543 @@
+import io
+import os
+import time
+import hashlib
+import zipfile
+import threading
+import multiprocessing
+from xml.etree import ElementTree
+from collections import OrderedDict
+
+# --- Content-Addressed Extraction Cache ---
+# Resumes are keyed by the SHA-256 of their raw bytes, so the same file uploaded
+# to several tools (or by several users) is only ever parsed once per process.
+
+
+def content_hash(data):
+    """Returns the hex SHA-256 digest used as the cache key for a document."""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ExtractionError(Exception):
+    """Raised when a document is refused (too large, too many pages) or takes too long to parse."""
+
+    def __init__(self, message, status=422):
+        super().__init__(message)
+        self.status = status
+
+
+def _read_pdf(data, max_pages, serial_pages):
+    """Counts a PDF's pages and, if there are fewer than serial_pages, extracts them all.
+
+    Returns (page_count, pages or None). Runs in a reader process, so a hostile page tree
+    cannot hold the request thread while it is walked.
+    """
+    from PyPDF2 import PdfReader
+    reader = PdfReader(io.BytesIO(data))
+    page_count = len(reader.pages)
+    if page_count > max_pages or page_count >= serial_pages:
+        return page_count, None
+    # Handle potential None or non-string return from extract_text
+    return page_count, [page.extract_text() or "" for page in reader.pages]
+
+
+def _extract_pages(data, start, stop):
+    """Returns the text of pages [start, stop). Runs in a reader process."""
+    from PyPDF2 import PdfReader
+    reader = PdfReader(io.BytesIO(data))
+    return [reader.pages[index].extract_text() or "" for index in range(start, stop)]
+
+
+def _serve(conn):
+    """Reader process loop: runs (function, args) requests from the parent until the pipe closes."""
+    import PyPDF2  # noqa: F401 -- imported before the first request arrives
+    while True:
+        try:
+            fn, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            conn.send((True, fn(*args)))
+        except Exception as e:
+            conn.send((False, f"{type(e).__name__}: {e}"))
+
+
+def _join_pages(pages):
+    # One join instead of repeated concatenation; each non-empty page ends with a newline as before
+    return "".join(f"{page}\n" for page in pages if page)
+
+
+class _ReaderProcess:
+    """One PDF reader process and the pipe to it. Killing it only affects the document it was reading."""
+
+    def __init__(self, context):
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=_serve, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+
+    def send(self, fn, *args):
+        self.conn.send((fn, args))
+
+    def receive(self, timeout):
+        """Returns the result of the last request. Raises TimeoutError if it is not ready in time."""
+        if not self.conn.poll(max(0.0, timeout)):
+            raise TimeoutError
+        ok, value = self.conn.recv()
+        if not ok:
+            raise RuntimeError(value)
+        return value
+
+    def kill(self):
+        self.process.kill()
+        self.conn.close()
+
+
+class PdfExtractor:
+    """Bounded PDF text extraction.
+
+    Documents over max_bytes are refused before they are opened. Everything else about a PDF,
+    from counting its pages to extracting them, runs in one of up to max_workers reader
+    processes with a hard timeout: a document that overruns it has its own processes killed,
+    so a hostile PDF cannot hold a worker, and other documents being read are not affected.
+    Documents over max_pages are refused once counted; those of parallel_min_pages or more
+    are split across the free reader processes.
+
+    With max_workers=0 PDFs are read on the request thread and the timeout is only checked
+    between pages.
+    """
+
+    def __init__(self, max_bytes=10 * 1024 * 1024, max_pages=50, timeout=20, parallel_min_pages=8, max_workers=2):
+        self.max_bytes = max_bytes
+        self.max_pages = max_pages
+        self.timeout = timeout
+        self.parallel_min_pages = parallel_min_pages
+        self.max_workers = max_workers
+        self._idle = []
+        self._pid = None
+        self._slots = threading.BoundedSemaphore(max(1, max_workers))
+        self._lock = threading.Lock()
+
+    def _checkout(self, timeout):
+        """Returns an idle reader process, starting one if needed, or None if all are busy until timeout."""
+        with self._lock:
+            # Processes do not survive a fork, so each worker process starts its own.
+            # 'spawn' avoids forking a process that is already running request threads.
+            if self._pid != os.getpid():
+                self._idle, self._pid = [], os.getpid()
+                self._slots = threading.BoundedSemaphore(max(1, self.max_workers))
+            slots = self._slots
+        if not slots.acquire(timeout=max(0.0, timeout)):
+            return None
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        try:
+            return _ReaderProcess(multiprocessing.get_context('spawn'))
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _checkin(self, reader, healthy=True):
+        if healthy:
+            with self._lock:
+                self._idle.append(reader)
+        else:
+            reader.kill()
+        self._slots.release()
+
+    def start(self):
+        """Starts a reader process ahead of the first upload, so it does not wait for Python and PyPDF2 to load."""
+        if self.max_workers > 0:
+            self._checkin(self._checkout(0))
+
+    def extract(self, data):
+        """Returns the text of a PDF, or None if it cannot be parsed. Raises ExtractionError if refused."""
+        if len(data) > self.max_bytes:
+            raise ExtractionError(f"PDF is too large. The limit is {self.max_bytes / (1024 * 1024):g} MB.", 413)
+        if self.max_workers <= 0:
+            return self._extract_in_process(data)
+
+        deadline = time.monotonic() + self.timeout
+        reader = self._checkout(self.timeout)
+        if reader is None:
+            raise ExtractionError("Too many PDFs are being read right now; please try again shortly.", 503)
+        try:
+            reader.send(_read_pdf, data, self.max_pages, self.parallel_min_pages)
+            page_count, pages = reader.receive(deadline - time.monotonic())
+        except TimeoutError:
+            # A stuck page cannot be interrupted; killing its process is the only way to reclaim the CPU
+            self._checkin(reader, healthy=False)
+            raise ExtractionError(f"PDF took longer than {self.timeout} seconds to read.")
+        except Exception as e:
+            self._checkin(reader, healthy=not isinstance(e, (EOFError, OSError)))
+            print(f"Error reading PDF: {e}")
+            return None
+
+        if page_count > self.max_pages:
+            self._checkin(reader)
+            raise ExtractionError(f"PDF has {page_count} pages. The limit is {self.max_pages}.", 413)
+        if pages is None:
+            return self._extract_parallel(data, page_count, reader, deadline)
+        self._checkin(reader)
+        return _join_pages(pages)
+
+    def _extract_parallel(self, data, page_count, first, deadline):
+        """Splits the pages across `first` and whichever other reader processes are free right now."""
+        readers = [first]
+        while len(readers) < self.max_workers:
+            reader = self._checkout(0)
+            if reader is None:
+                break
+            readers.append(reader)
+        chunk = -(-page_count // len(readers))
+        for index, reader in enumerate(readers):
+            reader.send(_extract_pages, data, index * chunk, min((index + 1) * chunk, page_count))
+
+        pages, failure = [], None
+        for reader in readers:
+            if failure is not None:
+                # The document has already failed; its other readers may still be busy with it
+                self._checkin(reader, healthy=False)
+                continue
+            try:
+                pages.extend(reader.receive(deadline - time.monotonic()))
+                self._checkin(reader)
+            except Exception as e:
+                self._checkin(reader, healthy=False)
+                failure = e
+        if isinstance(failure, TimeoutError):
+            raise ExtractionError(f"PDF took longer than {self.timeout} seconds to read.")
+        if failure is not None:
+            print(f"Error reading PDF: {failure}")
+            return None
+        return _join_pages(pages)
+
+    def _extract_in_process(self, data):
+        # Imported on first use: most requests never parse a PDF, and workers start faster without it
+        from PyPDF2 import PdfReader
+
+        deadline = time.monotonic() + self.timeout
+        try:
+            reader = PdfReader(io.BytesIO(data))
+            page_count = len(reader.pages)
+            if page_count > self.max_pages:
+                raise ExtractionError(f"PDF has {page_count} pages. The limit is {self.max_pages}.", 413)
+            pages = []
+            for page in reader.pages:
+                if time.monotonic() > deadline:
+                    raise ExtractionError(f"PDF took longer than {self.timeout} seconds to read.")
+                pages.append(page.extract_text() or "")
+        except ExtractionError:
+            raise
+        except Exception as e:
+            print(f"Error reading PDF: {e}")
+            return None
+        return _join_pages(pages)
+
+
+class ExtractionCache:
+    """Two-tier text cache: a bounded in-memory LRU backed by an optional directory on disk."""
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, disk_dir=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key):
+        # Fan out into 256 sub-directories so no single directory grows unbounded
+        return os.path.join(self.disk_dir, key[:2], f"{key}.txt")
+
+    def _store(self, key, text):
+        """Inserts into the memory tier and evicts least-recently-used entries. Caller holds the lock."""
+        size = len(text.encode('utf-8'))
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        self._entries[key] = (text, size)
+        self._bytes += size
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def get(self, key):
+        """Returns the cached text for a key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                    text = f.read()
+            except OSError:
+                text = None
+            if text is not None:
+                with self._lock:
+                    self._store(key, text)
+                    self.disk_hits += 1
+                return text
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, text):
+        """Stores extracted text in memory and, if configured, on disk."""
+        with self._lock:
+            self._store(key, text)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            try:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Write to a temp file first so readers in other workers never see a partial file
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(tmp_path, path)
+            except OSError as e:
+                print(f"Extraction cache disk write failed: {e}")
+
+    def stats(self):
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            }
+
+
+_W = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_MC_FALLBACK = '{http://schemas.openxmlformats.org/markup-compatibility/2006}Fallback'
+# Paragraph styles whose text is a heading, by style id prefix (Word's built-in ids)
+_HEADING_STYLES = ('heading', 'title', 'subtitle')
+# Paragraphs up to this long that are entirely bold are treated as headings, as resumes often do
+_BOLD_HEADING_MAX_CHARS = 60
+
+
+class _LimitedReader:
+    """File wrapper that raises ExtractionError once more than `limit` bytes have been read."""
+
+    def __init__(self, stream, limit):
+        self.stream = stream
+        self.limit = limit
+        self.read_bytes = 0
+
+    def read(self, size=-1):
+        data = self.stream.read(size)
+        self.read_bytes += len(data)
+        if self.read_bytes > self.limit:
+            raise ExtractionError(f"Word document is too large. The limit is {self.limit / (1024 * 1024):g} MB of text and markup.", 413)
+        return data
+
+
+class DocxExtractor:
+    """Bounded DOCX text extraction, streamed from word/document.xml with iterparse.
+
+    Headings become **bold** lines, list items '- ' bullets (indented by level) and table rows
+    'cell | cell' lines, matching the Markdown the rest of the app reads and writes. Each
+    paragraph or table is discarded once emitted, so memory stays flat however long the file
+    is; the uncompressed XML is capped at max_xml_bytes (zip bombs) and parsing at `timeout`.
+    """
+
+    def __init__(self, max_bytes=10 * 1024 * 1024, max_xml_bytes=50 * 1024 * 1024, timeout=20):
+        self.max_bytes = max_bytes
+        self.max_xml_bytes = max_xml_bytes
+        self.timeout = timeout
+
+    def extract(self, data):
+        """Returns the text of a DOCX, or None if it cannot be parsed. Raises ExtractionError if refused."""
+        if len(data) > self.max_bytes:
+            raise ExtractionError(f"Word document is too large. The limit is {self.max_bytes / (1024 * 1024):g} MB.", 413)
+        try:
+            with zipfile.ZipFile(io.BytesIO(data)) as archive:
+                if 'word/document.xml' not in archive.namelist():
+                    # Some other zip (an .xlsx, a renamed archive): sniffing cannot tell them apart
+                    raise ExtractionError('Unsupported file type. Please upload a PDF or DOCX file.', 400)
+                with archive.open('word/document.xml') as xml:
+                    return "".join(f"{line}\n" for line in self._lines(_LimitedReader(xml, self.max_xml_bytes)))
+        except ExtractionError:
+            raise
+        except Exception as e:
+            print(f"Error reading DOCX: {e}")
+            return None
+
+    def _lines(self, xml):
+        """Yields one line per paragraph or table row, in document order."""
+        deadline = time.monotonic() + self.timeout
+        body = None
+        # Cells of the table row being read, and the lines of the current cell
+        row, cell = None, None
+        table_depth = 0
+        # Text boxes are stored twice (DrawingML and a VML fallback); only the first copy is read
+        fallback_depth = 0
+        for event, element in ElementTree.iterparse(xml, events=('start', 'end')):
+            tag = element.tag
+            if event == 'start':
+                if tag == _W + 'body':
+                    body = element
+                elif tag == _MC_FALLBACK:
+                    fallback_depth += 1
+                elif tag == _W + 'tbl':
+                    table_depth += 1
+                elif tag == _W + 'tr' and table_depth == 1:
+                    row = []
+                elif tag == _W + 'tc' and table_depth == 1:
+                    cell = []
+                continue
+
+            if tag == _W + 'p':
+                line = _docx_paragraph(element) if not fallback_depth else ''
+                if line and cell is not None:
+                    cell.append(line.lstrip('- ').strip('*'))
+                elif line:
+                    yield line
+                # Emptied once read, so an enclosing paragraph does not repeat a text box's text
+                element.clear()
+            elif tag == _MC_FALLBACK:
+                fallback_depth -= 1
+            elif tag == _W + 'tc' and table_depth == 1:
+                row.append(' '.join(cell))
+                cell = None
+            elif tag == _W + 'tr' and table_depth == 1:
+                if any(row):
+                    yield ' | '.join(row)
+                row = None
+                element.clear()
+            elif tag == _W + 'tbl':
+                table_depth -= 1
+
+            if time.monotonic() > deadline:
+                raise ExtractionError(f"Word document took longer than {self.timeout} seconds to read.")
+            if body is not None and table_depth == 0 and tag in (_W + 'p', _W + 'tbl'):
+                # Finished blocks are dropped, so the tree never holds more than the current one
+                body.clear()
+
+
+def _docx_paragraph(paragraph):
+    """Returns a paragraph as a Markdown line: a **heading**, an indented '- ' bullet or plain text."""
+    parts = []
+    all_bold = True
+    for run in paragraph.iter(_W + 'r'):
+        bold_element = run.find(f'{_W}rPr/{_W}b')
+        bold = bold_element is not None and bold_element.get(_W + 'val', 'true') not in ('0', 'false')
+        for child in run:
+            if child.tag == _W + 't' and child.text:
+                parts.append(child.text)
+                all_bold = all_bold and (bold or not child.text.strip())
+            elif child.tag in (_W + 'tab', _W + 'br', _W + 'cr'):
+                parts.append(' ')
+    text = ' '.join(''.join(parts).split())
+    if not text:
+        return ''
+
+    properties = paragraph.find(_W + 'pPr')
+    style = ''
+    level = None
+    if properties is not None:
+        style_element = properties.find(_W + 'pStyle')
+        style = (style_element.get(_W + 'val') or '').lower() if style_element is not None else ''
+        numbering = properties.find(_W + 'numPr')
+        if numbering is not None:
+            level_element = numbering.find(_W + 'ilvl')
+            level = int(level_element.get(_W + 'val') or 0) if level_element is not None else 0
+        elif style.startswith('list'):
+            level = 0
+        if properties.find(_W + 'outlineLvl') is not None:
+            style = style or 'heading'
+
+    if style.startswith(_HEADING_STYLES) or (level is None and all_bold and len(text) <= _BOLD_HEADING_MAX_CHARS):
+        return f"**{text}**"
+    if level is not None:
+        return f"{'  ' * level}- {text}"
+    return text
+
+
+class ExtractionService:
+    """Single entry point for turning uploaded document bytes into text, shared by every upload route."""
+
+    def __init__(self, cache, pdf_extractor=None, docx_extractor=None):
+        self.cache = cache
+        self.pdf_extractor = pdf_extractor or PdfExtractor()
+        self.docx_extractor = docx_extractor or DocxExtractor()
+
+    @property
+    def max_bytes(self):
+        """The largest upload any extractor accepts."""
+        return max(self.pdf_extractor.max_bytes, self.docx_extractor.max_bytes)
+
+    def extract(self, kind, data):
+        """Returns the text of a 'pdf' or 'docx' document, parsing it only if these exact bytes have not been seen before.
+
+        Raises ExtractionError if the document exceeds its extractor's limits.
+        """
+        key = content_hash(data)
+        text = self.cache.get(key)
+        if text is not None:
+            return text
+
+        extractor = self.docx_extractor if kind == 'docx' else self.pdf_extractor
+        text = extractor.extract(data)
+        # Failed or empty extractions are not cached so a transient error is retried next time
+        if text:
+            self.cache.put(key, text)
+        return text
+
+
+# --- Upload Intake ---
+# Uploads are read straight from the request's in-memory buffer. Size and type are checked
+# before the bytes are copied, and the type comes from the file's signature, not its name.
+
+# PDF readers accept the header anywhere in the first 1 KB
+SNIFF_BYTES = 1024
+
+
+# DOCX files are zip archives; whether one is a Word document is settled when it is opened
+ZIP_SIGNATURE = b'PK\x03\x04'
+
+
+def sniff_document_type(head):
+    """Returns 'pdf' or 'docx' from the file's leading bytes, or None for anything else."""
+    if b'%PDF-' in head[:SNIFF_BYTES]:
+        return 'pdf'
+    if head.startswith(ZIP_SIGNATURE):
+        return 'docx'
+    return None
+
+
+def read_upload(stream, max_bytes, allowed=('pdf', 'docx')):
+    """Returns (type, bytes) of an uploaded file, refusing it by size and sniffed type before reading it all.
+
+    `stream` must be seekable, like the spooled buffers Werkzeug parses uploads into.
+    """
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    if size > max_bytes:
+        raise ExtractionError(f"File is too large. The limit is {max_bytes / (1024 * 1024):g} MB.", 413)
+    kind = sniff_document_type(stream.read(SNIFF_BYTES))
+    if kind not in allowed:
+        raise ExtractionError('Unsupported file type. Please upload a PDF or DOCX file.', 400)
+    stream.seek(0)
+    return kind, stream.read()
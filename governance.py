@@ -0,0 +1,330 @@
+import math
+import time
+import heapq
+import random
+import itertools
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import httpx
+
+# --- Upstream Governance ---
+# Every Gemini request passes through one UpstreamGovernor per worker. For each model it
+# keeps a token bucket sized to that model's quota, so excess load queues here rather than
+# turning into 429s. Waiting callers are served by priority (interactive chat before batch
+# scoring). Transient failures are retried with jittered exponential backoff, and a circuit
+# breaker fails fast while the model keeps failing, so retries do not amplify an outage.
+
+PRIORITIES = {'interactive': 0, 'normal': 5, 'batch': 9}
+# Tasks a user is actively waiting on in a conversation jump the queue
+TASK_PRIORITIES = {'chat': 'interactive'}
+
+# Requests per minute per model, per worker process (Gemini paid tier 1 quotas)
+DEFAULT_RATE_LIMITS = {
+    'gemini-2.5-pro': 150,
+    'gemini-2.5-flash': 1000,
+    'gemini-2.5-flash-lite': 4000,
+}
+
+# Statuses worth retrying on the same model: quota exhaustion and server-side failures
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+# Failures before Gemini answered at all: connection resets, DNS errors, read and connect timeouts
+NETWORK_ERRORS = (httpx.TransportError, ConnectionError)
+
+_priority = contextvars.ContextVar('upstream_priority', default=None)
+# time.monotonic() by which the current unit of work (e.g. a background job) must be done
+_deadline = contextvars.ContextVar('upstream_deadline', default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised instead of starting or retrying a Gemini request once the caller's deadline has passed."""
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling Gemini when it is unhealthy or over quota; reported as 503 with Retry-After."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = max(1, int(math.ceil(retry_after)))
+
+
+def is_transient(error):
+    """True for errors a later attempt may not hit: quota, overload, server and network failures.
+
+    Anything else (a bad request, a bug on our side, a passed deadline) would fail the same way again.
+    """
+    if isinstance(error, NETWORK_ERRORS):
+        return True
+    return getattr(error, 'code', None) in RETRY_STATUS_CODES
+
+
+def parse_rate_limits(value):
+    """Parses 'model=rpm,model=rpm' on top of the default limits. An rpm of 0 removes the limit."""
+    limits = dict(DEFAULT_RATE_LIMITS)
+    for item in (value or '').split(','):
+        if '=' in item:
+            model, rpm = item.split('=', 1)
+            limits[model.strip()] = float(rpm)
+    return limits
+
+
+@contextmanager
+def upstream_priority(name):
+    """Runs the block's Gemini calls at the given priority ('interactive', 'normal' or 'batch')."""
+    token = _priority.set(name)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+@contextmanager
+def upstream_deadline(deadline):
+    """Bounds the block's Gemini calls by a time.monotonic() deadline: each request's HTTP timeout is the time left."""
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_time():
+    """Seconds left before the current upstream deadline, or None without one. Raises DeadlineExceeded once it has passed."""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise DeadlineExceeded('The time limit for this request was reached before Gemini answered')
+    return remaining
+
+
+class TokenBucket:
+    """Refills at `rate` tokens per second up to `capacity`. Not thread-safe; PriorityLimiter holds the lock."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self):
+        """Takes a token and returns 0, or returns the seconds until one will be available."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class PriorityLimiter:
+    """A token bucket whose waiters are served lowest priority number first, then in arrival order."""
+
+    def __init__(self, requests_per_minute, burst_seconds=5, max_wait=30):
+        rate = requests_per_minute / 60.0
+        self.bucket = TokenBucket(rate, max(1.0, rate * burst_seconds))
+        self.max_wait = max_wait
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._changed = threading.Condition()
+
+    def acquire(self, priority):
+        """Blocks until this caller may send a request. Raises UpstreamUnavailable after max_wait seconds."""
+        entry = (priority, next(self._sequence))
+        deadline = time.monotonic() + self.max_wait
+        with self._changed:
+            heapq.heappush(self._waiters, entry)
+            try:
+                while True:
+                    wait = self.bucket.take() if self._waiters[0] == entry else None
+                    if wait == 0:
+                        return
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        backlog = len(self._waiters) / self.bucket.rate
+                        raise UpstreamUnavailable('Too many requests are waiting for Gemini; please try again shortly.', backlog)
+                    self._changed.wait(min(wait, remaining) if wait is not None else remaining)
+            finally:
+                self._waiters.remove(entry)
+                heapq.heapify(self._waiters)
+                # The next caller in line may now be at the head
+                self._changed.notify_all()
+
+    def waiting(self):
+        with self._changed:
+            return len(self._waiters)
+
+
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive transient failures and rejects calls for `reset_timeout`
+    seconds. After that one probe request is let through: success closes the circuit, failure reopens it.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.probing = False
+        self.times_opened = 0
+        self._lock = threading.Lock()
+
+    def state(self):
+        with self._lock:
+            if self.opened_at is None:
+                return 'closed'
+            return 'half_open' if self.probing or time.monotonic() - self.opened_at >= self.reset_timeout else 'open'
+
+    def before_call(self, name):
+        """Raises UpstreamUnavailable while the circuit is open. Returns True if this call is the probe."""
+        with self._lock:
+            if self.opened_at is None:
+                return False
+            remaining = self.opened_at + self.reset_timeout - time.monotonic()
+            if remaining <= 0 and not self.probing:
+                self.probing = True
+                return True
+            raise UpstreamUnavailable(f"{name} is temporarily unavailable; please try again shortly.", max(remaining, 1))
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                if self.opened_at is None or self.probing:
+                    self.times_opened += 1
+                self.opened_at = time.monotonic()
+                self.probing = False
+
+    def release_probe(self):
+        """Lets another probe through if this one ended without telling us anything about upstream health."""
+        with self._lock:
+            self.probing = False
+
+
+class UpstreamGovernor:
+    """Rate limiting, prioritisation, retries and circuit breaking for calls to one upstream, per model."""
+
+    def __init__(self, rate_limits=None, burst_seconds=5, max_wait=30, retries=2, backoff_base=0.5,
+                 backoff_max=8.0, failure_threshold=5, reset_timeout=30):
+        self.rate_limits = dict(DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits)
+        self.burst_seconds = burst_seconds
+        self.max_wait = max_wait
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._limiters = {}
+        self._breakers = {}
+        self._lock = threading.Lock()
+        self.retried = 0
+
+    def _limiter(self, model):
+        with self._lock:
+            if model not in self._limiters:
+                rpm = self.rate_limits.get(model)
+                self._limiters[model] = PriorityLimiter(rpm, self.burst_seconds, self.max_wait) if rpm else None
+            return self._limiters[model]
+
+    def _breaker(self, model):
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self._breakers[model]
+
+    def priority(self, task):
+        name = _priority.get() or TASK_PRIORITIES.get(task, 'normal')
+        return PRIORITIES.get(name, PRIORITIES['normal'])
+
+    def backoff(self, attempt):
+        """Full-jitter exponential backoff: spreads retries out so they do not arrive in waves."""
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    def _admit(self, model, task):
+        """Waits for the breaker and the rate limit to allow a request. Returns True if it is the breaker's probe."""
+        remaining_time()
+        probe = self._breaker(model).before_call(model)
+        limiter = self._limiter(model)
+        if limiter is not None:
+            try:
+                limiter.acquire(self.priority(task))
+            except UpstreamUnavailable:
+                if probe:
+                    self._breaker(model).release_probe()
+                raise
+        return probe
+
+    def _failed(self, model, error, attempt, probe):
+        """Records a failed attempt. Returns the seconds to wait before retrying, or raises if giving up."""
+        breaker = self._breaker(model)
+        if not is_transient(error):
+            # A bad request says nothing about upstream health
+            if probe:
+                breaker.release_probe()
+            raise error
+        breaker.record_failure()
+        if attempt >= self.retries:
+            retry_after = breaker.reset_timeout if breaker.state() == 'open' else self.backoff_base * (2 ** (attempt + 1))
+            raise UpstreamUnavailable(f"{model} is overloaded or unavailable ({error}); please try again shortly.",
+                                      retry_after) from error
+        with self._lock:
+            self.retried += 1
+        return self.backoff(attempt)
+
+    def call(self, model, task, fn):
+        """Runs fn() (one request to `model`) under the limiter and breaker, retrying transient failures."""
+        attempt = 0
+        while True:
+            probe = self._admit(model, task)
+            try:
+                result = fn()
+            except Exception as e:
+                time.sleep(self._failed(model, e, attempt, probe))
+                attempt += 1
+                continue
+            self._breaker(model).record_success()
+            return result
+
+    def stream(self, model, task, open_stream):
+        """Like call() for a streamed response. Retries happen only until the first chunk arrives."""
+        attempt = 0
+        while True:
+            probe = self._admit(model, task)
+            try:
+                # Opening the stream can fail too (e.g. the deadline passing), which must not strand the probe
+                stream = open_stream()
+                first = next(stream)
+            except StopIteration:
+                self._breaker(model).record_success()
+                return
+            except Exception as e:
+                time.sleep(self._failed(model, e, attempt, probe))
+                attempt += 1
+                continue
+            break
+        self._breaker(model).record_success()
+        yield first
+        yield from stream
+
+    def stats(self):
+        """Returns breaker state and queue length per model, plus the number of retries made."""
+        with self._lock:
+            models = set(self._limiters) | set(self._breakers)
+        result = {'retried': self.retried, 'models': {}}
+        for model in sorted(models):
+            breaker, limiter = self._breaker(model), self._limiter(model)
+            result['models'][model] = {
+                'circuit': breaker.state(),
+                'times_opened': breaker.times_opened,
+                'waiting': limiter.waiting() if limiter is not None else 0,
+            }
+        return result
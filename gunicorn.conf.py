@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+# --- Gunicorn Settings ---
+# Almost all request time is spent waiting on Gemini, not on CPU. Threaded workers let one
+# process hold many such requests at once (a thread costs far less memory than a process),
+# and with LLM_ASYNC=1 their upstream I/O is multiplexed on one event loop per worker.
+# Gunicorn loads this file automatically when started from the project directory.
+
+workers = int(os.getenv('WEB_CONCURRENCY', '2'))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', '64'))
+# Long generations are streamed, so this only needs to cover the slowest non-streaming call
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+keepalive = 5
+
+# Document ids, chat sessions and job ids are handed out by one worker and used by the next
+# request, which may land on another. With several workers they are shared through SQLite
+# files in APP_STATE_DIR, unless their paths are set explicitly. (Across several instances,
+# point these at shared storage or use sticky sessions.)
+if workers > 1:
+    state_dir = os.getenv('APP_STATE_DIR') or os.path.join(tempfile.gettempdir(), 'match-my-resume')
+    os.makedirs(state_dir, exist_ok=True)
+    for name, filename in (('DOCUMENT_STORE_SQLITE', 'documents.sqlite3'),
+                           ('CHAT_SESSION_SQLITE', 'chat_sessions.sqlite3'),
+                           ('JOB_STATE_SQLITE', 'jobs.sqlite3')):
+        os.environ.setdefault(name, os.path.join(state_dir, filename))
+
+# Importing the app is cheap (the Gemini SDK and client are set up on first use), so workers
+# boot fast without preloading. GUNICORN_PRELOAD=1 imports it once in the master instead and
+# shares those pages copy-on-write; each worker still creates its own Gemini client and HTTP
+# pool after the fork, since sockets must not be shared across processes.
+wsgi_app = 'app:create_app()'
+preload_app = os.getenv('GUNICORN_PRELOAD', '0') == '1'
+
+
+def post_worker_init(worker):
+    """With APP_WARMUP=1, loads the Gemini SDK and client in the background so the first request does not wait for them."""
+    if os.getenv('APP_WARMUP', '0') == '1':
+        import threading
+        import services
+        threading.Thread(target=services.warm_up, name='warm-up', daemon=True).start()
@@ -0,0 +1,393 @@
+import os
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import itertools
+import threading
+from sse import sse_event
+from metrics import record_error
+from governance import DeadlineExceeded, upstream_deadline
+
+# --- Background Job Queue ---
+# Long generations run on a bounded pool of worker threads instead of the request thread.
+# Submitting returns a job id at once; results are kept for a TTL and can be polled or
+# streamed. Submissions with the same dedupe key re-attach to the existing job, so a
+# retry or refresh never pays for a second generation.
+#
+# A watchdog enforces each job's time limit from outside: a job that overruns is reported as
+# timed_out at once and its worker thread is replaced, while the Gemini requests it made are
+# bounded by the time it had left, so the stuck thread exits soon after.
+#
+# Jobs run in the worker process that accepted them. With a SQLite file configured, that
+# worker also records each job's status there and appends its output chunks as they arrive,
+# so a status or event request that lands on another worker is answered from the file.
+
+PRIORITIES = {'high': 0, 'normal': 5, 'low': 9}
+FINISHED = ('succeeded', 'failed', 'timed_out')
+# A running job's output is written to the shared file at most this often, and read back as often
+PUBLISH_INTERVAL = 0.25
+# How often the watchdog looks for jobs past their deadline
+WATCHDOG_INTERVAL = 0.5
+# How often the watchdog drops results that have outlived the TTL
+PRUNE_INTERVAL = 60
+
+
+class JobTimeout(Exception):
+    """Raised inside a job when it runs past its deadline."""
+
+
+class QueueFull(Exception):
+    """Raised when too many jobs are already waiting."""
+
+
+class Job:
+    """A unit of background work plus everything a client needs to follow it."""
+
+    def __init__(self, job_queue, kind, run, priority, timeout, dedupe_key):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.run = run
+        self.priority = priority
+        self.timeout = timeout
+        self.dedupe_key = dedupe_key
+        self.status = 'queued'
+        self.output = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._queue = job_queue
+        self._deadline = None
+        self._published_at = 0
+        # Output chunks already appended to the shared file
+        self._published_chunks = 0
+        # Held while this job's state is written, so an older snapshot never lands after a newer one
+        self._publishing = threading.Lock()
+
+    def emit(self, text):
+        """Records a chunk of partial output and wakes anyone streaming this job.
+
+        Raises JobTimeout if the watchdog has already timed the job out, so its body stops.
+        """
+        with self._queue.changed:
+            if self.status in FINISHED:
+                raise JobTimeout(self.timeout_message())
+            self.output.append(text)
+            self._queue.changed.notify_all()
+        self._queue._publish(self)
+
+    def check_deadline(self):
+        """Raises JobTimeout if the job has used up its time budget. Call between units of work."""
+        if self.status in FINISHED or (self._deadline is not None and time.monotonic() > self._deadline):
+            raise JobTimeout(self.timeout_message())
+
+    def timeout_message(self):
+        return f"Job exceeded its {self.timeout} second time limit"
+
+    def snapshot(self):
+        """Returns the public, JSON-serialisable view of the job."""
+        data = {
+            'job_id': self.id,
+            'kind': self.kind,
+            'status': self.status,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+        if self.status == 'succeeded':
+            data['result'] = self.result
+        elif self.status in FINISHED:
+            data['error'] = self.error
+        return data
+
+
+class StoredJob:
+    """A job running in another worker process, as last recorded in the shared file. Its output is read separately."""
+
+    snapshot = Job.snapshot
+
+    def __init__(self, row):
+        (self.id, self.kind, self.status, result, self.error, self.timeout,
+         self.created_at, self.started_at, self.finished_at, self.updated_at) = row
+        self.result = json.loads(result) if result is not None else None
+
+
+class JobQueue:
+    """Priority queue served by a fixed number of worker threads, with TTL-bounded result storage."""
+
+    def __init__(self, max_workers=4, max_queued=1000, result_ttl=3600, default_timeout=300, sqlite_path=None):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.result_ttl = result_ttl
+        self.default_timeout = default_timeout
+        self.sqlite_path = sqlite_path
+        self.changed = threading.Condition()
+        self._pending = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._jobs = {}
+        self._by_key = {}
+        self._workers_pid = None
+        self._worker_ids = itertools.count()
+        if sqlite_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs ("
+                    "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, result TEXT, "
+                    "error TEXT, timeout REAL NOT NULL, created_at REAL NOT NULL, started_at REAL, finished_at REAL, "
+                    "updated_at REAL NOT NULL)"
+                )
+                # Append-only, so publishing costs the size of the new chunks rather than of all the output so far
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS job_chunks ("
+                    "job_id TEXT NOT NULL, seq INTEGER NOT NULL, text TEXT NOT NULL, PRIMARY KEY (job_id, seq))"
+                )
+
+    def _connect(self):
+        # A short-lived connection per operation keeps this safe across threads and forked workers
+        return sqlite3.connect(self.sqlite_path, timeout=5)
+
+    def _publish(self, job, force=False):
+        """Records a job's state and new output chunks in the shared file, at most every PUBLISH_INTERVAL seconds."""
+        if not self.sqlite_path:
+            return
+        now = time.monotonic()
+        if not force and now - job._published_at < PUBLISH_INTERVAL:
+            return
+        # Progress updates skip a write already in flight; status changes wait for it
+        if not job._publishing.acquire(blocking=force):
+            return
+        try:
+            job._published_at = now
+            with self.changed:
+                row = (job.id, job.kind, job.status, json.dumps(job.result) if job.result is not None else None,
+                       job.error, job.timeout, job.created_at, job.started_at, job.finished_at, time.time())
+                first = job._published_chunks
+                chunks = [(job.id, seq, text) for seq, text in enumerate(job.output[first:], first)]
+            with self._connect() as conn:
+                # Chunks go in the same transaction as the status, so a finished job is never read without its output
+                conn.executemany("INSERT OR IGNORE INTO job_chunks VALUES (?, ?, ?)", chunks)
+                conn.execute("INSERT OR REPLACE INTO jobs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", row)
+            job._published_chunks = first + len(chunks)
+        except sqlite3.Error as e:
+            print(f"Job state write failed: {e}")
+        finally:
+            job._publishing.release()
+
+    def _load(self, job_id):
+        """Returns the StoredJob recorded for this id by any worker, or None."""
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT id, kind, status, result, error, timeout, created_at, started_at, finished_at, updated_at "
+                    "FROM jobs WHERE id = ?", (job_id,),
+                ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Job state read failed: {e}")
+            return None
+        if row is None:
+            return None
+        job = StoredJob(row)
+        if job.finished_at and job.finished_at < time.time() - self.result_ttl:
+            return None
+        # A worker that dies mid-job stops updating its row; report that instead of waiting forever
+        if job.status not in FINISHED and time.time() - job.updated_at > job.timeout + 60:
+            job.status, job.error = 'failed', 'The worker running this job stopped before it finished'
+        return job
+
+    def _load_chunks(self, job_id, start):
+        """Returns the output chunks any worker has recorded for a job, from chunk number `start` on."""
+        try:
+            with self._connect() as conn:
+                rows = conn.execute(
+                    "SELECT text FROM job_chunks WHERE job_id = ? AND seq >= ? ORDER BY seq", (job_id, start),
+                ).fetchall()
+        except sqlite3.Error as e:
+            print(f"Job output read failed: {e}")
+            return []
+        return [text for text, in rows]
+
+    def _ensure_workers(self):
+        # Threads do not survive a fork, so workers are started lazily in each process. Caller holds the lock.
+        if self._workers_pid == os.getpid():
+            return
+        self._workers_pid = os.getpid()
+        for _ in range(self.max_workers):
+            self._start_worker()
+        threading.Thread(target=self._watch, name='job-watchdog', daemon=True).start()
+
+    def _start_worker(self):
+        threading.Thread(target=self._work, name=f'job-worker-{next(self._worker_ids)}', daemon=True).start()
+
+    def _expired(self, job):
+        return job.finished_at is not None and job.finished_at < time.time() - self.result_ttl
+
+    def _prune(self):
+        """Forgets finished jobs whose results have outlived the TTL, here and in the shared file."""
+        with self.changed:
+            expired = [job for job in self._jobs.values() if self._expired(job)]
+            for job in expired:
+                del self._jobs[job.id]
+                if job.dedupe_key and self._by_key.get(job.dedupe_key) == job.id:
+                    del self._by_key[job.dedupe_key]
+        if not self.sqlite_path:
+            return
+        cutoff = time.time() - self.result_ttl
+        try:
+            with self._connect() as conn:
+                conn.execute("DELETE FROM job_chunks WHERE job_id IN (SELECT id FROM jobs WHERE finished_at < ?)", (cutoff,))
+                conn.execute("DELETE FROM jobs WHERE finished_at < ?", (cutoff,))
+        except sqlite3.Error as e:
+            print(f"Job state cleanup failed: {e}")
+
+    def submit(self, kind, run, dedupe_key=None, priority='normal', timeout=None):
+        """Queues run(job) and returns (job, created). An existing live job with the same dedupe key is returned instead."""
+        with self.changed:
+            if dedupe_key:
+                existing = self._jobs.get(self._by_key.get(dedupe_key))
+                # Failed jobs are not re-attached to, so resubmitting retries them
+                if existing and existing.status not in ('failed', 'timed_out') and not self._expired(existing):
+                    return existing, False
+
+            if self._pending.qsize() >= self.max_queued:
+                raise QueueFull("Too many jobs are waiting; please try again shortly")
+
+            job = Job(self, kind, run, PRIORITIES.get(priority, PRIORITIES['normal']), timeout or self.default_timeout, dedupe_key)
+            self._jobs[job.id] = job
+            if dedupe_key:
+                self._by_key[dedupe_key] = job.id
+            self._ensure_workers()
+            self._pending.put((job.priority, next(self._sequence), job))
+        self._publish(job, force=True)
+        return job, True
+
+    def get(self, job_id):
+        """Returns the job with this id, or None if it never existed or has expired.
+
+        Jobs accepted by another worker are returned as a StoredJob when a shared file is configured.
+        """
+        with self.changed:
+            job = self._jobs.get(job_id)
+            # Expired jobs are only dropped every PRUNE_INTERVAL; until then they are hidden here
+            if job is not None and self._expired(job):
+                return None
+        if job is None and self.sqlite_path:
+            job = self._load(job_id)
+        return job
+
+    def _work(self):
+        while True:
+            _, _, job = self._pending.get()
+            with self.changed:
+                job.status = 'running'
+                job.started_at = time.time()
+                job._deadline = time.monotonic() + job.timeout
+                self.changed.notify_all()
+            self._publish(job, force=True)
+
+            try:
+                with upstream_deadline(job._deadline):
+                    result = job.run(job)
+                status, error = 'succeeded', None
+            except (JobTimeout, DeadlineExceeded):
+                result, status, error = None, 'timed_out', job.timeout_message()
+            except Exception as e:
+                if job.status not in FINISHED:
+                    print(f"Job {job.id} ({job.kind}) failed: {e}")
+                    record_error(f"job_{job.kind}", e)
+                result, status, error = None, 'failed', str(e)
+
+            with self.changed:
+                # The watchdog timed this job out and started a worker in this thread's place
+                if job.status in FINISHED:
+                    return
+                job.result = result
+                job.error = error
+                job.status = status
+                job.finished_at = time.time()
+                self.changed.notify_all()
+            self._publish(job, force=True)
+
+    def _watch(self):
+        """Times out running jobs that are past their deadline, even while they are blocked waiting on Gemini.
+
+        Also drops expired results every PRUNE_INTERVAL, off the request path.
+        """
+        pruned_at = time.monotonic()
+        while True:
+            time.sleep(WATCHDOG_INTERVAL)
+            if time.monotonic() - pruned_at >= PRUNE_INTERVAL:
+                pruned_at = time.monotonic()
+                self._prune()
+            now = time.monotonic()
+            with self.changed:
+                overdue = [job for job in self._jobs.values() if job.status == 'running' and job._deadline < now]
+                for job in overdue:
+                    job.status = 'timed_out'
+                    job.error = job.timeout_message()
+                    job.finished_at = time.time()
+                    # The stuck thread leaves once its job returns; until then a new one keeps the pool at full size
+                    self._start_worker()
+                if overdue:
+                    self.changed.notify_all()
+            for job in overdue:
+                print(f"Job {job.id} ({job.kind}) timed out after {job.timeout} seconds")
+                self._publish(job, force=True)
+
+    def stats(self):
+        """Returns counts of jobs by status."""
+        with self.changed:
+            counts = {'queued': 0, 'running': 0, 'succeeded': 0, 'failed': 0, 'timed_out': 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            return counts
+
+    def events(self, job, wait=15):
+        """Yields SSE frames for a job: its status, partial output as it arrives, then done or error."""
+        if isinstance(job, StoredJob):
+            yield from self._stored_events(job)
+            return
+        sent = 0
+        last_status = None
+        while True:
+            with self.changed:
+                self.changed.wait_for(
+                    lambda: len(job.output) > sent or job.status != last_status,
+                    timeout=wait,
+                )
+                chunks = job.output[sent:]
+                sent += len(chunks)
+                status = job.status
+                snapshot = job.snapshot() if status in FINISHED else None
+
+            if status != last_status and status not in FINISHED:
+                yield sse_event('status', {'job_id': job.id, 'status': status})
+            last_status = status
+            for text in chunks:
+                yield sse_event('chunk', {'text': text})
+            if snapshot is not None:
+                yield sse_event('done' if status == 'succeeded' else 'error', snapshot)
+                return
+
+    def _stored_events(self, job):
+        """Like events(), for a job running in another worker: polls the shared file for progress."""
+        sent = 0
+        last_status = None
+        while True:
+            if job.status != last_status and job.status not in FINISHED:
+                yield sse_event('status', {'job_id': job.id, 'status': job.status})
+            last_status = job.status
+            # Read after the status, so a finished job's chunks are all there
+            for text in self._load_chunks(job.id, sent):
+                yield sse_event('chunk', {'text': text})
+                sent += 1
+            if job.status in FINISHED:
+                yield sse_event('done' if job.status == 'succeeded' else 'error', job.snapshot())
+                return
+            time.sleep(PUBLISH_INTERVAL)
+            job = self._load(job.id)
+            if job is None:
+                yield sse_event('error', {'error': 'Job not found or expired'})
+                return
@@ -0,0 +1,66 @@
+import json
+
+# --- Incremental JSON Fields ---
+# Gemini's structured output arrives as one JSON object split across stream chunks. The
+# parser below scans each chunk once and hands back every top-level field as soon as its
+# value is complete, so a short field such as ats_score can be shown before the long
+# narrative fields behind it have been generated.
+
+
+class JsonFieldParser:
+    """Feeds a streamed JSON object and returns each top-level (name, value) pair once it is complete."""
+
+    def __init__(self):
+        self.text = ''
+        self.fields = {}
+        self._position = 0
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key_start = None
+        self._key = None
+        self._value_start = None
+
+    def feed(self, chunk):
+        """Adds a chunk of the response and returns the fields it completed, in order."""
+        self.text += chunk
+        text = self.text
+        completed = []
+        for position in range(self._position, len(text)):
+            char = text[position]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._key is None:
+                        self._key = json.loads(text[self._key_start:position + 1])
+                continue
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._key is None:
+                    self._key_start = position
+            elif char in '{[':
+                self._depth += 1
+            elif char == ':' and self._depth == 1:
+                self._value_start = position + 1
+            elif char in ',}]':
+                # A comma or the closing brace at the top level ends the current value
+                if self._depth == 1 and char != ']' and self._value_start is not None:
+                    value = json.loads(text[self._value_start:position])
+                    self.fields[self._key] = value
+                    completed.append((self._key, value))
+                    self._key = self._value_start = None
+                if char != ',':
+                    self._depth -= 1
+        self._position = len(text)
+        return completed
+
+    def result(self):
+        """Returns the whole object. Raises ValueError if the response was cut off or is not a JSON object."""
+        result = json.loads(self.text)
+        if not isinstance(result, dict):
+            raise ValueError('Expected a JSON object in the response.')
+        return result
@@ -0,0 +1,439 @@
+import os
+import json
+import time
+import queue
+import asyncio
+import sqlite3
+import hashlib
+import importlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from routing import should_fall_back
+from metrics import record_llm_call, timed
+from governance import remaining_time
+
+# --- Gemini Gateway: response cache + request coalescing ---
+# Every generate_content call in the app goes through LLMGateway. Calls made with a
+# cache namespace that is enabled are answered from the cache when possible, and
+# identical calls that are already in flight share a single upstream request.
+
+
+def request_key(model, contents, config):
+    """Returns a stable hash of everything that determines a model response."""
+    payload = {
+        'model': model,
+        'contents': contents,
+        # Covers system instruction, temperature, response MIME type and schema
+        'config': config.model_dump(mode='json', exclude_none=True) if config is not None else None,
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+
+class CachedResponse:
+    """Minimal stand-in for a GenerateContentResponse served from the cache."""
+
+    cached = True
+
+    def __init__(self, text):
+        self.text = text
+        self.usage_metadata = None
+
+
+class RoutedResponse:
+    """A model response plus the routing decision that produced it (SDK responses reject extra attributes)."""
+
+    cached = False
+
+    def __init__(self, response, routing):
+        self.response = response
+        self.routing = routing
+
+    def __getattr__(self, name):
+        return getattr(self.response, name)
+
+
+class ResponseCache:
+    """TTL + LRU cache of response text, optionally backed by a SQLite file shared across workers."""
+
+    def __init__(self, max_entries=512, ttl=3600, sqlite_path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sqlite_path = sqlite_path
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        if sqlite_path:
+            with self._connect() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+
+    def _connect(self):
+        # A short-lived connection per operation keeps this safe across threads and forked workers
+        return sqlite3.connect(self.sqlite_path, timeout=5)
+
+    def get(self, key):
+        """Returns cached text for a key, or None if absent or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        if self.sqlite_path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT value, expires_at FROM llm_cache WHERE key = ? AND expires_at > ?",
+                        (key, now),
+                    ).fetchone()
+            except sqlite3.Error as e:
+                print(f"LLM cache read failed: {e}")
+                row = None
+            if row:
+                with self._lock:
+                    self._store(key, row[0], row[1])
+                    self.hits += 1
+                return row[0]
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def _store(self, key, value, expires_at):
+        """Inserts into the memory tier and evicts the least-recently-used entries. Caller holds the lock."""
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def put(self, key, value):
+        """Stores response text until the TTL elapses."""
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._store(key, value, expires_at)
+
+        if self.sqlite_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                        (key, value, expires_at),
+                    )
+                    conn.execute("DELETE FROM llm_cache WHERE expires_at <= ?", (time.time(),))
+            except sqlite3.Error as e:
+                print(f"LLM cache write failed: {e}")
+
+    def stats(self):
+        """Returns a snapshot of the cache counters."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key so only one of them does the work."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """Runs fn() once per key at a time; concurrent callers receive the same result or exception."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+def build_http_options(max_connections=100, max_keepalive=20):
+    """HTTP options that give the sync and async Gemini clients one bounded, keep-alive connection pool each."""
+    import httpx
+    from google.genai import types
+
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive)
+    return types.HttpOptions(
+        httpx_client=httpx.Client(limits=limits, timeout=None),
+        httpx_async_client=httpx.AsyncClient(limits=limits, timeout=None),
+    )
+
+
+def with_deadline(config):
+    """Returns config with its HTTP timeout set to the time left before the caller's upstream deadline, if any.
+
+    Without one requests have no timeout (see build_http_options). Applied per attempt, after the
+    cache key is built, so retries get what is left and the timeout never changes the key.
+    """
+    remaining = remaining_time()
+    if remaining is None:
+        return config
+    from google.genai import types
+    timeout = max(1, int(remaining * 1000))  # milliseconds
+    if config is None:
+        return types.GenerateContentConfig(http_options=types.HttpOptions(timeout=timeout))
+    http_options = (config.http_options or types.HttpOptions()).model_copy(update={'timeout': timeout})
+    return config.model_copy(update={'http_options': http_options})
+
+
+class LazyModule:
+    """Imports a module on first attribute access, keeping heavy SDK imports off the worker startup path."""
+
+    def __init__(self, name):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self._name), attr)
+
+
+class LazyClient:
+    """Creates the Gemini client on first use in each process.
+
+    A worker forked from a preloaded master must not reuse the master's sockets, so the client
+    (and the HTTP pool every thread of the worker shares) is built per pid. A failure is kept
+    for the process, so a missing API key is reported once rather than on every request.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._client = None
+        self._error = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Returns this process's client, creating it if needed. Raises RuntimeError if it cannot be created."""
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid, self._client, self._error = os.getpid(), None, None
+                try:
+                    self._client = self.factory()
+                    print("Gemini Client initialized successfully.")
+                except Exception as e:
+                    self._error = e
+                    print(f"Error initializing Gemini Client: {e}")
+            if self._client is None:
+                raise RuntimeError(f"Gemini Client not initialized: {self._error}")
+            return self._client
+
+    def __bool__(self):
+        try:
+            self.get()
+        except RuntimeError:
+            return False
+        return True
+
+    def __getattr__(self, name):
+        return getattr(self.get(), name)
+
+
+_STREAM_END = object()
+
+
+class AsyncRunner:
+    """A background event loop that multiplexes every async Gemini request made by this worker process.
+
+    Request threads submit coroutines and block on the result, so hundreds of in-flight
+    Gemini calls share one loop and one connection pool instead of a process each.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+
+    def loop(self):
+        """Returns the running loop, starting it lazily (and again after a fork, since threads do not survive one)."""
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid():
+                self._loop = asyncio.new_event_loop()
+                self._pid = os.getpid()
+                threading.Thread(target=self._loop.run_forever, name='gemini-async-io', daemon=True).start()
+            return self._loop
+
+    def run(self, coro, timeout=None):
+        """Runs a coroutine on the shared loop and waits for its result."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop()).result(timeout)
+
+    def iterate(self, open_stream):
+        """Bridges an async stream into a regular generator. `open_stream` is a coroutine function returning an async iterator."""
+        items = queue.Queue()
+
+        async def pump():
+            try:
+                async for item in await open_stream():
+                    items.put((item, None))
+            except Exception as e:
+                items.put((None, e))
+                return
+            items.put((_STREAM_END, None))
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self.loop())
+        try:
+            while True:
+                item, error = items.get()
+                if error is not None:
+                    raise error
+                if item is _STREAM_END:
+                    return
+                yield item
+        finally:
+            # Stop reading from Gemini if the consumer goes away (e.g. the browser closed the stream)
+            future.cancel()
+
+
+class LLMGateway:
+    """Front door for all Gemini calls made by the app.
+
+    With use_async=True, calls go through the SDK's async client (client.aio) on a shared
+    event loop; callers still use the same blocking methods. With a router, calls that name
+    a task are compacted, routed to the task's model and retried on its fallback models.
+    With a governor, each request to a model is rate limited, retried and circuit-broken.
+    """
+
+    def __init__(self, client, cache=None, cached_namespaces=(), use_async=False, router=None, governor=None):
+        self.client = client
+        self.cache = cache
+        self.cached_namespaces = set(cached_namespaces)
+        self.singleflight = SingleFlight()
+        self.use_async = use_async
+        self.runner = AsyncRunner() if use_async else None
+        self.router = router
+        self.governor = governor
+
+    def _generate(self, model, contents, config):
+        config = with_deadline(config)
+        if self.use_async:
+            return self.runner.run(self.client.aio.models.generate_content(model=model, contents=contents, config=config))
+        return self.client.models.generate_content(model=model, contents=contents, config=config)
+
+    def _open_stream(self, model, contents, config):
+        config = with_deadline(config)
+        if self.use_async:
+            return self.runner.iterate(
+                lambda: self.client.aio.models.generate_content_stream(model=model, contents=contents, config=config)
+            )
+        return self.client.models.generate_content_stream(model=model, contents=contents, config=config)
+
+    def _governed_generate(self, model, contents, config, task):
+        if self.governor is None:
+            return self._generate(model, contents, config)
+        return self.governor.call(model, task, lambda: self._generate(model, contents, config))
+
+    def _governed_stream(self, model, contents, config, task):
+        if self.governor is None:
+            return self._open_stream(model, contents, config)
+        return self.governor.stream(model, task, lambda: self._open_stream(model, contents, config))
+
+    def _route(self, task, model, contents):
+        if self.router is None:
+            return contents, [model], {'task': task, 'model': model, 'input_tokens': None, 'tokens_saved': 0, 'fallback_from': []}
+        with timed('compact'):
+            return self.router.prepare(task, contents, model)
+
+    def _generate_with_fallback(self, models, contents, config, routing):
+        """Tries each candidate model in turn, moving on only for errors another model might not hit."""
+        for index, model in enumerate(models):
+            started = time.perf_counter()
+            try:
+                response = self._governed_generate(model, contents, config, routing['task'])
+            except Exception as e:
+                record_llm_call(routing['task'], model, time.perf_counter() - started, outcome=type(e).__name__)
+                if index == len(models) - 1 or not should_fall_back(e):
+                    raise
+                print(f"Model {model} failed for {routing['task']}, falling back to {models[index + 1]}: {e}")
+                routing['fallback_from'].append(model)
+                continue
+            record_llm_call(routing['task'], model, time.perf_counter() - started, getattr(response, 'usage_metadata', None))
+            routing['model'] = model
+            return response
+
+    def generate_content(self, model, contents, config=None, cache_namespace=None, task=None):
+        """Calls client.models.generate_content, using the response cache if the namespace opted in.
+
+        The returned response carries a `routing` dict: task, model used, estimated input
+        tokens, tokens saved by compaction and any models that were skipped over.
+        """
+        contents, models, routing = self._route(task or cache_namespace, model, contents)
+
+        if self.cache is None or cache_namespace not in self.cached_namespaces:
+            return RoutedResponse(self._generate_with_fallback(models, contents, config, routing), routing)
+
+        # Keyed on the primary model, so an answer served by a fallback is still found next time
+        key = f"{cache_namespace}:{request_key(models[0], contents, config)}"
+        text = self.cache.get(key)
+        if text is not None:
+            response = CachedResponse(text)
+            response.routing = {**routing, 'cached': True}
+            return response
+
+        def call_upstream():
+            response = self._generate_with_fallback(models, contents, config, routing)
+            if response.text:
+                self.cache.put(key, response.text)
+            return RoutedResponse(response, routing)
+
+        return self.singleflight.do(key, call_upstream)
+
+    def generate_content_stream(self, model, contents, config=None, task=None, routing=None):
+        """Calls client.models.generate_content_stream. Streams are never cached.
+
+        If a `routing` dict is passed it is filled in once a model has started streaming.
+        A fallback model is only tried if the failing one has not produced any output yet.
+        """
+        contents, models, chosen = self._route(task, model, contents)
+        for index, candidate in enumerate(models):
+            started, opened_at, usage = False, time.perf_counter(), None
+            try:
+                for chunk in self._governed_stream(candidate, contents, config, chosen['task']):
+                    if not started:
+                        started = True
+                        chosen['model'] = candidate
+                        if routing is not None:
+                            routing.update(chosen)
+                    # Usage is reported cumulatively; the last chunk carries the totals
+                    usage = getattr(chunk, 'usage_metadata', None) or usage
+                    yield chunk
+                record_llm_call(chosen['task'], candidate, time.perf_counter() - opened_at, usage)
+                return
+            except Exception as e:
+                record_llm_call(chosen['task'], candidate, time.perf_counter() - opened_at, usage, outcome=type(e).__name__)
+                if started or index == len(models) - 1 or not should_fall_back(e):
+                    raise
+                print(f"Model {candidate} failed for {chosen['task']}, falling back to {models[index + 1]}: {e}")
+                chosen['fallback_from'].append(candidate)
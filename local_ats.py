@@ -0,0 +1,226 @@
+import re
+import math
+from collections import Counter
+
+# --- Local ATS Scoring Engine ---
+# A deterministic, in-process approximation of the Gemini ATS scorecard. It checks the
+# same things the LLM prompt asks about and returns the same fields in milliseconds.
+
+SECTION_PATTERNS = {
+    'summary': r'summary|profile|objective|about me',
+    'experience': r'experience|employment|work history|professional background',
+    'education': r'education|academic|qualifications',
+    'skills': r'skills|technical skills|core competencies|technologies|tools',
+    'projects': r'projects|portfolio',
+    'certifications': r'certifications?|licenses|awards|achievements',
+}
+REQUIRED_SECTIONS = ('experience', 'education', 'skills')
+
+# Header lines are short, and either uppercase, bold Markdown, or end with a colon
+_HEADER_LINE = re.compile(r'^\s*(?:\*\*)?\s*([A-Za-z &/]{3,40}?)\s*(?:\*\*)?\s*:?\s*$')
+
+EMAIL_RE = re.compile(r'[\w.+-]+@[\w-]+\.[\w.-]+')
+PHONE_RE = re.compile(r'(?:\+?\d{1,3}[\s.-]?)?\(?\d{3}\)?[\s.-]?\d{3}[\s.-]?\d{4}')
+LINKEDIN_RE = re.compile(r'linkedin\.com/\S+', re.IGNORECASE)
+URL_RE = re.compile(r'(?:https?://|www\.|github\.com/)\S+', re.IGNORECASE)
+
+BULLET_RE = re.compile(r'^\s*(?:[-*•●▪◦‣]|\d+[.)])\s+(.*)$')
+QUANTIFIED_RE = re.compile(r'\d+(?:[.,]\d+)?\s*(?:%|percent|\+|x\b|k\b|m\b|million|billion)|[$€£₹]\s?\d|\b\d{2,}\b', re.IGNORECASE)
+WORD_RE = re.compile(r"[a-z][a-z0-9+#.\-]*[a-z0-9+#]|[a-z]", re.IGNORECASE)
+
+ACTION_VERBS = frozenset("""
+accelerated achieved administered analyzed architected automated boosted built championed coached
+collaborated conceived consolidated coordinated created cut debugged decreased delivered deployed designed
+developed devised directed drove eliminated enabled engineered enhanced established executed expanded
+facilitated founded generated grew guided headed implemented improved increased initiated integrated
+introduced launched led maintained managed mentored migrated modernized negotiated optimized orchestrated
+organized oversaw partnered pioneered planned produced programmed published reduced refactored resolved
+restructured revamped saved scaled secured shipped simplified spearheaded standardized streamlined
+strengthened supervised supported tested trained transformed tuned upgraded won wrote
+""".split())
+
+STOP_WORDS = frozenset("""
+a about above after again all also am an and any are as at be because been being below between both but by
+can could did do does doing down during each etc few for from further had has have having he her here hers
+him his how i if in into is it its itself just me more most my no nor not now of off on once only or other
+our ours out over own per same she should so some such than that the their theirs them then there these they
+this those through to too under until up very via was we were what when where which while who whom why will
+with within without would you your yours will able ability strong excellent good great work working team
+role position candidate candidates company job including include includes required requirements preferred
+plus years year experience responsibilities responsible must across well new using use used need needs
+know knowledge looking seeking join ideal ideally familiarity understanding
+""".split())
+
+IDEAL_WORDS = (350, 900)
+
+
+def tokenize(text):
+    """Lowercased content words with stop words removed."""
+    return [w for w in (m.group(0).lower() for m in WORD_RE.finditer(text)) if w not in STOP_WORDS and len(w) > 1]
+
+
+def _header_sections(line):
+    """Yields every canonical section name a header line matches (e.g. 'Skills and Certifications' matches two)."""
+    match = _HEADER_LINE.match(line)
+    if not match:
+        return
+    header = match.group(1).strip().lower()
+    for name, pattern in SECTION_PATTERNS.items():
+        if re.fullmatch(rf'(?:[a-z ]+ )?(?:{pattern})(?: [a-z ]+)?', header):
+            yield name
+
+
+def classify_header(line):
+    """Returns the first canonical section name a header line matches, or None if it is not a known header."""
+    return next(_header_sections(line), None)
+
+
+def detect_sections(text):
+    """Returns the set of canonical section names whose headers appear in the text."""
+    return {name for line in text.splitlines() for name in _header_sections(line)}
+
+
+def tfidf_similarity(resume_text, job_description, top_n=25):
+    """Cosine similarity of sparse TF-IDF vectors plus the JD's most distinctive terms.
+
+    IDF is computed over the lines of both documents, so terms that appear everywhere
+    (boilerplate) are down-weighted and specific skills dominate the comparison.
+    """
+    resume_tokens = tokenize(resume_text)
+    jd_tokens = tokenize(job_description)
+    if not resume_tokens or not jd_tokens:
+        return 0.0, [], []
+
+    lines = [set(tokenize(line)) for line in (resume_text + '\n' + job_description).splitlines()]
+    lines = [line for line in lines if line]
+    doc_freq = Counter(term for line in lines for term in line)
+    n_docs = len(lines)
+    idf = {term: math.log((1 + n_docs) / (1 + df)) + 1 for term, df in doc_freq.items()}
+
+    def vectorize(tokens):
+        counts = Counter(tokens)
+        total = len(tokens)
+        return {term: (count / total) * idf.get(term, 1.0) for term, count in counts.items()}
+
+    resume_vec = vectorize(resume_tokens)
+    jd_vec = vectorize(jd_tokens)
+    dot = sum(weight * resume_vec.get(term, 0.0) for term, weight in jd_vec.items())
+    norm = math.sqrt(sum(w * w for w in resume_vec.values())) * math.sqrt(sum(w * w for w in jd_vec.values()))
+    similarity = dot / norm if norm else 0.0
+
+    top_terms = sorted(jd_vec, key=lambda term: (-jd_vec[term], term))[:top_n]
+    matched = [term for term in top_terms if term in resume_vec]
+    missing = [term for term in top_terms if term not in resume_vec]
+    return similarity, matched, missing
+
+
+def _html_list(items):
+    return "<ul>" + "".join(f"<li>{item}</li>" for item in items) + "</ul>"
+
+
+def score_resume(resume_text, job_description=None):
+    """Scores a resume for ATS compatibility and returns a scorecard shaped like the Gemini one."""
+    lines = [line for line in resume_text.splitlines() if line.strip()]
+    words = tokenize(resume_text)
+    word_count = len(WORD_RE.findall(resume_text))
+    strengths, improvements = [], []
+    breakdown = {}
+
+    # 1. Section / header detection (25 points)
+    sections = detect_sections(resume_text)
+    required_found = [s for s in REQUIRED_SECTIONS if s in sections]
+    optional_found = [s for s in sections if s not in REQUIRED_SECTIONS]
+    breakdown['sections'] = round(20 * len(required_found) / len(REQUIRED_SECTIONS) + min(5, 2.5 * len(optional_found)))
+    if len(required_found) == len(REQUIRED_SECTIONS):
+        strengths.append("Clear standard section headers (" + ", ".join(s.title() for s in sorted(sections)) + ")")
+    for name in REQUIRED_SECTIONS:
+        if name not in sections:
+            improvements.append(f"Add a clearly labelled {name.title()} section header")
+    if 'summary' not in sections:
+        improvements.append("Add a short professional summary at the top")
+
+    # 2. Contact completeness (15 points)
+    contact = {
+        'email': bool(EMAIL_RE.search(resume_text)),
+        'phone': bool(PHONE_RE.search(resume_text)),
+        'linkedin': bool(LINKEDIN_RE.search(resume_text)),
+        'website': bool(URL_RE.search(resume_text)),
+    }
+    breakdown['contact'] = 5 * contact['email'] + 5 * contact['phone'] + 3 * contact['linkedin'] + 2 * contact['website']
+    if contact['email'] and contact['phone']:
+        strengths.append("Complete contact details")
+    missing_contact = [name for name in ('email', 'phone', 'linkedin') if not contact[name]]
+    if missing_contact:
+        improvements.append("Include your " + ", ".join(missing_contact) + " in the header")
+
+    # 3. Length appropriateness (10 points)
+    low, high = IDEAL_WORDS
+    if low <= word_count <= high:
+        breakdown['length'] = 10
+        strengths.append(f"Appropriate length ({word_count} words)")
+    elif word_count < low:
+        breakdown['length'] = round(10 * word_count / low)
+        improvements.append(f"Resume is short ({word_count} words); expand on experience and results")
+    else:
+        breakdown['length'] = max(0, round(10 - 10 * (word_count - high) / high))
+        improvements.append(f"Resume is long ({word_count} words); tighten to the most relevant content")
+
+    # 4. Action verbs and quantified achievements (15 + 15 points)
+    bullets = [m.group(1) for m in (BULLET_RE.match(line) for line in lines) if m]
+    statements = bullets or lines
+    starts_with_verb = sum(1 for s in statements if s.split() and s.split()[0].lower().strip('.,:;') in ACTION_VERBS)
+    quantified = sum(1 for s in statements if QUANTIFIED_RE.search(s))
+    verb_ratio = starts_with_verb / len(statements) if statements else 0.0
+    quant_ratio = quantified / len(statements) if statements else 0.0
+    # Saturate well below 100% so a resume does not need every line to be a metric
+    breakdown['action_verbs'] = round(15 * min(1.0, verb_ratio / 0.6))
+    breakdown['quantified_achievements'] = round(15 * min(1.0, quant_ratio / 0.4))
+    if verb_ratio >= 0.5:
+        strengths.append("Bullet points lead with strong action verbs")
+    else:
+        improvements.append("Start more bullet points with action verbs (e.g. Led, Built, Reduced)")
+    if quant_ratio >= 0.3:
+        strengths.append("Achievements are quantified with numbers and metrics")
+    else:
+        improvements.append("Quantify more achievements with numbers, percentages or amounts")
+
+    # 5. Keyword coverage (20 points)
+    result = {}
+    if job_description:
+        similarity, matched, missing = tfidf_similarity(resume_text, job_description)
+        coverage = len(matched) / (len(matched) + len(missing)) if matched or missing else 0.0
+        # Blend raw keyword coverage with the overall TF-IDF cosine, which rarely exceeds ~0.5
+        breakdown['keywords'] = round(20 * (0.6 * coverage + 0.4 * min(1.0, similarity / 0.5)))
+        result['keyword_similarity'] = round(similarity, 4)
+        result['matched_keywords'] = matched
+        result['missing_keywords'] = missing
+        if coverage >= 0.6:
+            strengths.append("Good coverage of the job description's key terms")
+        if missing:
+            improvements.append("Work in missing job keywords where truthful: " + ", ".join(missing[:10]))
+    else:
+        # Without a JD, reward a rich, non-repetitive vocabulary of specific terms
+        distinct = len(set(words))
+        breakdown['keywords'] = round(20 * min(1.0, distinct / 150))
+        if distinct >= 150:
+            strengths.append("Rich, specific vocabulary of industry terms")
+        else:
+            improvements.append("Add more specific tools, technologies and domain keywords")
+
+    score = max(0, min(100, sum(breakdown.values())))
+    if score >= 75:
+        verdict = "This resume is well structured for ATS screening."
+    elif score >= 50:
+        verdict = "This resume should pass many ATS filters but has clear room for improvement."
+    else:
+        verdict = "This resume is likely to struggle with ATS screening in its current form."
+
+    result.update({
+        'ats_score': score,
+        'strengths': _html_list(strengths[:5] or ["Readable plain-text content"]),
+        'improvements': _html_list(improvements[:5] or ["No major issues detected"]),
+        'overall_assessment': f"{verdict} (Deterministic local score based on structure, contact details, length, action verbs, metrics and keywords.)",
+        'breakdown': breakdown,
+        'mode': 'local',
+    })
+    return result
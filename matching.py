@@ -0,0 +1,118 @@
+import os
+from flask import Blueprint, request, jsonify
+from sse import sse_event, sse_response
+from batch import fan_out
+from metrics import record_error, timed
+from governance import upstream_priority
+from analysis import generate_skill_gap_analysis, local_skill_gap, retry_fields
+from documents import json_object
+from services import document_store, llm, posting_index, resume_from_upload
+
+# --- Job Matching Routes ---
+# Ingests job postings into the inverted index and answers "which postings fit this resume"
+# in milliseconds. Gemini is only asked about the few best matches, and only on request.
+
+bp = Blueprint('matching', __name__)
+
+POSTINGS_MAX_BATCH = int(os.getenv('POSTINGS_MAX_BATCH', '5000'))
+POSTINGS_MAX_TOP_K = int(os.getenv('POSTINGS_MAX_TOP_K', '100'))
+# Skill gap analysis (local or Gemini) runs on at most this many of the best matches
+POSTINGS_MAX_SKILL_GAP = int(os.getenv('POSTINGS_MAX_SKILL_GAP', '10'))
+MATCH_SKILL_GAP_MODES = ('local', 'llm')
+
+@bp.route('/postings', methods=['POST'])
+def ingest_postings():
+    """Indexes a JSON list of postings ({text, optional id, title, company, location, url}) and returns their ids.
+
+    Also accepts {'postings': [...]}. A posting sent again with the same id replaces the earlier one.
+    """
+    body = request.get_json(silent=True)
+    postings = body.get('postings') if isinstance(body, dict) else body
+    if not isinstance(postings, list) or not postings:
+        return jsonify({'error': 'Send a non-empty JSON list of postings, or {"postings": [...]}'}), 400
+    if len(postings) > POSTINGS_MAX_BATCH:
+        return jsonify({'error': f"At most {POSTINGS_MAX_BATCH} postings can be sent at once"}), 400
+    if not all(isinstance(posting, dict) and isinstance(posting.get('text'), str) and posting['text'].strip()
+               for posting in postings):
+        return jsonify({'error': 'Every posting must be an object with a non-empty text'}), 400
+
+    with timed('index'):
+        ids = posting_index.add(postings)
+    return jsonify({'ids': ids, **posting_index.stats()})
+
+@bp.route('/postings', methods=['GET'])
+def postings_stats():
+    """Returns the size of the posting index."""
+    posting_index.refresh()
+    return jsonify(posting_index.stats())
+
+@bp.route('/postings/<posting_id>', methods=['GET'])
+def get_posting(posting_id):
+    """Returns one indexed posting with its full text."""
+    posting = posting_index.get(posting_id)
+    if posting is None:
+        return jsonify({'error': f"Job posting '{posting_id}' was not found.", 'id': posting_id}), 404
+    return jsonify(posting)
+
+def match_skill_gap_events(matches, texts, resume_text, concurrency):
+    """Streams the matches, then a Gemini skill gap analysis for each shortlisted posting as it finishes."""
+    yield sse_event('matches', {'matches': matches})
+
+    def analyze(match):
+        # Shortlist analyses wait behind interactive requests when Gemini quota is short
+        with upstream_priority('batch'):
+            return generate_skill_gap_analysis(texts[match['id']], resume_text)
+
+    completed = 0
+    for match, result, error in fan_out([match for match in matches if match['id'] in texts], analyze, concurrency):
+        completed += 1
+        if error is not None:
+            print(f"Posting skill gap API Error for {match['id']}: {error}")
+            record_error('matching', error)
+            yield sse_event('item_error', {'id': match['id'], 'rank': match['rank'], 'error': f"Failed to analyze: {error}", **retry_fields(error)})
+        else:
+            yield sse_event('result', {'id': match['id'], 'rank': match['rank'], 'skill_gap': result})
+
+    yield sse_event('done', {'analyzed': completed, 'total': len(matches)})
+
+@bp.route('/postings/match', methods=['POST'])
+def match_postings():
+    """Returns the top_k indexed postings for a resume, best first, with the keywords they share.
+
+    The resume is an uploaded file ('resume', PDF or DOCX) or JSON resume_text / resume_id.
+    skill_gap=local adds the taxonomy skill gap to the best skill_gap_top matches; skill_gap=llm
+    streams the matches as Server-Sent Events, then a Gemini skill gap analysis for each of them.
+    """
+    if 'resume' in request.files:
+        body = request.form
+        resume_text = resume_from_upload(request.files['resume'])
+    else:
+        body = json_object(request.get_json(silent=True))
+        resume_text = document_store.resolve(body, 'resume_text', 'resume_id')
+    if not resume_text or not resume_text.strip():
+        return jsonify({'error': 'Upload a resume or send resume_text or resume_id'}), 400
+
+    skill_gap = body.get('skill_gap') or None
+    if skill_gap is not None and skill_gap not in MATCH_SKILL_GAP_MODES:
+        return jsonify({'error': f"Invalid skill_gap. Use one of: {', '.join(MATCH_SKILL_GAP_MODES)}."}), 400
+    try:
+        top_k = max(1, min(int(body.get('top_k', 10)), POSTINGS_MAX_TOP_K))
+        skill_gap_top = max(0, min(int(body.get('skill_gap_top', 3)), POSTINGS_MAX_SKILL_GAP, top_k))
+        concurrency = max(1, min(int(body.get('concurrency', 4)), POSTINGS_MAX_SKILL_GAP))
+    except (TypeError, ValueError):
+        return jsonify({'error': 'top_k, skill_gap_top and concurrency must be integers'}), 400
+
+    with timed('search'):
+        matches = posting_index.search(resume_text, top_k)
+    texts = posting_index.texts([match['id'] for match in matches[:skill_gap_top]]) if skill_gap else {}
+
+    if skill_gap == 'llm' and texts:
+        if not llm.client:
+            return jsonify({'error': 'Gemini Client not initialized.'}), 500
+        return sse_response(match_skill_gap_events(matches, texts, resume_text, concurrency))
+
+    if skill_gap == 'local':
+        for match in matches:
+            if match['id'] in texts:
+                match['skill_gap'] = local_skill_gap(texts[match['id']], resume_text)
+    return jsonify({'matches': matches, 'total': posting_index.stats()['postings']})
@@ -0,0 +1,207 @@
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+# --- Metrics + Request Timing ---
+# A small in-process registry of counters and histograms, rendered in the Prometheus text
+# format at /metrics, plus per-request stage timings sent back as a Server-Timing header.
+# Each gunicorn worker keeps its own registry; scrape every worker (or aggregate by
+# instance) to get totals.
+
+# Seconds; wide enough for a 2-minute Gemini call, fine enough for a cached lookup
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+
+METRIC_HELP = {
+    'http_requests_total': ('counter', 'Requests handled, by route, method and status code.'),
+    'http_request_duration_seconds': ('histogram', 'Time from request start until the response body was fully sent.'),
+    'app_stage_duration_seconds': ('histogram', 'Time spent in each request stage (upload, extract, prompt, compact).'),
+    'app_errors_total': ('counter', 'Errors by the code path that caught them and exception type.'),
+    'gemini_requests_total': ('counter', 'Gemini calls by task, model and outcome (ok or the exception type).'),
+    'gemini_request_duration_seconds': ('histogram', 'Gemini call latency, including the whole body for streams.'),
+    'gemini_tokens_total': ('counter', 'Tokens reported in Gemini usage_metadata, by task, model and kind.'),
+}
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labels, extra=None):
+    pairs = list(labels) + (list(extra.items()) if extra else [])
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in pairs) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    """Cumulative-bucket histogram for one label set."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.sum += value
+        self.count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+
+
+class MetricsRegistry:
+    """Thread-safe counters and histograms keyed by metric name and label set.
+
+    Collectors registered with add_collector() are called at render time and return
+    (name, kind, help, labels, value) samples, for values other components already track.
+    """
+
+    def __init__(self, help_text=None):
+        self.help_text = dict(help_text or {})
+        self._counters = {}
+        self._histograms = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, buckets=DEFAULT_BUCKETS, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def add_collector(self, collector):
+        self._collectors.append(collector)
+
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format (version 0.0.4)."""
+        families = {}
+
+        def family(name, kind, help_text=None):
+            if name not in families:
+                default_kind, default_help = self.help_text.get(name, (kind, ''))
+                families[name] = {'kind': default_kind, 'help': help_text or default_help, 'lines': []}
+            return families[name]['lines']
+
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                family(name, 'counter').append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                lines = family(name, 'histogram')
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    lines.append(f"{name}_bucket{_format_labels(labels, {'le': _format_value(float(bound))})} {count}")
+                lines.append(f"{name}_bucket{_format_labels(labels, {'le': '+Inf'})} {histogram.count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {_format_value(histogram.sum)}")
+                lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+
+        for collector in self._collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                print(f"Metrics collector failed: {e}")
+                continue
+            for name, kind, help_text, labels, value in samples:
+                family(name, kind, help_text).append(f"{name}{_format_labels(_label_key(labels))} {_format_value(value)}")
+
+        output = []
+        for name, metric in families.items():
+            if metric['help']:
+                output.append(f"# HELP {name} {metric['help']}")
+            output.append(f"# TYPE {name} {metric['kind']}")
+            output.extend(metric['lines'])
+        return '\n'.join(output) + '\n'
+
+
+class RequestTimings:
+    """Stage durations for one request, rendered as a Server-Timing header value."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages = []
+
+    def add(self, name, seconds, description=None):
+        self.stages.append((name, seconds, description))
+
+    def header(self):
+        entries = []
+        for name, seconds, description in self.stages + [('total', time.perf_counter() - self.started, None)]:
+            entry = f"{name};dur={seconds * 1000:.1f}"
+            if description:
+                entry += ';desc="' + description.replace('\\', '').replace('"', "'") + '"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+
+registry = MetricsRegistry(METRIC_HELP)
+
+# The timings of the request being handled on this thread, if any. Work on background
+# threads (jobs, stream producers, fan-out pools) has none and only feeds the registry.
+_current_timings = contextvars.ContextVar('request_timings', default=None)
+
+
+def start_request():
+    """Begins stage timing for the current request and returns its RequestTimings."""
+    timings = RequestTimings()
+    _current_timings.set(timings)
+    return timings
+
+
+def current_timings():
+    return _current_timings.get()
+
+
+@contextmanager
+def timed(stage):
+    """Times a block (or, as a decorator, a function) as a named request stage."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        registry.observe('app_stage_duration_seconds', seconds, stage=stage)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add(stage, seconds)
+
+
+def record_llm_call(task, model, seconds, usage=None, outcome='ok'):
+    """Records one Gemini call: latency, outcome and the prompt / output tokens from usage_metadata."""
+    task = task or 'unknown'
+    registry.inc('gemini_requests_total', task=task, model=model, outcome=outcome)
+    registry.observe('gemini_request_duration_seconds', seconds, task=task, model=model)
+    prompt_tokens = getattr(usage, 'prompt_token_count', None) or 0
+    output_tokens = getattr(usage, 'candidates_token_count', None) or 0
+    if prompt_tokens:
+        registry.inc('gemini_tokens_total', prompt_tokens, task=task, model=model, kind='prompt')
+    if output_tokens:
+        registry.inc('gemini_tokens_total', output_tokens, task=task, model=model, kind='output')
+
+    timings = _current_timings.get()
+    if timings is not None:
+        description = model if outcome == 'ok' else f"{model} {outcome}"
+        if usage is not None:
+            description += f" {prompt_tokens} in/{output_tokens} out tokens"
+        timings.add('gemini', seconds, description)
+
+
+def record_error(source, error):
+    """Counts an error caught at `source` by exception type, so failures can be aggregated."""
+    registry.inc('app_errors_total', source=source, type=type(error).__name__)
@@ -0,0 +1,37 @@
+from flask import Blueprint, jsonify, render_template
+
+# --- Page Routes ---
+# Server-rendered pages and the health check. Nothing here touches Gemini or PyPDF2, so
+# these respond as soon as the worker has imported Flask.
+
+bp = Blueprint('pages', __name__)
+
+@bp.route('/healthz')
+def healthz():
+    """Liveness check for load balancers and deploy health checks."""
+    return jsonify({'status': 'ok'})
+
+@bp.route('/')
+def index():
+    """Renders the home page."""
+    return render_template('home.html')
+
+@bp.route('/ats-checker')
+def ats_checker():
+    """Renders the ATS Score Checker page."""
+    return render_template('ats_checker.html')
+
+@bp.route('/resume-generator')
+def resume_generator():
+    """Renders the Resume Generator page."""
+    return render_template('resume_generator.html')
+
+@bp.route('/cover-letter')
+def cover_letter():
+    """Renders the Cover Letter Generator page."""
+    return render_template('cover_letter.html')
+
+@bp.route('/skill-gap')
+def skill_gap():
+    """Renders the Skill Gap Analysis page."""
+    return render_template('skill_gap.html')
@@ -0,0 +1,295 @@
+import io
+import os
+import json
+import math
+import zlib
+import heapq
+import hashlib
+import threading
+from array import array
+from bisect import bisect_left
+from itertools import compress
+from collections import Counter
+from local_ats import tokenize
+
+# --- Job Posting Index ---
+# An inverted index over job postings for "which postings fit this resume" queries. Each term
+# maps to compact arrays of (posting, term frequency); a query scores only the postings that
+# share a term with the resume, using BM25, and keeps the best k with a heap. The per-term
+# BM25 impacts are computed once per index version, so repeated queries are a sum over
+# precomputed floats. Posting text is kept zlib-compressed and only decompressed to explain
+# the top results.
+#
+# With a JSONL file configured, ingested postings are appended to it and every worker process
+# picks up new lines before its next query, so all workers answer from the same corpus.
+
+POSTING_FIELDS = ('title', 'company', 'location', 'url')
+
+
+class PostingIndex:
+    """BM25 top-k retrieval over job postings, with an optional append-only JSONL file behind it."""
+
+    def __init__(self, path=None, k1=1.2, b=0.75, max_query_terms=64, max_keywords=12, compress_level=6):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.max_query_terms = max_query_terms
+        self.max_keywords = max_keywords
+        self.compress_level = compress_level
+        # term -> (array of document numbers, array of term frequencies), in document order
+        self._postings = {}
+        # term -> number of live postings containing it (the posting lists also hold replaced ones)
+        self._doc_freq = {}
+        self._lengths = array('I')
+        self._documents = []  # (posting id, metadata tuple, compressed text) or None once replaced
+        self._replaced = []  # document numbers of replaced postings
+        self._numbers = {}  # posting id -> document number
+        self._total_length = 0
+        self._live = 0
+        self._version = 0
+        self._impacts = {}  # term -> (version, array of BM25 impacts, highest impact)
+        self.compressed_bytes = 0
+        self.index_entries = 0
+        self._file_offset = 0
+        self._lock = threading.RLock()
+
+    # --- Ingestion ---
+
+    @staticmethod
+    def posting_id(posting):
+        """The posting's own id, or one derived from its content so re-ingesting it is idempotent."""
+        if posting.get('id') not in (None, ''):
+            return str(posting['id'])
+        raw = f"{posting.get('title', '')}\n{posting.get('company', '')}\n{posting['text']}".encode('utf-8')
+        return f"post_{hashlib.sha256(raw).hexdigest()[:24]}"
+
+    def add(self, postings):
+        """Indexes postings ({'text', optional 'id', 'title', 'company', 'location', 'url'}) and returns their ids.
+
+        A posting whose id is already indexed replaces the earlier one. With a file configured
+        the postings are appended to it first, so other workers index them too.
+        """
+        postings = [dict(posting, id=self.posting_id(posting)) for posting in postings]
+        if self.path:
+            self._append(postings)
+            self.refresh()
+        else:
+            with self._lock:
+                for posting in postings:
+                    self._index(posting)
+                self._version += 1
+        return [posting['id'] for posting in postings]
+
+    def _append(self, postings):
+        data = ''.join(json.dumps(posting, ensure_ascii=False) + '\n' for posting in postings).encode('utf-8')
+        with open(self.path, 'ab+') as f:
+            try:
+                import fcntl
+                fcntl.flock(f, fcntl.LOCK_EX)
+            except ImportError:
+                pass
+            # A writer that died mid-line leaves a partial line; start ours on a fresh one
+            if f.seek(0, os.SEEK_END):
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    data = b'\n' + data
+            # One write per batch; the lock keeps batches from different workers from interleaving
+            f.write(data)
+
+    def refresh(self):
+        """Indexes lines appended to the file since the last refresh. Cheap (one stat) when nothing changed."""
+        if not self.path:
+            return
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return
+        with self._lock:
+            if size <= self._file_offset:
+                return
+            with open(self.path, 'rb') as f:
+                f.seek(self._file_offset)
+                data = f.read(size - self._file_offset)
+            # A line still being written is picked up next time
+            complete = data.rfind(b'\n') + 1
+            for line in io.BytesIO(data[:complete]):
+                if not line.strip():
+                    continue
+                try:
+                    posting = json.loads(line)
+                    self._index(dict(posting, id=self.posting_id(posting)))
+                except (ValueError, KeyError, TypeError) as e:
+                    print(f"Skipping malformed job posting in {self.path}: {e}")
+            self._file_offset += complete
+            self._version += 1
+
+    @staticmethod
+    def _terms(title, text):
+        return Counter(tokenize(f"{title}\n{text}"))
+
+    def _index(self, posting):
+        """Adds one posting to the in-memory index. Caller holds the lock."""
+        text = posting['text']
+        counts = self._terms(posting.get('title') or '', text)
+        length = sum(counts.values())
+
+        previous = self._numbers.get(posting['id'])
+        if previous is not None:
+            # Replaced postings stay in the posting lists but are skipped when ranking
+            _, metadata, blob = self._documents[previous]
+            for term in self._terms(metadata[0], zlib.decompress(blob).decode('utf-8')):
+                self._doc_freq[term] -= 1
+            self.compressed_bytes -= len(blob)
+            self._documents[previous] = None
+            self._replaced.append(previous)
+            self._total_length -= self._lengths[previous]
+            self._live -= 1
+
+        number = len(self._documents)
+        metadata = tuple(str(posting.get(field) or '') for field in POSTING_FIELDS)
+        blob = zlib.compress(text.encode('utf-8'), self.compress_level)
+        self._documents.append((posting['id'], metadata, blob))
+        self.compressed_bytes += len(blob)
+        self._numbers[posting['id']] = number
+        self._lengths.append(length)
+        self._total_length += length
+        self._live += 1
+        self.index_entries += len(counts)
+        for term, count in counts.items():
+            self._doc_freq[term] = self._doc_freq.get(term, 0) + 1
+            entry = self._postings.get(term)
+            if entry is None:
+                entry = self._postings[term] = (array('I'), array('H'))
+            entry[0].append(number)
+            entry[1].append(min(count, 65535))
+
+    # --- Retrieval ---
+
+    def _idf(self, doc_freq):
+        return math.log(1 + max(0, self._live - doc_freq + 0.5) / (doc_freq + 0.5))
+
+    def _term_impacts(self, term):
+        """Returns (BM25 impact per posting containing the term, the largest of them), computed once per index version.
+
+        Caller holds the lock.
+        """
+        cached = self._impacts.get(term)
+        if cached is not None and cached[0] == self._version:
+            return cached[1], cached[2]
+        documents, frequencies = self._postings[term]
+        idf = self._idf(self._doc_freq[term])
+        k1, b = self.k1, self.b
+        average = self._total_length / self._live
+        lengths = self._lengths
+        impacts = array('f', (
+            idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * lengths[doc] / average))
+            for doc, tf in zip(documents, frequencies)
+        ))
+        self._impacts[term] = (self._version, impacts, max(impacts))
+        return impacts, max(impacts)
+
+    def _score(self, query, top_k):
+        """Returns the top_k (document number, BM25 score) pairs for a tokenized query. Caller holds the lock.
+
+        Scores are summed into a dense list, one slot per posting, rarest terms first (MaxScore).
+        Once the k-th best score so far is out of reach of everything the remaining terms could
+        add, no other posting can enter the top k, so the long lists of common terms are not
+        scanned: the surviving candidates are looked up in them by bisection instead.
+        """
+        postings, doc_freq = self._postings, self._doc_freq
+        # Terms found only in replaced postings cannot match anything
+        weights = {term: (1 + math.log(count)) * self._idf(doc_freq[term])
+                   for term, count in query.items() if doc_freq.get(term)}
+        # A long resume is cut down to its most distinctive terms; the rest barely move the ranking
+        terms = heapq.nlargest(self.max_query_terms, weights, key=weights.__getitem__)
+        lists = []
+        for term in terms:
+            impacts, highest = self._term_impacts(term)
+            weight = 1 + math.log(query[term])
+            lists.append((weight * highest, term, postings[term][0], impacts, weight))
+        lists.sort(key=lambda entry: -entry[0])
+        remaining = sum(entry[0] for entry in lists)
+
+        scores = [0.0] * len(self._documents)
+        for replaced in self._replaced:
+            scores[replaced] = -math.inf
+        for position, (bound, term, documents, impacts, weight) in enumerate(lists):
+            if len(documents) > top_k and len(documents) * 4 > len(scores):
+                threshold = heapq.nlargest(top_k, scores)[-1]
+                if threshold > remaining:
+                    break
+            for doc, impact in zip(documents, impacts):
+                scores[doc] += weight * impact
+            remaining -= bound
+        else:
+            best = heapq.nlargest(top_k, range(len(scores)), key=scores.__getitem__)
+            return [(doc, scores[doc]) for doc in best if scores[doc] > 0], terms
+
+        # Summed fresh (rather than the running total) so rounding cannot push a tied k-th posting out
+        remaining = sum(entry[0] for entry in lists[position:])
+        cutoff = threshold - remaining - 1e-9
+        candidates = {doc: scores[doc] for doc in compress(range(len(scores)), map(cutoff.__le__, scores))}
+        rest = lists[position:]
+        if len(candidates) * 8 > sum(len(entry[2]) for entry in rest):
+            # Too many candidates for lookups to beat scanning: finish the sums in the dense list
+            for _, term, documents, impacts, weight in rest:
+                for doc, impact in zip(documents, impacts):
+                    scores[doc] += weight * impact
+            candidates = {doc: scores[doc] for doc in candidates}
+        else:
+            for _, term, documents, impacts, weight in rest:
+                count = len(documents)
+                for doc in candidates:
+                    index = bisect_left(documents, doc)
+                    if index < count and documents[index] == doc:
+                        candidates[doc] += weight * impacts[index]
+        best = heapq.nlargest(top_k, candidates, key=candidates.__getitem__)
+        return [(doc, candidates[doc]) for doc in best], terms
+
+    def search(self, text, top_k=10):
+        """Returns the top_k postings for a resume (or any text), best first, with the keywords they share."""
+        self.refresh()
+        query = Counter(tokenize(text))
+        with self._lock:
+            if not self._live or top_k <= 0:
+                return []
+            best, terms = self._score(query, top_k)
+            results = [(rank, self._documents[doc], score) for rank, (doc, score) in enumerate(best, start=1)]
+
+        # Explaining the few results needs their text, but not the lock
+        matches = []
+        for rank, (posting_id, metadata, blob), score in results:
+            posting_terms = set(tokenize(zlib.decompress(blob).decode('utf-8')))
+            matches.append({
+                'rank': rank,
+                'id': posting_id,
+                **dict(zip(POSTING_FIELDS, metadata)),
+                'score': round(score, 4),
+                # The query's most distinctive terms come first
+                'matched_keywords': [term for term in terms if term in posting_terms][:self.max_keywords],
+            })
+        return matches
+
+    def get(self, posting_id):
+        """Returns a posting with its full text, or None if it is not indexed."""
+        self.refresh()
+        with self._lock:
+            number = self._numbers.get(posting_id)
+            if number is None or self._documents[number] is None:
+                return None
+            _, metadata, blob = self._documents[number]
+        return {'id': posting_id, **dict(zip(POSTING_FIELDS, metadata)), 'text': zlib.decompress(blob).decode('utf-8')}
+
+    def texts(self, posting_ids):
+        """Returns {posting id: text} for the given ids that are indexed."""
+        return {posting_id: posting['text'] for posting_id, posting in
+                ((posting_id, self.get(posting_id)) for posting_id in posting_ids) if posting is not None}
+
+    def stats(self):
+        with self._lock:
+            return {
+                'postings': self._live,
+                'terms': len(self._postings),
+                'index_entries': self.index_entries,
+                'compressed_bytes': self.compressed_bytes,
+            }
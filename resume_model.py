@@ -0,0 +1,144 @@
+import re
+from local_ats import BULLET_RE, EMAIL_RE, LINKEDIN_RE, PHONE_RE, URL_RE, classify_header
+
+# --- Structured Resume Model ---
+# Extracted text is segmented once into the sections every tool cares about, so routes
+# can work with contact details, experience entries or a skills list directly instead
+# of re-scanning the raw text.
+
+# Unrecognised headers are still section breaks: short ALL-CAPS lines without digits
+_OTHER_HEADER_RE = re.compile(r'^\s*(?:\*\*)?\s*([A-Z][A-Z &/]{2,39}?)\s*(?:\*\*)?\s*:?\s*$')
+_SKILL_SPLIT_RE = re.compile(r'\s*(?:[,;|•·]|\n)\s*')
+_DATE_RANGE_RE = re.compile(
+    r'(?:\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?\s+)?\b(?:19|20)\d{2}\b'
+    r'\s*(?:-|–|—|to)\s*(?:present|current|now|(?:[a-z]+\.?\s+)?(?:19|20)\d{2})',
+    re.IGNORECASE,
+)
+
+
+class ResumeModel:
+    """A resume split into contact details and canonical sections."""
+
+    def __init__(self, contact, summary, experience, education, skills, sections):
+        self.contact = contact
+        self.summary = summary
+        self.experience = experience
+        self.education = education
+        self.skills = skills
+        self.sections = sections
+
+    def to_dict(self):
+        return {
+            'contact': self.contact,
+            'summary': self.summary,
+            'experience': self.experience,
+            'education': self.education,
+            'skills': self.skills,
+            'sections': self.sections,
+        }
+
+
+def _strip_markup(line):
+    return line.replace('**', '').strip()
+
+
+def parse_contact(header_lines, text):
+    """Finds the name (first plain line of the header block), email, phone and links."""
+    name = None
+    for line in header_lines:
+        line = _strip_markup(line)
+        if line and not (EMAIL_RE.search(line) or PHONE_RE.search(line) or URL_RE.search(line)) and len(line.split()) <= 5:
+            name = line
+            break
+    # Contact details are searched in the header first, then anywhere (some layouts put them in a footer)
+    header = '\n'.join(header_lines)
+
+    def find(pattern):
+        match = pattern.search(header) or pattern.search(text)
+        return match.group(0).rstrip('.,;)') if match else None
+
+    return {
+        'name': name,
+        'email': find(EMAIL_RE),
+        'phone': find(PHONE_RE),
+        'linkedin': find(LINKEDIN_RE),
+        'website': find(URL_RE),
+    }
+
+
+def split_entries(lines):
+    """Groups a section's lines into entries of heading lines followed by bullet points.
+
+    A new entry starts at a non-bullet line that follows bullets, or at a second date range.
+    """
+    entries = []
+    for line in (_strip_markup(line) for line in lines):
+        if not line:
+            continue
+        bullet = BULLET_RE.match(line)
+        if bullet:
+            if not entries:
+                entries.append({'heading': [], 'bullets': []})
+            entries[-1]['bullets'].append(bullet.group(1).strip())
+        elif not entries or entries[-1]['bullets'] or (_DATE_RANGE_RE.search(line) and _find_dates(entries[-1]['heading'])):
+            entries.append({'heading': [line], 'bullets': []})
+        else:
+            entries[-1]['heading'].append(line)
+    return [
+        {'heading': ' | '.join(entry['heading']), 'dates': _find_dates(entry['heading']), 'bullets': entry['bullets']}
+        for entry in entries
+    ]
+
+
+def _find_dates(heading_lines):
+    match = _DATE_RANGE_RE.search(' '.join(heading_lines))
+    return match.group(0) if match else None
+
+
+def split_skills(lines):
+    """Returns individual skills from a skills section, dropping 'Category:' prefixes and duplicates."""
+    skills, seen = [], set()
+    for line in lines:
+        line = _strip_markup(line)
+        bullet = BULLET_RE.match(line)
+        if bullet:
+            line = bullet.group(1)
+        if ':' in line:
+            line = line.split(':', 1)[1]
+        for skill in _SKILL_SPLIT_RE.split(line):
+            skill = skill.strip(' .')
+            if skill and skill.lower() not in seen:
+                seen.add(skill.lower())
+                skills.append(skill)
+    return skills
+
+
+def parse_resume(text):
+    """Segments resume text into a ResumeModel."""
+    blocks = [('header', [])]
+    for line in text.splitlines():
+        name = classify_header(line)
+        if name is None:
+            other = _OTHER_HEADER_RE.match(line)
+            name = other.group(1).strip().lower() if other and blocks[-1][1] else None
+        if name:
+            blocks.append((name, []))
+        else:
+            blocks[-1][1].append(line)
+
+    # Repeated headers (e.g. "Experience" continued on page 2) are merged
+    sections = {}
+    for name, lines in blocks:
+        sections.setdefault(name, []).extend(lines)
+
+    def body(name):
+        return '\n'.join(line for line in sections.get(name, []) if line.strip()).strip()
+
+    return ResumeModel(
+        contact=parse_contact(sections['header'], text),
+        summary=body('summary'),
+        experience=split_entries(sections.get('experience', [])),
+        education=split_entries(sections.get('education', [])),
+        skills=split_skills(sections.get('skills', [])),
+        sections={name: body(name) for name in sections if name != 'header' and body(name)},
+    )
@@ -0,0 +1,138 @@
+import re
+import json
+
+from governance import NETWORK_ERRORS, UpstreamUnavailable
+
+# --- Model Routing + Prompt Compaction ---
+# Each Gemini call names a task. The router picks the model for that task (by input size,
+# when a route says so) plus the models to fall back to if it fails or is overloaded.
+# Prompts are compacted before they are counted and sent: extracted PDF text carries a lot
+# of repeated whitespace and page furniture, and pasted JDs a lot of legal boilerplate.
+
+DEFAULT_ROUTES = {
+    # Long-form writing keeps the strongest model
+    'rewrite_resume': {'models': ['gemini-2.5-pro', 'gemini-2.5-flash']},
+    'cover_letter': {'models': ['gemini-2.5-pro', 'gemini-2.5-flash']},
+    'chat': {'models': ['gemini-2.5-pro', 'gemini-2.5-flash']},
+    # Structured scoring and extraction is handled well by Flash; unusually long inputs go to Pro
+    'ats_score': {
+        'models': ['gemini-2.5-flash', 'gemini-2.5-pro'],
+        'large_input_tokens': 16000,
+        'large_models': ['gemini-2.5-pro', 'gemini-2.5-flash'],
+    },
+    'skill_gap': {
+        'models': ['gemini-2.5-flash', 'gemini-2.5-pro'],
+        'large_input_tokens': 16000,
+        'large_models': ['gemini-2.5-pro', 'gemini-2.5-flash'],
+    },
+    # Only a JD excerpt and a list of skills: the smallest model is enough
+    'skill_gap_narrative': {'models': ['gemini-2.5-flash-lite', 'gemini-2.5-flash']},
+}
+
+# HTTP status codes that mean "this request is fine, but this model cannot serve it now"
+FALLBACK_STATUS_CODES = (404, 429, 500, 502, 503, 504)
+
+# Lines that are page furniture rather than content ("Page 2 of 3", "- 2 -", "2/3", a bare "2")
+_PAGE_MARKER_RE = re.compile(r'^(?:page\s+\d+(?:\s+of\s+\d+)?|-\s*\d+\s*-|\d+\s*/\s*\d+|\d{1,3})$', re.IGNORECASE)
+# Sentences typical of JD legal / HR boilerplate that say nothing about the role
+_BOILERPLATE_RE = re.compile(
+    r'equal (?:employment )?opportunity|affirmative action|without regard to|'
+    r'reasonable accommodations?|e-verify|drug[- ]free workplace|'
+    r'privacy (?:policy|notice)|unsolicited (?:resumes|applications)|recruitment agenc|'
+    r'protected (?:veteran|characteristic|class)',
+    re.IGNORECASE,
+)
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])\s+')
+# Repeated lines shorter than this are kept: skills, dates and job titles legitimately repeat
+MIN_DEDUPE_LINE_LENGTH = 12
+
+
+def estimate_tokens(text):
+    """Approximate Gemini token count (about four characters per token for English text)."""
+    return (len(text) + 3) // 4
+
+
+def strip_boilerplate(line):
+    """Drops boilerplate sentences from a line, keeping the rest of it."""
+    if not _BOILERPLATE_RE.search(line):
+        return line
+    return ' '.join(sentence for sentence in _SENTENCE_SPLIT_RE.split(line) if not _BOILERPLATE_RE.search(sentence))
+
+
+def compact_prompt(text):
+    """Normalizes whitespace, drops page markers, repeated lines and JD boilerplate.
+
+    Prompts fence each input document with '---' lines; repeated lines are only dropped
+    within one fenced block, so a line shared by the JD and the resume is kept in both.
+    """
+    lines, seen = [], set()
+    for line in text.splitlines():
+        line = re.sub(r'[ \t\u00a0\u200b]+', ' ', line).strip()
+        if line == '---':
+            seen = set()
+        elif _PAGE_MARKER_RE.match(line):
+            continue
+        else:
+            line = strip_boilerplate(line)
+            key = line.lower()
+            if len(line) >= MIN_DEDUPE_LINE_LENGTH and key in seen:
+                continue
+            seen.add(key)
+        lines.append(line)
+    return re.sub(r'\n{3,}', '\n\n', '\n'.join(lines)).strip()
+
+
+def load_routes(path=None):
+    """Returns the default routes, with per-task overrides from an optional JSON file on top."""
+    routes = {task: dict(route) for task, route in DEFAULT_ROUTES.items()}
+    if path:
+        with open(path, 'r', encoding='utf-8') as f:
+            for task, route in json.load(f).items():
+                routes.setdefault(task, {}).update(route)
+    return routes
+
+
+def should_fall_back(error):
+    """True if another model might succeed where this one failed (overload, quota, outage, unknown model).
+
+    Network failures count, and so does the governor turning this model away (open circuit, full
+    queue). Anything else, such as a bad request or a bug on our side, would fail on every model.
+    """
+    if isinstance(error, (UpstreamUnavailable, *NETWORK_ERRORS)):
+        return True
+    return getattr(error, 'code', None) in FALLBACK_STATUS_CODES
+
+
+class ModelRouter:
+    """Chooses the model (and fallbacks) for a task, and compacts prompts before they are sent."""
+
+    def __init__(self, routes, compact=True):
+        self.routes = routes
+        self.compact = compact
+
+    def prepare(self, task, contents, default_model):
+        """Returns (contents_to_send, candidate_models, routing_info) for one call.
+
+        Only plain-string prompts are compacted; anything else is passed through untouched.
+        """
+        if self.compact and isinstance(contents, str):
+            compacted = compact_prompt(contents)
+            tokens_before, input_tokens = estimate_tokens(contents), estimate_tokens(compacted)
+        else:
+            compacted = contents
+            tokens_before = input_tokens = estimate_tokens(contents) if isinstance(contents, str) else None
+
+        route = self.routes.get(task) or {}
+        models = route.get('models') or [default_model]
+        threshold = route.get('large_input_tokens')
+        if threshold and input_tokens is not None and input_tokens > threshold and route.get('large_models'):
+            models = route['large_models']
+
+        routing = {
+            'task': task,
+            'model': models[0],
+            'input_tokens': input_tokens,
+            'tokens_saved': tokens_before - input_tokens if input_tokens is not None else 0,
+            'fallback_from': [],
+        }
+        return compacted, list(models), routing
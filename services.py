@@ -0,0 +1,156 @@
+import os
+import time
+from dotenv import load_dotenv
+from extraction import DocxExtractor, ExtractionCache, ExtractionError, ExtractionService, PdfExtractor, read_upload
+from llm import LazyClient, LLMGateway, ResponseCache, build_http_options
+from jobs import JobQueue
+from documents import DocumentStore
+from routing import ModelRouter, load_routes
+from export import ExportCache, load_pdf_fonts
+from metrics import timed
+from governance import UpstreamGovernor, parse_rate_limits
+from postings import PostingIndex
+
+# --- Shared Services ---
+# One instance of each per worker process, shared by every blueprint. Building them is
+# cheap: the Gemini SDK and PyPDF2 are imported, and the client and its HTTP pool created,
+# on first use (or by warm_up()), after gunicorn has forked the worker.
+
+load_dotenv()
+
+
+def create_gemini_client():
+    """Builds the Gemini client. It picks up GEMINI_API_KEY from the environment (.env in development)."""
+    from google import genai
+    return genai.Client(http_options=build_http_options(
+        max_connections=int(os.getenv('LLM_MAX_CONNECTIONS', '100')),
+    ))
+
+
+# 1. Gemini client, created on first use in each worker process
+client = LazyClient(create_gemini_client)
+
+# 2. Shared text extraction service (in-memory LRU, optional on-disk tier that survives restarts).
+# PDFs over the byte / page limits are refused; each is read in a separate process with a hard timeout.
+# Word documents are streamed from their XML with the uncompressed size capped (zip bombs).
+extraction_service = ExtractionService(
+    ExtractionCache(
+        max_entries=int(os.getenv('EXTRACTION_CACHE_ENTRIES', '256')),
+        max_bytes=int(os.getenv('EXTRACTION_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+        disk_dir=os.getenv('EXTRACTION_CACHE_DIR') or None,
+    ),
+    PdfExtractor(
+        max_bytes=int(os.getenv('PDF_MAX_BYTES', str(10 * 1024 * 1024))),
+        max_pages=int(os.getenv('PDF_MAX_PAGES', '50')),
+        timeout=float(os.getenv('PDF_EXTRACTION_TIMEOUT', '20')),
+        parallel_min_pages=int(os.getenv('PDF_PARALLEL_MIN_PAGES', '8')),
+        max_workers=int(os.getenv('PDF_EXTRACTION_WORKERS', '2')),
+    ),
+    DocxExtractor(
+        max_bytes=int(os.getenv('DOCX_MAX_BYTES', str(10 * 1024 * 1024))),
+        max_xml_bytes=int(os.getenv('DOCX_MAX_XML_BYTES', str(50 * 1024 * 1024))),
+        timeout=float(os.getenv('DOCX_EXTRACTION_TIMEOUT', '20')),
+    ),
+)
+
+# 3. Server-side store for uploaded resumes and job descriptions, referenced by id.
+# DOCUMENT_STORE_SQLITE shares it across workers (gunicorn.conf.py sets it when running several).
+document_store = DocumentStore(
+    max_bytes=int(os.getenv('DOCUMENT_STORE_MAX_BYTES', str(128 * 1024 * 1024))),
+    ttl=int(os.getenv('DOCUMENT_STORE_TTL', str(24 * 3600))),
+    sqlite_path=os.getenv('DOCUMENT_STORE_SQLITE') or None,
+)
+
+# 4. Gateway in front of every Gemini call. Only deterministic endpoints are cached by default;
+# set LLM_CACHE_ENDPOINTS to a comma-separated list of namespaces to change that.
+# LLM_ASYNC=1 sends requests through the SDK's async client on one shared event loop per worker.
+# The router picks a model per task (override with LLM_ROUTES_FILE) and compacts prompts before sending.
+# The governor keeps each model under its per-worker quota (LLM_RATE_LIMITS="model=rpm,..."), retries
+# transient failures and fails fast with a 503 while a model keeps failing.
+llm = LLMGateway(
+    client,
+    cache=ResponseCache(
+        max_entries=int(os.getenv('LLM_CACHE_ENTRIES', '512')),
+        ttl=int(os.getenv('LLM_CACHE_TTL', '3600')),
+        sqlite_path=os.getenv('LLM_CACHE_SQLITE') or None,
+    ),
+    cached_namespaces=[
+        name.strip() for name in os.getenv('LLM_CACHE_ENDPOINTS', 'ats_score,skill_gap').split(',') if name.strip()
+    ],
+    use_async=os.getenv('LLM_ASYNC', '0') == '1',
+    router=ModelRouter(
+        load_routes(os.getenv('LLM_ROUTES_FILE') or None),
+        compact=os.getenv('LLM_COMPACT_PROMPTS', '1') == '1',
+    ),
+    governor=UpstreamGovernor(
+        rate_limits=parse_rate_limits(os.getenv('LLM_RATE_LIMITS')),
+        max_wait=float(os.getenv('LLM_QUEUE_TIMEOUT', '30')),
+        retries=int(os.getenv('LLM_RETRIES', '2')),
+        failure_threshold=int(os.getenv('LLM_CIRCUIT_FAILURES', '5')),
+        reset_timeout=float(os.getenv('LLM_CIRCUIT_RESET', '30')),
+    ),
+)
+
+# 5. Rendered PDF / DOCX downloads, keyed by content hash. PDF_FONT (and PDF_BOLD_FONT) point at
+# TrueType files to embed, so PDFs can hold any character they have glyphs for; without them
+# PDFs use Helvetica and documents with characters outside WinAnsi are refused with a 422.
+export_cache = ExportCache(max_bytes=int(os.getenv('EXPORT_CACHE_MAX_BYTES', str(32 * 1024 * 1024))))
+pdf_fonts = load_pdf_fonts(os.getenv('PDF_FONT') or None, os.getenv('PDF_BOLD_FONT') or None)
+
+# 6. Background generations. Jobs run in the worker that accepted them; JOB_STATE_SQLITE lets
+# the other workers answer status and event requests for them.
+job_queue = JobQueue(
+    max_workers=int(os.getenv('JOB_WORKERS', '4')),
+    max_queued=int(os.getenv('JOB_MAX_QUEUED', '1000')),
+    result_ttl=int(os.getenv('JOB_RESULT_TTL', '3600')),
+    default_timeout=int(os.getenv('JOB_TIMEOUT', '300')),
+    sqlite_path=os.getenv('JOB_STATE_SQLITE') or None,
+)
+
+# 7. Job postings matched against resumes. With JOB_POSTINGS_FILE set, ingested postings are appended
+# to that JSONL file and every worker indexes it, so they all search the same corpus.
+posting_index = PostingIndex(
+    path=os.getenv('JOB_POSTINGS_FILE') or None,
+    max_query_terms=int(os.getenv('POSTINGS_MAX_QUERY_TERMS', '64')),
+)
+
+# Filled in by create_app() and warm_up(); reported at /metrics
+startup_stats = {}
+
+
+def warm_up():
+    """Imports the Gemini SDK and PyPDF2, creates this worker's client, starts a PDF reader process and
+    indexes the job postings file, so the first request does not pay for them.
+
+    Never calls Gemini itself. Safe to run on a background thread.
+    """
+    started = time.perf_counter()
+    import PyPDF2  # noqa: F401
+    from google.genai import types  # noqa: F401
+    ready = bool(client)
+    extraction_service.pdf_extractor.start()
+    posting_index.refresh()
+    startup_stats['warmup_seconds'] = time.perf_counter() - started
+    print(f"Worker {os.getpid()} warmed up in {startup_stats['warmup_seconds'] * 1000:.0f} ms (Gemini client ready: {ready}, "
+          f"job postings: {posting_index.stats()['postings']})")
+
+
+# --- Upload Pipeline ---
+
+def resume_from_upload(upload):
+    """Returns the text of an uploaded resume, read from the request buffer without touching disk.
+
+    Raises ExtractionError (reported with its status) if the file is missing, too large, not a
+    PDF or DOCX, or has no extractable text.
+    """
+    if upload is None or upload.filename == '':
+        raise ExtractionError('No selected file', 400)
+    with timed('upload'):
+        kind, data = read_upload(upload.stream, extraction_service.max_bytes)
+    with timed('extract'):
+        text = extraction_service.extract(kind, data)
+    if not text:
+        if kind == 'docx':
+            raise ExtractionError('Could not extract text from the Word document. The file might be corrupted or empty.', 500)
+        raise ExtractionError('Could not extract text from PDF. The file might be corrupted or image-only.', 500)
+    return text
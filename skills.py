@@ -0,0 +1,129 @@
+import os
+import re
+import json
+from collections import deque
+
+# --- Skill Taxonomy Matcher ---
+# Every skill name and alias in the taxonomy is compiled into one Aho-Corasick automaton,
+# so extracting skills from a document is a single linear pass regardless of how many
+# skills the taxonomy holds.
+
+DEFAULT_TAXONOMY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'skill_taxonomy.json')
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def load_taxonomy(path=DEFAULT_TAXONOMY_PATH, extra_path=None):
+    """Loads {category: {skill: [aliases]}} JSON, merging an optional site-specific file on top."""
+    with open(path, 'r', encoding='utf-8') as f:
+        taxonomy = json.load(f)
+    if extra_path:
+        with open(extra_path, 'r', encoding='utf-8') as f:
+            for category, skills in json.load(f).items():
+                taxonomy.setdefault(category, {}).update(skills)
+    return taxonomy
+
+
+def normalize(text):
+    """Lowercases and collapses whitespace so multi-word aliases match across line breaks."""
+    return _WHITESPACE.sub(' ', text.lower())
+
+
+def _is_boundary(text, index):
+    # Skill names such as "C++" or ".NET" contain punctuation, so only letters and digits break a match
+    return index < 0 or index >= len(text) or not text[index].isalnum()
+
+
+class SkillMatcher:
+    """Aho-Corasick automaton over all skill names and aliases in a taxonomy."""
+
+    def __init__(self, taxonomy):
+        self.categories = {}
+        self._goto = [{}]
+        self._fail = [0]
+        self._output = [[]]
+        for category, skills in taxonomy.items():
+            for skill, aliases in skills.items():
+                self.categories[skill] = category
+                for pattern in {normalize(skill), *(normalize(alias) for alias in aliases)}:
+                    self._add(pattern, skill)
+        self._build_failure_links()
+
+    def _add(self, pattern, skill):
+        state = 0
+        for char in pattern:
+            next_state = self._goto[state].get(char)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][char] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._output.append([])
+            state = next_state
+        self._output[state].append((len(pattern), skill))
+
+    def _build_failure_links(self):
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                # A state also reports every pattern that is a suffix of it (e.g. "sql" at the end of "mysql");
+                # the word-boundary check in extract() decides which of them are real matches
+                self._output[next_state] = self._output[next_state] + self._output[self._fail[next_state]]
+
+    def extract(self, text):
+        """Returns {skill: occurrence count} for every taxonomy skill found in the text, in first-seen order."""
+        text = normalize(text)
+        matches = []
+        state = 0
+        for index, char in enumerate(text):
+            while state and char not in self._goto[state]:
+                state = self._fail[state]
+            state = self._goto[state].get(char, 0)
+            for length, skill in self._output[state]:
+                start = index - length + 1
+                if _is_boundary(text, start - 1) and _is_boundary(text, index + 1):
+                    matches.append((start, -length, skill))
+
+        # Keep leftmost-longest, non-overlapping matches so "node.js" is not also counted as "js"
+        found = {}
+        covered_until = 0
+        for start, negative_length, skill in sorted(matches):
+            if start < covered_until:
+                continue
+            covered_until = start - negative_length
+            found[skill] = found.get(skill, 0) + 1
+        return found
+
+    def skill_gap(self, job_description, resume_text):
+        """Compares the skills required by a job description with those present in a resume."""
+        jd_skills = self.extract(job_description)
+        resume_skills = self.extract(resume_text)
+        return {
+            'matched': [skill for skill in jd_skills if skill in resume_skills],
+            'missing': [skill for skill in jd_skills if skill not in resume_skills],
+            'additional': [skill for skill in resume_skills if skill not in jd_skills],
+        }
+
+    def group_by_category(self, skills):
+        """Groups a list of skills by their taxonomy category, preserving order."""
+        grouped = {}
+        for skill in skills:
+            grouped.setdefault(self.categories.get(skill, 'Other'), []).append(skill)
+        return grouped
+
+
+def skills_html(matcher, skills, empty_message):
+    """Renders skills grouped by category as the HTML bullet list the frontends already display."""
+    if not skills:
+        return f"<ul><li>{empty_message}</li></ul>"
+    items = "".join(
+        f"<li><strong>{category}:</strong> {', '.join(names)}</li>"
+        for category, names in matcher.group_by_category(skills).items()
+    )
+    return f"<ul>{items}</ul>"
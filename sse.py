@@ -0,0 +1,85 @@
+import json
+import queue
+import threading
+from flask import Response
+
+# --- Server-Sent Events Helpers ---
+
+# Proxies such as Render's close connections that stay silent for too long, so a
+# comment line is sent whenever the upstream has not produced anything for a while.
+HEARTBEAT_INTERVAL = 15
+# How often a producer blocked on a full queue checks whether the client is still there
+PRODUCER_POLL_INTERVAL = 0.1
+
+_DONE = object()
+
+
+def sse_event(event, data):
+    """Formats a single SSE frame with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def with_heartbeat(events, interval=HEARTBEAT_INTERVAL, buffer=16):
+    """Yields frames from `events`, inserting keep-alive comments while the producer is blocked.
+
+    `events` runs on its own thread, at most `buffer` frames ahead of the client. When the
+    response is closed (the client went away), the producer stops at its next frame and closes
+    `events`, so the generators behind it can cancel their upstream work.
+    """
+    frames = queue.Queue(maxsize=buffer)
+    stop = threading.Event()
+
+    def put(frame):
+        """Waits for room in the queue. Returns False once the consumer has gone away."""
+        while not stop.is_set():
+            try:
+                frames.put(frame, timeout=PRODUCER_POLL_INTERVAL)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for frame in events:
+                if not put(frame):
+                    break
+        except Exception as e:
+            print(f"SSE producer error: {e}")
+            put(sse_event('error', {'error': str(e)}))
+        finally:
+            close = getattr(events, 'close', None)
+            if close is not None:
+                close()
+            put(_DONE)
+
+    threading.Thread(target=produce, daemon=True).start()
+    try:
+        while True:
+            try:
+                frame = frames.get(timeout=interval)
+            except queue.Empty:
+                yield ": keep-alive\n\n"
+                continue
+            if frame is _DONE:
+                return
+            yield frame
+    finally:
+        stop.set()
+
+
+def sse_response(events):
+    """Wraps a generator of SSE frames in a streaming, unbuffered Flask response.
+
+    `events` runs on with_heartbeat's producer thread, outside the request context: read
+    everything it needs from `request` in the view and pass it in as arguments.
+    """
+    return Response(
+        with_heartbeat(events),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # Stop nginx-style proxies from buffering the whole stream
+            'X-Accel-Buffering': 'no',
+        },
+    )
@@ -0,0 +1,167 @@
+from chat_edits import PREAMBLE, ChatSessionStore, apply_patches, label_sections, split_sections
+
+RESUME = (
+    "Jane Doe\n"
+    "jane@example.com | Berlin\n"
+    "\n\n"
+    "**SUMMARY**\n"
+    "Backend engineer with eight years of Python.\n"
+    "\n"
+    "SKILLS\n"
+    "AWS, GCP, SQL\n"
+    "Python, Flask\n"
+    "\n"
+    "Experience:\n"
+    "- Built the billing platform\n"
+    "- Led a team of four\n"
+)
+
+COVER_LETTER = "Dear hiring team,\n\nI am applying for the role.\n\n\nI have built similar systems.\n\nKind regards,\nJane\n"
+
+
+def titles(text, kind='resume'):
+    return [title for title, _ in split_sections(text, kind)]
+
+
+def test_resume_sections_are_split_at_headers():
+    assert titles(RESUME) == [PREAMBLE, 'SUMMARY', 'SKILLS', 'EXPERIENCE']
+    sections = dict(split_sections(RESUME))
+    assert sections['SKILLS'] == "SKILLS\nAWS, GCP, SQL\nPython, Flask"
+    assert sections[PREAMBLE] == "Jane Doe\njane@example.com | Berlin"
+
+
+def test_all_caps_content_lines_with_commas_are_not_headers():
+    text = "**SKILLS**\nAWS, GCP, SQL\nREST, GRPC\n\nCERTIFICATIONS\nAWS, CKA\n"
+    assert titles(text) == ['SKILLS', 'CERTIFICATIONS']
+
+
+def test_cover_letter_paragraphs_are_sections():
+    assert titles(COVER_LETTER, 'cover_letter') == ['PARAGRAPH 1', 'PARAGRAPH 2', 'PARAGRAPH 3', 'PARAGRAPH 4']
+
+
+def test_labels_number_every_section():
+    labelled = label_sections(split_sections(RESUME))
+    assert labelled.startswith(f"[SECTION 1: {PREAMBLE}]\nJane Doe")
+    for label in ('[SECTION 2: SUMMARY]', '[SECTION 3: SKILLS]', '[SECTION 4: EXPERIENCE]'):
+        assert label in labelled
+
+
+def test_no_patches_leave_the_document_unchanged():
+    for text, kind in ((RESUME, 'resume'), (COVER_LETTER, 'cover_letter'), ("\n\n**A**\nx\n\n\n", 'resume')):
+        assert apply_patches(text, [], kind) == (text, [], [])
+
+
+def test_replace_keeps_the_spacing_around_untouched_sections():
+    patch = {'operation': 'replace', 'section': 'summary', 'content': "**SUMMARY**\nStaff engineer.\n"}
+    text, applied, skipped = apply_patches(RESUME, [patch])
+
+    assert applied == [patch] and skipped == []
+    assert text == RESUME.replace("Backend engineer with eight years of Python.", "Staff engineer.")
+
+
+def test_delete_and_insert_after():
+    patches = [
+        {'operation': 'delete', 'section': 'SKILLS'},
+        {'operation': 'insert_after', 'section': 'SUMMARY', 'content': "**EDUCATION**\nBSc Computer Science"},
+    ]
+    text, applied, skipped = apply_patches(RESUME, patches)
+
+    assert len(applied) == 2 and skipped == []
+    assert titles(text) == [PREAMBLE, 'SUMMARY', 'EDUCATION', 'EXPERIENCE']
+    assert "AWS, GCP, SQL" not in text
+    assert "Python.\n\n**EDUCATION**\nBSc Computer Science\n\nExperience:" in text
+    # Untouched spacing, including the trailing newline, is kept
+    assert text.startswith("Jane Doe\njane@example.com | Berlin\n\n\n**SUMMARY**")
+    assert text.endswith("- Led a team of four\n")
+
+
+def test_insert_after_a_missing_section_appends():
+    patch = {'operation': 'insert_after', 'section': 'Awards', 'content': "**AWARDS**\nHackathon winner"}
+    text, applied, _ = apply_patches(RESUME, [patch])
+    assert applied == [patch]
+    assert text.endswith("- Led a team of four\n\n**AWARDS**\nHackathon winner\n")
+
+
+def test_unusable_patches_are_skipped_with_a_reason():
+    patches = [
+        {'operation': 'rewrite', 'section': 'SUMMARY', 'content': 'x'},
+        {'operation': 'replace', 'section': 'Hobbies', 'content': 'x'},
+        {'operation': 'replace', 'section': 'SUMMARY', 'content': ''},
+    ]
+    text, applied, skipped = apply_patches(RESUME, patches)
+
+    assert text == RESUME and applied == []
+    assert [patch['reason'] for patch in skipped] == ['unknown operation', 'section not found', 'missing content']
+
+
+def test_cover_letter_paragraph_patches():
+    patches = [
+        {'operation': 'delete', 'section': 'PARAGRAPH 2'},
+        {'operation': 'replace', 'section': 'paragraph 3', 'content': 'I have built larger systems.'},
+    ]
+    text, applied, _ = apply_patches(COVER_LETTER, patches, 'cover_letter')
+
+    assert len(applied) == 2
+    assert text == "Dear hiring team,\n\nI have built larger systems.\n\nKind regards,\nJane\n"
+
+
+TWO_JOBS = (
+    "Jane Doe\n"
+    "\n"
+    "EXPERIENCE\n"
+    "- Acme, backend engineer\n"
+    "\n"
+    "EDUCATION\n"
+    "BSc Computer Science\n"
+    "\n"
+    "EXPERIENCE\n"
+    "- Initech, intern\n"
+)
+
+
+def test_repeated_titles_are_patched_by_number():
+    patches = [
+        {'operation': 'replace', 'section': '4: EXPERIENCE', 'content': "EXPERIENCE\n- Initech, software intern"},
+        {'operation': 'insert_after', 'section': 'SECTION 2', 'content': "PROJECTS\n- Billing dashboard"},
+    ]
+    text, applied, skipped = apply_patches(TWO_JOBS, patches)
+
+    assert len(applied) == 2 and skipped == []
+    assert "- Acme, backend engineer" in text and "- Initech, software intern" in text
+    assert titles(text) == [PREAMBLE, 'EXPERIENCE', 'PROJECTS', 'EDUCATION', 'EXPERIENCE']
+
+
+def test_a_repeated_bare_title_is_ambiguous():
+    patch = {'operation': 'delete', 'section': 'EXPERIENCE'}
+    text, applied, skipped = apply_patches(TWO_JOBS, [patch])
+    assert text == TWO_JOBS and applied == []
+    assert skipped[0]['reason'] == 'ambiguous section title; use its number'
+
+    # Unique titles still work on their own
+    text, applied, _ = apply_patches(TWO_JOBS, [{'operation': 'delete', 'section': 'Education'}])
+    assert len(applied) == 1 and titles(text) == [PREAMBLE, 'EXPERIENCE', 'EXPERIENCE']
+
+
+def test_numbers_refer_to_the_document_as_labelled():
+    # Deleting section 2 does not renumber section 4
+    patches = [
+        {'operation': 'delete', 'section': '[SECTION 2: EXPERIENCE]'},
+        {'operation': 'replace', 'section': '4', 'content': "EXPERIENCE\n- Initech, software intern"},
+        {'operation': 'delete', 'section': '9: AWARDS'},
+    ]
+    text, applied, skipped = apply_patches(TWO_JOBS, patches)
+
+    assert len(applied) == 2 and [patch['reason'] for patch in skipped] == ['section not found']
+    assert "Acme" not in text and "- Initech, software intern" in text
+    assert titles(text) == [PREAMBLE, 'EDUCATION', 'EXPERIENCE']
+
+
+def test_an_unusable_session_file_is_logged_not_raised(tmp_path):
+    path = tmp_path / 'chat.sqlite3'
+    store = ChatSessionStore(sqlite_path=str(path))
+    session = store.create('resume', RESUME, 'res_1', '')
+    assert store.get(session.id).document == RESUME
+
+    path.write_bytes(b'not a database' * 100)
+    store.save(session)
+    assert store.get(session.id) is None
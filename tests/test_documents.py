@@ -0,0 +1,121 @@
+import time
+import zlib
+import random
+import sqlite3
+
+import pytest
+
+from documents import DocumentNotFound, DocumentStore, DocumentTooLarge, InvalidRequest
+
+
+def random_text(seed, length):
+    """Text that compresses poorly, so its stored size stays close to its length."""
+    rng = random.Random(seed)
+    return ''.join(rng.choice('abcdefghijklmnopqrstuvwxyz0123456789 ') for _ in range(length))
+
+
+def shared_expiry(path, document_id):
+    with sqlite3.connect(path) as conn:
+        return conn.execute("SELECT expires_at FROM documents WHERE id = ?", (document_id,)).fetchone()[0]
+
+
+def test_ids_are_content_addressed():
+    store = DocumentStore()
+    resume_id = store.put("Jane Doe\nPython", 'resume')
+    assert resume_id.startswith('res_')
+    assert store.put("Jane Doe\nPython", 'resume') == resume_id
+    assert store.put("Jane Doe\nPython", 'job_description').startswith('jd_')
+    assert store.get(resume_id) == "Jane Doe\nPython"
+    assert store.stats()['documents'] == 2
+
+
+def test_documents_expire_after_the_ttl():
+    store = DocumentStore(ttl=0.05)
+    document_id = store.put("Jane Doe")
+    time.sleep(0.06)
+    assert store.get(document_id) is None
+    assert store.stats() == {'documents': 0, 'raw_bytes': 0, 'stored_bytes': 0, 'evictions': 0}
+
+
+def test_reading_a_document_extends_its_ttl():
+    store = DocumentStore(ttl=0.2)
+    document_id = store.put("Jane Doe")
+    time.sleep(0.12)
+    assert store.get(document_id) == "Jane Doe"
+    time.sleep(0.12)
+    assert store.get(document_id) == "Jane Doe"
+
+
+def test_least_recently_used_documents_are_evicted_over_the_byte_budget():
+    texts = [random_text(seed, 4000) for seed in range(3)]
+    # Room for two of the documents, not three
+    budget = int(2.5 * len(zlib.compress(texts[0].encode('utf-8'), 6)))
+    store = DocumentStore(max_bytes=budget)
+    ids = [store.put(text) for text in texts[:2]]
+    assert store.get(ids[0]) == texts[0]
+    ids.append(store.put(texts[2]))
+
+    # The second document was the least recently used
+    assert store.get(ids[1]) is None
+    assert store.get(ids[0]) == texts[0] and store.get(ids[2]) == texts[2]
+    stats = store.stats()
+    assert stats['evictions'] == 1 and stats['stored_bytes'] <= budget
+    assert stats['raw_bytes'] == 8000
+
+
+def test_a_document_larger_than_the_whole_store_is_refused():
+    store = DocumentStore(max_bytes=1000)
+    kept = store.put("Jane Doe")
+    with pytest.raises(DocumentTooLarge):
+        store.put(random_text(0, 5000))
+    assert store.get(kept) == "Jane Doe"
+    assert store.stats()['documents'] == 1
+    # Repetitive text is judged by its compressed size
+    assert store.get(store.put("a" * 50000)) == "a" * 50000
+
+
+def test_other_workers_resolve_ids_through_the_shared_file(tmp_path):
+    path = str(tmp_path / 'documents.sqlite3')
+    document_id = DocumentStore(sqlite_path=path).put("Jane Doe\nPython")
+    other = DocumentStore(sqlite_path=path)
+    assert other.get(document_id) == "Jane Doe\nPython"
+    assert other.get('res_missing') is None
+
+
+def test_reads_only_extend_the_shared_expiry_once_half_the_ttl_is_left(tmp_path):
+    path = str(tmp_path / 'documents.sqlite3')
+    store = DocumentStore(ttl=0.4, sqlite_path=path)
+    document_id = store.put("Jane Doe")
+    stored_expiry = shared_expiry(path, document_id)
+
+    for _ in range(5):
+        assert store.get(document_id) == "Jane Doe"
+    assert shared_expiry(path, document_id) == stored_expiry
+
+    time.sleep(0.25)
+    assert store.get(document_id) == "Jane Doe"
+    extended = shared_expiry(path, document_id)
+    assert extended > stored_expiry + 0.2
+    # Just extended, so the next reads leave the file alone again
+    assert store.get(document_id) == "Jane Doe"
+    assert shared_expiry(path, document_id) == extended
+
+    # The same holds for a worker that found the document in the file
+    other = DocumentStore(ttl=0.4, sqlite_path=path)
+    assert other.get(document_id) == "Jane Doe"
+    assert shared_expiry(path, document_id) == extended
+
+
+def test_resolve_prefers_inline_text_and_checks_types():
+    store = DocumentStore()
+    document_id = store.put("Stored resume")
+    assert store.resolve({'resume_text': 'Inline', 'resume_id': document_id}, 'resume_text', 'resume_id') == 'Inline'
+    assert store.resolve({'resume_id': document_id}, 'resume_text', 'resume_id') == 'Stored resume'
+    assert store.resolve({}, 'resume_text', 'resume_id') is None
+
+    with pytest.raises(DocumentNotFound) as error:
+        store.resolve({'resume_id': 'res_unknown'}, 'resume_text', 'resume_id')
+    assert error.value.document_id == 'res_unknown'
+    for body in ([], {'resume_text': 5}, {'resume_id': ['x']}):
+        with pytest.raises(InvalidRequest):
+            store.resolve(body, 'resume_text', 'resume_id')
@@ -0,0 +1,188 @@
+import io
+import struct
+import zipfile
+
+import pytest
+from PyPDF2 import PdfReader
+
+from export import HELVETICA, ExportError, TrueTypeFont, load_pdf_fonts, render_docx, render_pdf
+
+# Glyph ids in the test font: 0 .notdef, then one glyph per mapped character. 'É' is a
+# composite of 'E' and an accent glyph that no character maps to; 'Q' is never used.
+CHARACTERS = ' AEQ'
+ACCENT, E_ACUTE = 5, 6
+
+
+def simple_glyph(size):
+    """A one-contour triangle; the size makes each glyph's bytes distinct."""
+    return struct.pack('>hhhhhHHBBBhhhhhh', 1, 0, 0, size, size, 2, 0, 1, 1, 1, 0, size, -size, 0, 0, size)
+
+
+def composite_glyph(*components):
+    """A composite glyph: the second component carries a scale, so its record is longer."""
+    data = bytearray(struct.pack('>hhhhh', -1, 0, 0, 600, 800))
+    for index, glyph in enumerate(components):
+        more = 0x0020 if index < len(components) - 1 else 0
+        scale = 0x0008 if index else 0
+        data += struct.pack('>HHhh', 0x0001 | 0x0002 | more | scale, glyph, 0, 100 * index)
+        if scale:
+            data += struct.pack('>h', 0x3000)
+    return bytes(data)
+
+
+def cmap_table(glyphs):
+    """A (3, 1) cmap with a format 4 subtable mapping each character to its glyph id."""
+    codes = sorted(glyphs, key=ord)
+    ends = starts = [ord(c) for c in codes] + [0xffff]
+    deltas = [(glyphs[c] - ord(c)) & 0xffff for c in codes] + [1]
+    segments = len(ends)
+    subtable = struct.pack('>HHHHHHH', 4, 16 + 8 * segments, 0, 2 * segments, 0, 0, 0)
+    subtable += struct.pack('>%dH' % segments, *ends) + b'\0\0' + struct.pack('>%dH' % segments, *starts)
+    subtable += struct.pack('>%dH' % segments, *deltas) + b'\0\0' * segments
+    return struct.pack('>HHHHI', 0, 1, 3, 1, 12) + subtable
+
+
+def build_font(fs_type=None):
+    """A minimal TrueType file with short loca offsets, as most fonts ship."""
+    glyphs = [simple_glyph(100 + 10 * index) for index in range(ACCENT + 1)] + [composite_glyph(3, ACCENT)]
+    glyphs[1] = b''  # space has no outline
+    glyf, loca = bytearray(), []
+    for data in glyphs:
+        loca.append(len(glyf) // 2)
+        glyf += data + b'\0' * (-len(data) % 4)
+    loca.append(len(glyf) // 2)
+
+    count = len(glyphs)
+    head = struct.pack('>IIIIHH16xhhhhHHhhh', 0x00010000, 0x00010000, 0x12345678, 0x5F0F3CF5, 0, 1000,
+                       0, -200, 600, 800, 0, 8, 2, 0, 0)
+    hhea = struct.pack('>Ihhh' + 'H' + 'h' * 6 + '8x' + 'hH', 0x00010000, 800, -200, 0, 600, 0, 0, 600, 1, 0, 0, 0, count - 1)
+    # The last glyph repeats the final advance, as hmtx allows
+    hmtx = b''.join(struct.pack('>Hh', 250 if index == 1 else 500 + index, 0) for index in range(count - 1)) + struct.pack('>h', 0)
+    tables = {
+        b'head': head,
+        b'hhea': hhea,
+        b'maxp': struct.pack('>IH', 0x00005000, count),
+        b'hmtx': hmtx,
+        b'cmap': cmap_table({**{char: index + 1 for index, char in enumerate(CHARACTERS)}, 'É': E_ACUTE}),
+        b'loca': struct.pack('>%dH' % len(loca), *loca),
+        b'glyf': bytes(glyf),
+    }
+    if fs_type is not None:
+        tables[b'OS/2'] = struct.pack('>HhHHH', 0, 500, 400, 5, fs_type)
+
+    tags = sorted(tables)
+    out, body = bytearray(struct.pack('>IHHHH', 0x00010000, len(tags), 0, 0, 0)), bytearray()
+    for tag in tags:
+        out += struct.pack('>4sIII', tag, 0, 12 + 16 * len(tags) + len(body), len(tables[tag]))
+        body += tables[tag] + b'\0' * (-len(tables[tag]) % 4)
+    return bytes(out + body), glyphs
+
+
+def read_tables(data):
+    """Returns {tag: bytes} of a font file, checking each table's checksum."""
+    tables = {}
+    for index in range(struct.unpack_from('>H', data, 4)[0]):
+        tag, checksum, offset, length = struct.unpack_from('>4sIII', data, 12 + 16 * index)
+        padded = data[offset:offset + length + (-length % 4)]
+        assert sum(struct.unpack('>%dI' % (len(padded) // 4), padded)) & 0xffffffff == checksum
+        tables[tag] = data[offset:offset + length]
+    return tables
+
+
+@pytest.fixture
+def font_path(tmp_path):
+    path = tmp_path / 'TestSans.ttf'
+    path.write_bytes(build_font()[0])
+    return str(path)
+
+
+def pdf_text(pdf):
+    return ''.join(page.extract_text() for page in PdfReader(io.BytesIO(pdf)).pages)
+
+
+# --- TrueType subsetting ---
+
+def test_font_metrics_and_cmap_are_read(font_path):
+    font = TrueTypeFont(font_path)
+    assert font.name == 'TestSans' and font.units_per_em == 1000
+    assert font.glyphs == {' ': 1, 'A': 2, 'E': 3, 'Q': 4, 'É': E_ACUTE}
+    assert font.advances[1] == 250 and font.advances[E_ACUTE] == font.advances[E_ACUTE - 1]
+    assert font.missing('AZ') == {'Z'}
+
+
+def test_subset_keeps_used_and_component_glyphs_only(font_path):
+    _, glyphs = build_font()
+    subset = read_tables(TrueTypeFont(font_path)._subset({2, E_ACUTE}))
+
+    assert b'cmap' not in subset
+    head = subset[b'head']
+    assert head[8:12] == b'\0\0\0\0' and struct.unpack_from('>h', head, 50)[0] == 1
+    loca = struct.unpack('>%dI' % (len(glyphs) + 1), subset[b'loca'])
+    kept = {glyph: subset[b'glyf'][loca[glyph]:loca[glyph + 1]] for glyph in range(len(glyphs)) if loca[glyph] != loca[glyph + 1]}
+
+    # .notdef, the used glyphs and both components of the composite, byte for byte
+    assert set(kept) == {0, 2, 3, ACCENT, E_ACUTE}
+    for glyph, data in kept.items():
+        assert data == glyphs[glyph] + b'\0' * (-len(glyphs[glyph]) % 4)
+
+
+def test_embedded_font_text_is_extractable(font_path):
+    fonts = load_pdf_fonts(font_path)
+    pdf = render_pdf("# AE É\n\nQA", title='Résumé', fonts=fonts)
+    assert b'/FontFile2' in pdf and b'/ToUnicode' in pdf
+    assert pdf_text(pdf).split() == ['AE', 'É', 'QA']
+    assert render_pdf("# AE É\n\nQA", title='Résumé', fonts=fonts) == pdf
+
+    with pytest.raises(ExportError) as error:
+        render_pdf("AZ", fonts=fonts)
+    assert 'Z (U+005A)' in str(error.value) and 'PDF_FONT' not in str(error.value)
+
+
+def test_fonts_that_cannot_be_embedded_fall_back_to_helvetica(tmp_path):
+    path = tmp_path / 'Restricted.ttf'
+    path.write_bytes(build_font(fs_type=0x0002)[0])
+    with pytest.raises(ValueError):
+        TrueTypeFont(str(path))
+    assert load_pdf_fonts(str(path)) is HELVETICA
+    assert load_pdf_fonts(str(tmp_path / 'missing.ttf')) is HELVETICA
+    assert load_pdf_fonts(None) is HELVETICA
+
+
+# --- Rendering ---
+
+MARKDOWN = "# Jane Doe\n\n**EXPERIENCE**\n- Built the **billing** platform\n- Cut costs by 30% & more\n\nThanks — Jane"
+
+
+def test_pdf_has_a_text_layer():
+    pdf = render_pdf(MARKDOWN, title='Jane Doe')
+    text = pdf_text(pdf)
+    for phrase in ('Jane Doe', 'EXPERIENCE', 'Built the billing platform', 'Cut costs by 30% & more', 'Thanks — Jane'):
+        assert phrase in text
+    assert PdfReader(io.BytesIO(pdf)).metadata.title == 'Jane Doe'
+    # Identical input renders identical bytes, so exports can be cached by content
+    assert render_pdf(MARKDOWN, title='Jane Doe') == pdf
+
+
+def test_long_documents_flow_onto_more_pages():
+    pdf = render_pdf('\n'.join(f"- Shipped release {index}" for index in range(200)))
+    assert len(PdfReader(io.BytesIO(pdf)).pages) > 1
+    assert 'Shipped release 199' in pdf_text(pdf)
+
+
+def test_characters_helvetica_cannot_set_are_refused():
+    with pytest.raises(ExportError) as error:
+        render_pdf("Jane Doe 张伟")
+    message = str(error.value)
+    assert '张 (U+5F20)' in message and 'DOCX' in message and 'PDF_FONT' in message
+    assert error.value.status == 422
+
+
+def test_docx_has_headings_bullets_and_bold_runs():
+    docx = render_docx(MARKDOWN + "\n\n张伟")
+    with zipfile.ZipFile(io.BytesIO(docx)) as archive:
+        assert {'[Content_Types].xml', 'word/document.xml', 'word/numbering.xml'} <= set(archive.namelist())
+        document = archive.read('word/document.xml').decode('utf-8')
+    assert document.count('<w:numId w:val="1"/>') == 2
+    assert '<w:b/><w:sz w:val="21"/></w:rPr><w:t xml:space="preserve">billing</w:t>' in document
+    assert '30% &amp; more' in document and '张伟' in document
+    assert render_docx(MARKDOWN) == render_docx(MARKDOWN)
@@ -0,0 +1,320 @@
+import io
+import os
+import time
+import zlib
+import zipfile
+import threading
+
+import pytest
+
+from export import render_docx, render_pdf
+from extraction import (
+    DocxExtractor, ExtractionCache, ExtractionError, ExtractionService, PdfExtractor, content_hash, read_upload,
+    sniff_document_type,
+)
+
+RESUME_MARKDOWN = "# Jane Doe\n\n**EXPERIENCE**\n" + "\n".join(f"- Shipped release {index}" for index in range(400))
+
+
+class CountingExtractor:
+    """Stands in for PdfExtractor: returns canned text and counts how often it was asked."""
+
+    max_bytes = 1024
+
+    def __init__(self, text):
+        self.text = text
+        self.calls = 0
+
+    def extract(self, data):
+        self.calls += 1
+        return self.text
+
+
+# --- ExtractionCache ---
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ExtractionCache(max_entries=2)
+    cache.put('a', 'first')
+    cache.put('b', 'second')
+    assert cache.get('a') == 'first'
+    cache.put('c', 'third')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 'first' and cache.get('c') == 'third'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_memory_tier_is_bounded_by_utf8_bytes():
+    cache = ExtractionCache(max_entries=100, max_bytes=10)
+    cache.put('a', 'é' * 4)
+    cache.put('b', 'xx')
+    assert cache.stats()['bytes'] == 10
+    cache.put('c', 'y')
+    assert cache.get('a') is None
+    assert cache.stats()['bytes'] == 3
+
+    # A text larger than the whole tier is not kept in memory at all
+    cache.put('d', 'z' * 11)
+    assert cache.get('d') is None
+    assert cache.get('b') == 'xx' and cache.get('c') == 'y'
+
+
+def test_replacing_a_key_does_not_count_its_size_twice():
+    cache = ExtractionCache(max_bytes=10)
+    for _ in range(5):
+        cache.put('a', 'x' * 8)
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes'], stats['evictions']) == (1, 8, 0)
+
+
+def test_disk_tier_is_shared_between_instances(tmp_path):
+    key = content_hash(b'%PDF-1.4 resume')
+    ExtractionCache(disk_dir=str(tmp_path)).put(key, 'Jane Doe\nPython\n')
+    assert os.path.exists(tmp_path / key[:2] / f"{key}.txt")
+    assert not [name for name in os.listdir(tmp_path / key[:2]) if name.endswith('.tmp')]
+
+    other = ExtractionCache(disk_dir=str(tmp_path))
+    assert other.get(key) == 'Jane Doe\nPython\n'
+    # Promoted into memory: the second read does not touch the disk
+    assert other.get(key) == 'Jane Doe\nPython\n'
+    assert other.get('0' * 64) is None
+    stats = other.stats()
+    assert (stats['disk_hits'], stats['hits'], stats['misses']) == (1, 1, 1)
+    assert stats['hit_rate'] == 2 / 3
+
+
+# --- PdfExtractor ---
+
+def slow_pdf(operations):
+    """A one-page PDF whose single content stream takes PyPDF2 seconds to extract."""
+    stream = zlib.compress(b'BT /F1 12 Tf ' + b'(abcdefgh) Tj 0 -1 Td ' * operations + b'ET')
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Resources << /Font << /F1 4 0 R >> >> /Contents 5 0 R >>',
+        b'<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>',
+        b'<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream' % (len(stream), stream),
+    ]
+    pdf, offsets = bytearray(b'%PDF-1.4\n'), []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(pdf)
+    pdf += b'xref\n0 6\n0000000000 65535 f \n' + b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    pdf += b'trailer\n<< /Size 6 /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % xref
+    return bytes(pdf)
+
+
+@pytest.fixture(scope='module')
+def resume_pdf():
+    return render_pdf(RESUME_MARKDOWN)
+
+
+@pytest.fixture(scope='module')
+def readers():
+    extractor = PdfExtractor(max_pages=20, timeout=20, parallel_min_pages=4, max_workers=2)
+    extractor.start()
+    return extractor
+
+
+def test_reader_processes_match_in_process_extraction(readers, resume_pdf):
+    expected = PdfExtractor(max_workers=0).extract(resume_pdf)
+    assert "Jane Doe" in expected and "Shipped release 399" in expected
+    # Over parallel_min_pages, so the pages are split across both readers
+    assert readers.extract(resume_pdf) == expected
+    small = render_pdf("# Jane Doe\n\nPython")
+    assert readers.extract(small) == PdfExtractor(max_workers=0).extract(small)
+
+
+def test_limits_are_enforced_with_and_without_reader_processes(readers, resume_pdf):
+    for extractor in (PdfExtractor(max_pages=2, max_workers=0), PdfExtractor(max_pages=2, max_workers=1)):
+        with pytest.raises(ExtractionError) as error:
+            extractor.extract(resume_pdf)
+        assert error.value.status == 413 and 'pages' in str(error.value)
+
+    # Too many bytes is refused before a reader process is started for it
+    extractor = PdfExtractor(max_bytes=len(resume_pdf) - 1)
+    with pytest.raises(ExtractionError) as error:
+        extractor.extract(resume_pdf)
+    assert error.value.status == 413 and extractor._pid is None
+
+    # A PDF that cannot be parsed gives no text, and its reader goes on serving others
+    assert readers.extract(b'%PDF-1.4 not really a pdf') is None
+    assert readers.extract(resume_pdf) is not None
+
+
+def test_a_pdf_over_the_timeout_is_killed_without_affecting_other_documents(resume_pdf):
+    extractor = PdfExtractor(timeout=2, max_workers=2)
+    extractor.start()
+    errors, texts = [], []
+
+    def read_slow():
+        try:
+            extractor.extract(slow_pdf(300000))
+        except ExtractionError as e:
+            errors.append(e)
+
+    started = time.monotonic()
+    slow = threading.Thread(target=read_slow)
+    slow.start()
+    texts.append(extractor.extract(resume_pdf))
+    slow.join(10)
+
+    assert time.monotonic() - started < 5
+    assert len(errors) == 1 and 'longer than 2 seconds' in str(errors[0])
+    assert "Shipped release 399" in texts[0]
+    # The killed reader is replaced on the next upload
+    assert "Jane Doe" in extractor.extract(resume_pdf)
+
+
+# --- DocxExtractor ---
+
+def build_docx(body):
+    """A zip holding only word/document.xml, with the given body XML."""
+    document = (
+        '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main" '
+        'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006">'
+        f'<w:body>{body}</w:body></w:document>'
+    )
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('word/document.xml', document)
+    return buffer.getvalue()
+
+
+def paragraph(text, style=None, level=None, bold=False):
+    properties = ''
+    if style:
+        properties += f'<w:pStyle w:val="{style}"/>'
+    if level is not None:
+        properties += f'<w:numPr><w:ilvl w:val="{level}"/><w:numId w:val="1"/></w:numPr>'
+    run_properties = '<w:rPr><w:b/></w:rPr>' if bold else ''
+    return f'<w:p><w:pPr>{properties}</w:pPr><w:r>{run_properties}<w:t>{text}</w:t></w:r></w:p>'
+
+
+def test_docx_exports_read_back_as_the_same_markdown():
+    markdown = "# Jane Doe\n\n**EXPERIENCE**\n- Built the **billing** platform\n\nThanks, Jane"
+    text = DocxExtractor().extract(render_docx(markdown))
+    # The export's heading is bold text, so it reads back as a bold line
+    assert text == "**Jane Doe**\n**EXPERIENCE**\n- Built the billing platform\nThanks, Jane\n"
+
+
+def test_docx_headings_lists_and_tables():
+    body = (
+        paragraph('Jane Doe', style='Title')
+        + paragraph('Skills', style='Heading1')
+        + paragraph('Python', level=0) + paragraph('Flask', level=1)
+        + paragraph('Mostly bold but long enough to be a sentence rather than a heading line', bold=True)
+        + '<w:tbl><w:tr><w:tc>' + paragraph('Acme', bold=True) + '</w:tc><w:tc>' + paragraph('2020', level=0)
+        + paragraph('2022') + '</w:tc></w:tr><w:tr><w:tc>' + paragraph(' ') + '</w:tc></w:tr></w:tbl>'
+    )
+    assert DocxExtractor().extract(build_docx(body)).splitlines() == [
+        '**Jane Doe**',
+        '**Skills**',
+        '- Python',
+        '  - Flask',
+        'Mostly bold but long enough to be a sentence rather than a heading line',
+        'Acme | 2020 2022',
+    ]
+
+
+def test_text_boxes_are_read_once():
+    text_box = (
+        '<w:p><w:r><mc:AlternateContent><mc:Choice Requires="wps"><w:txbxContent>' + paragraph('Contact me')
+        + '</w:txbxContent></mc:Choice><mc:Fallback><w:txbxContent>' + paragraph('Contact me')
+        + '</w:txbxContent></mc:Fallback></mc:AlternateContent></w:r></w:p>'
+    )
+    assert DocxExtractor().extract(build_docx(paragraph('Jane Doe') + text_box)) == "Jane Doe\nContact me\n"
+
+
+def test_docx_limits():
+    data = build_docx(paragraph('Jane Doe'))
+    with pytest.raises(ExtractionError) as error:
+        DocxExtractor(max_bytes=len(data) - 1).extract(data)
+    assert error.value.status == 413
+
+    # A few KB that inflate to megabytes of markup: refused by what was decompressed, not the upload size
+    bomb = build_docx(paragraph('Jane Doe') * 200000)
+    assert len(bomb) < 64 * 1024
+    with pytest.raises(ExtractionError) as error:
+        DocxExtractor(max_xml_bytes=1024 * 1024).extract(bomb)
+    assert error.value.status == 413 and 'text and markup' in str(error.value)
+
+
+def test_zips_that_are_not_word_documents():
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('xl/workbook.xml', '<workbook/>')
+    with pytest.raises(ExtractionError) as error:
+        DocxExtractor().extract(buffer.getvalue())
+    assert error.value.status == 400
+    assert DocxExtractor().extract(b'PK\x03\x04 truncated') is None
+    assert DocxExtractor().extract(build_docx('<w:p>unclosed')) is None
+
+
+# --- ExtractionService ---
+
+def test_the_same_bytes_are_only_parsed_once():
+    extractor = CountingExtractor('Jane Doe\n')
+    service = ExtractionService(ExtractionCache(), pdf_extractor=extractor)
+    for _ in range(3):
+        assert service.extract('pdf', b'%PDF-1.4 resume') == 'Jane Doe\n'
+    assert extractor.calls == 1
+
+    service.extract('pdf', b'%PDF-1.4 another resume')
+    assert extractor.calls == 2
+
+
+def test_failed_extractions_are_not_cached():
+    extractor = CountingExtractor(None)
+    service = ExtractionService(ExtractionCache(), pdf_extractor=extractor)
+    assert service.extract('pdf', b'%PDF-1.4 broken') is None
+    assert service.extract('pdf', b'%PDF-1.4 broken') is None
+    assert extractor.calls == 2
+
+
+# --- Upload intake ---
+
+class CountingStream(io.BytesIO):
+    """An upload buffer that records how many bytes were read from it."""
+
+    def __init__(self, data):
+        super().__init__(data)
+        self.read_bytes = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.read_bytes += len(data)
+        return data
+
+
+def test_types_are_sniffed_from_the_leading_bytes():
+    assert sniff_document_type(b'%PDF-1.7\n') == 'pdf'
+    # Readers accept a PDF header after some junk, as long as it is in the first 1 KB
+    assert sniff_document_type(b'\0' * 1000 + b'%PDF-1.4') == 'pdf'
+    assert sniff_document_type(b'\0' * 1024 + b'%PDF-1.4') is None
+    assert sniff_document_type(b'PK\x03\x04rest of a zip') == 'docx'
+    assert sniff_document_type(b'resume.pdf') is None
+    assert sniff_document_type(b'') is None
+
+
+def test_uploads_are_read_whole_once_accepted():
+    data = b'%PDF-1.4\n' + b'x' * 5000
+    stream = CountingStream(data)
+    stream.read(10)
+    assert read_upload(stream, max_bytes=len(data)) == ('pdf', data)
+
+
+def test_oversized_uploads_are_refused_without_reading_them():
+    stream = CountingStream(b'%PDF-1.4\n' + b'x' * 5000)
+    with pytest.raises(ExtractionError) as error:
+        read_upload(stream, max_bytes=1024)
+    assert error.value.status == 413 and stream.read_bytes == 0
+
+
+def test_unsupported_types_are_refused_after_the_sniff():
+    for data, allowed in ((b'Jane Doe, Python developer' * 100, ('pdf', 'docx')), (b'PK\x03\x04' + b'x' * 5000, ('pdf',))):
+        stream = CountingStream(data)
+        with pytest.raises(ExtractionError) as error:
+            read_upload(stream, max_bytes=10 * 1024, allowed=allowed)
+        assert error.value.status == 400 and stream.read_bytes == 1024
@@ -0,0 +1,285 @@
+import time
+import threading
+
+import httpx
+import pytest
+
+import governance
+from governance import (CircuitBreaker, DeadlineExceeded, PriorityLimiter, UpstreamGovernor, UpstreamUnavailable,
+                        upstream_deadline)
+
+
+class FakeAPIError(Exception):
+    """Stands in for google.genai's APIError: the governor only looks at .code."""
+
+    def __init__(self, code):
+        super().__init__(f"{code} from upstream")
+        self.code = code
+
+
+def flaky_stream(failures, chunks=('a', 'b', 'c')):
+    """Returns (open_stream, opened): each stream fails before its first chunk until `failures` run out."""
+    failures = list(failures)
+    opened = []
+
+    def open_stream():
+        opened.append(True)
+        error = failures.pop(0) if failures else None
+
+        def stream():
+            if error is not None:
+                raise error
+            yield from chunks
+        return stream()
+    return open_stream, opened
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """Records backoff sleeps instead of waiting them out."""
+    recorded = []
+    monkeypatch.setattr(governance.time, 'sleep', recorded.append)
+    return recorded
+
+
+# --- CircuitBreaker ---
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30)
+    for _ in range(2):
+        breaker.record_failure()
+    assert breaker.state() == 'closed'
+    assert breaker.before_call('model') is False
+
+    breaker.record_failure()
+    assert breaker.state() == 'open'
+    assert breaker.times_opened == 1
+    with pytest.raises(UpstreamUnavailable) as error:
+        breaker.before_call('model')
+    assert 1 <= error.value.retry_after <= 30
+
+
+def test_breaker_success_resets_the_failure_count():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state() == 'closed'
+
+
+def test_breaker_lets_one_probe_through_when_half_open():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.state() == 'half_open'
+
+    assert breaker.before_call('model') is True
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call('model')
+
+    breaker.record_success()
+    assert breaker.state() == 'closed'
+    assert breaker.before_call('model') is False
+
+
+def test_failed_probe_reopens_the_breaker():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.before_call('model') is True
+
+    breaker.record_failure()
+    assert breaker.state() == 'open'
+    assert breaker.times_opened == 2
+    with pytest.raises(UpstreamUnavailable):
+        breaker.before_call('model')
+
+
+def test_released_probe_lets_another_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+    assert breaker.before_call('model') is True
+    breaker.release_probe()
+    assert breaker.before_call('model') is True
+
+
+# --- PriorityLimiter ---
+
+def test_limiter_serves_waiters_by_priority_then_arrival():
+    # 5 requests per second and a burst of one: each waiter gets the next token, 0.2 s apart
+    limiter = PriorityLimiter(300, burst_seconds=0.1, max_wait=5)
+    limiter.acquire(5)
+    order = []
+
+    def wait(priority, label):
+        limiter.acquire(priority)
+        order.append(label)
+
+    threads = []
+    for priority, label in ((9, 'batch'), (5, 'normal-1'), (0, 'interactive'), (5, 'normal-2')):
+        thread = threading.Thread(target=wait, args=(priority, label))
+        thread.start()
+        threads.append(thread)
+        # Arrival order within a priority is what breaks ties
+        while limiter.waiting() < len(threads):
+            time.sleep(0.001)
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ['interactive', 'normal-1', 'normal-2', 'batch']
+    assert limiter.waiting() == 0
+
+
+def test_limiter_gives_up_after_max_wait():
+    limiter = PriorityLimiter(6, burst_seconds=1, max_wait=0.1)
+    limiter.acquire(5)
+
+    started = time.monotonic()
+    with pytest.raises(UpstreamUnavailable) as error:
+        limiter.acquire(5)
+    assert 0.1 <= time.monotonic() - started < 1
+    assert error.value.retry_after >= 1
+    assert limiter.waiting() == 0
+
+
+def test_limiter_allows_a_burst_without_waiting():
+    limiter = PriorityLimiter(600, burst_seconds=1, max_wait=0.01)
+    for _ in range(10):
+        limiter.acquire(5)
+    with pytest.raises(UpstreamUnavailable):
+        limiter.acquire(5)
+
+
+# --- UpstreamGovernor ---
+
+def test_stream_retries_rate_limits_and_overload_before_the_first_chunk(sleeps):
+    governor = UpstreamGovernor(rate_limits={}, retries=2, backoff_base=0.01, backoff_max=1)
+    open_stream, opened = flaky_stream([FakeAPIError(429), FakeAPIError(503)])
+
+    assert list(governor.stream('model', 'task', open_stream)) == ['a', 'b', 'c']
+    assert len(opened) == 3
+    assert governor.retried == 2
+    # Full jitter: each wait is at most base * 2^attempt
+    assert len(sleeps) == 2
+    assert all(0 <= delay <= 0.01 * 2 ** attempt for attempt, delay in enumerate(sleeps))
+    assert governor.stats()['models']['model']['circuit'] == 'closed'
+
+
+def test_stream_gives_up_after_the_retry_budget(sleeps):
+    governor = UpstreamGovernor(rate_limits={}, retries=2, backoff_base=0.01, failure_threshold=10)
+    open_stream, opened = flaky_stream([FakeAPIError(503)] * 5)
+
+    with pytest.raises(UpstreamUnavailable) as error:
+        list(governor.stream('model', 'task', open_stream))
+    assert isinstance(error.value.__cause__, FakeAPIError)
+    assert len(opened) == 3
+    assert len(sleeps) == 2
+
+
+def test_stream_does_not_retry_once_output_has_started(sleeps):
+    governor = UpstreamGovernor(rate_limits={}, retries=2, backoff_base=0.01)
+    opened = []
+
+    def open_stream():
+        opened.append(True)
+
+        def stream():
+            yield 'a'
+            raise FakeAPIError(503)
+        return stream()
+
+    received = []
+    with pytest.raises(FakeAPIError):
+        for chunk in governor.stream('model', 'task', open_stream):
+            received.append(chunk)
+    assert received == ['a']
+    assert len(opened) == 1
+    assert sleeps == []
+
+
+def test_client_errors_are_not_retried(sleeps):
+    governor = UpstreamGovernor(rate_limits={}, retries=2, failure_threshold=1)
+    open_stream, opened = flaky_stream([FakeAPIError(400)])
+
+    with pytest.raises(FakeAPIError):
+        list(governor.stream('model', 'task', open_stream))
+    assert len(opened) == 1
+    # A bad request says nothing about upstream health
+    assert governor.stats()['models']['model']['circuit'] == 'closed'
+
+
+def test_errors_from_our_own_code_are_not_retried(sleeps):
+    governor = UpstreamGovernor(rate_limits={}, retries=2, failure_threshold=1)
+    open_stream, opened = flaky_stream([ValueError('bad prompt')])
+    calls = []
+
+    def fn():
+        calls.append(True)
+        raise KeyError('text')
+
+    with pytest.raises(ValueError):
+        list(governor.stream('model', 'task', open_stream))
+    with pytest.raises(KeyError):
+        governor.call('model', 'task', fn)
+    assert len(opened) == 1 and len(calls) == 1
+    assert sleeps == []
+    assert governor.stats()['models']['model']['circuit'] == 'closed'
+
+
+def test_deadline_while_opening_the_probe_stream_releases_the_probe():
+    governor = UpstreamGovernor(rate_limits={}, retries=0, failure_threshold=1, reset_timeout=0.05)
+    with pytest.raises(UpstreamUnavailable):
+        list(governor.stream('model', 'task', flaky_stream([FakeAPIError(503)])[0]))
+    time.sleep(0.06)
+
+    def open_stream():
+        raise DeadlineExceeded('too late')
+
+    with pytest.raises(DeadlineExceeded):
+        list(governor.stream('model', 'task', open_stream))
+    # The next request gets to be the probe instead of finding the circuit stuck half open
+    assert list(governor.stream('model', 'task', flaky_stream([])[0])) == ['a', 'b', 'c']
+    assert governor.stats()['models']['model']['circuit'] == 'closed'
+
+
+def test_open_circuit_fails_fast_without_calling_upstream(sleeps):
+    governor = UpstreamGovernor(rate_limits={}, retries=0, failure_threshold=2, reset_timeout=30)
+    calls = []
+
+    def fail():
+        calls.append(True)
+        raise FakeAPIError(503)
+
+    for _ in range(2):
+        with pytest.raises(UpstreamUnavailable):
+            governor.call('model', 'task', fail)
+    assert governor.stats()['models']['model']['circuit'] == 'open'
+
+    with pytest.raises(UpstreamUnavailable) as error:
+        governor.call('model', 'task', fail)
+    assert len(calls) == 2
+    assert error.value.retry_after >= 1
+
+
+def test_call_retries_transient_failures(sleeps):
+    governor = UpstreamGovernor(rate_limits={}, retries=3, backoff_base=0.01)
+    errors = [FakeAPIError(429), ConnectionError('reset'), httpx.ReadTimeout('timed out')]
+
+    def fn():
+        if errors:
+            raise errors.pop(0)
+        return 'ok'
+
+    assert governor.call('model', 'task', fn) == 'ok'
+    assert governor.retried == 3
+
+
+def test_no_request_is_started_after_the_deadline(sleeps):
+    governor = UpstreamGovernor(rate_limits={})
+    calls = []
+
+    with upstream_deadline(time.monotonic() - 1):
+        with pytest.raises(DeadlineExceeded):
+            governor.call('model', 'task', lambda: calls.append(True))
+    assert calls == []
@@ -0,0 +1,197 @@
+import json
+import time
+import sqlite3
+import threading
+
+import pytest
+
+import jobs
+from governance import remaining_time
+from jobs import JobQueue, QueueFull
+
+
+@pytest.fixture(autouse=True)
+def fast_watchdog(monkeypatch):
+    monkeypatch.setattr(jobs, 'WATCHDOG_INTERVAL', 0.02)
+
+
+def wait_until_finished(job_queue, job, timeout=5):
+    with job_queue.changed:
+        assert job_queue.changed.wait_for(lambda: job.status in jobs.FINISHED, timeout=timeout)
+    return job
+
+
+def wait_until_stored(job_queue, job, timeout=5):
+    """Waits for the shared file to show the job finished, as another worker would see it."""
+    deadline = time.monotonic() + timeout
+    while True:
+        stored = job_queue._load(job.id)
+        if stored is not None and stored.status in jobs.FINISHED:
+            return stored
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def frames(events):
+    """Parses SSE frames into (event, data) pairs."""
+    parsed = []
+    for frame in events:
+        event, data = frame.strip().split('\n')
+        parsed.append((event[len('event: '):], json.loads(data[len('data: '):])))
+    return parsed
+
+
+def write_chunks(*chunks):
+    def run(job):
+        for text in chunks:
+            job.emit(text)
+        return {'text': ''.join(job.output)}
+    return run
+
+
+def test_jobs_run_in_the_background_and_keep_their_result():
+    job_queue = JobQueue(max_workers=2)
+    job, created = job_queue.submit('rewrite', write_chunks('a', 'b'))
+    assert created
+
+    wait_until_finished(job_queue, job)
+    assert job.snapshot()['status'] == 'succeeded'
+    assert job.snapshot()['result'] == {'text': 'ab'}
+    assert job_queue.get(job.id) is job
+    assert frames(job_queue.events(job)) == [('chunk', {'text': 'a'}), ('chunk', {'text': 'b'}),
+                                             ('done', job.snapshot())]
+
+
+def test_same_dedupe_key_reattaches_to_the_existing_job():
+    job_queue = JobQueue(max_workers=1)
+    release = threading.Event()
+    calls = []
+
+    def run(job):
+        calls.append(True)
+        release.wait(5)
+        return 'done'
+
+    first, created = job_queue.submit('rewrite', run, dedupe_key='key')
+    second, reattached = job_queue.submit('rewrite', run, dedupe_key='key')
+    assert created and not reattached and second is first
+    release.set()
+    wait_until_finished(job_queue, first)
+
+    # A finished result is still shared; other keys get their own job
+    assert job_queue.submit('rewrite', run, dedupe_key='key') == (first, False)
+    other, created = job_queue.submit('rewrite', run, dedupe_key='other')
+    assert created and other is not first
+    wait_until_finished(job_queue, other)
+    assert len(calls) == 2
+
+
+def test_failed_jobs_are_retried_on_resubmission():
+    job_queue = JobQueue(max_workers=1)
+
+    def fail(job):
+        raise ValueError('bad input')
+
+    first, _ = job_queue.submit('rewrite', fail, dedupe_key='key')
+    wait_until_finished(job_queue, first)
+    assert (first.status, first.error) == ('failed', 'bad input')
+
+    second, created = job_queue.submit('rewrite', write_chunks('ok'), dedupe_key='key')
+    assert created and second is not first
+    assert wait_until_finished(job_queue, second).status == 'succeeded'
+
+
+def test_watchdog_times_out_a_stuck_job_and_replaces_its_worker():
+    job_queue = JobQueue(max_workers=1)
+    stuck = threading.Event()
+    budgets = []
+
+    def hang(job):
+        budgets.append(remaining_time())
+        stuck.wait(5)
+        return 'too late'
+
+    started = time.monotonic()
+    job, _ = job_queue.submit('rewrite', hang, timeout=0.2)
+    wait_until_finished(job_queue, job)
+    assert job.status == 'timed_out'
+    assert job.error == job.timeout_message()
+    assert time.monotonic() - started < 1
+    # Gemini requests made by the job are bounded by the time it has left
+    assert 0 < budgets[0] <= 0.2
+
+    # The only worker is still stuck, but the replacement serves the next job
+    follow_up, _ = job_queue.submit('rewrite', write_chunks('x'))
+    assert wait_until_finished(job_queue, follow_up).status == 'succeeded'
+
+    # When the stuck body finally returns, its late result is discarded
+    stuck.set()
+    time.sleep(0.05)
+    assert job.status == 'timed_out' and job.result is None
+    assert job_queue.stats()['timed_out'] == 1
+
+
+def test_emitting_after_a_timeout_stops_the_job():
+    job_queue = JobQueue(max_workers=1)
+    emitted = threading.Event()
+
+    def slow(job):
+        job.emit('first')
+        time.sleep(0.3)
+        emitted.set()
+        job.emit('second')
+
+    job, _ = job_queue.submit('rewrite', slow, timeout=0.1)
+    wait_until_finished(job_queue, job)
+    assert emitted.wait(5)
+    time.sleep(0.05)
+    assert job.output == ['first']
+
+
+def test_queue_full():
+    job_queue = JobQueue(max_workers=1, max_queued=1)
+    release = threading.Event()
+    job_queue.submit('rewrite', lambda job: release.wait(5))
+    while job_queue.stats()['running'] == 0:
+        time.sleep(0.01)
+    job_queue.submit('rewrite', lambda job: None)
+    with pytest.raises(QueueFull):
+        job_queue.submit('rewrite', lambda job: None)
+    release.set()
+
+
+def test_expired_results_are_hidden_then_pruned(tmp_path):
+    job_queue = JobQueue(max_workers=1, result_ttl=0.5, sqlite_path=str(tmp_path / 'jobs.sqlite3'))
+    job, _ = job_queue.submit('rewrite', write_chunks('a'), dedupe_key='key')
+    wait_until_stored(job_queue, wait_until_finished(job_queue, job))
+    time.sleep(0.5)
+
+    assert job_queue.get(job.id) is None
+    again, created = job_queue.submit('rewrite', write_chunks('b'), dedupe_key='key')
+    assert created and again is not job
+    wait_until_stored(job_queue, wait_until_finished(job_queue, again))
+
+    job_queue._prune()
+    assert job.id not in job_queue._jobs
+    with sqlite3.connect(str(tmp_path / 'jobs.sqlite3')) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM jobs WHERE id = ?", (job.id,)).fetchone()[0] == 0
+        assert conn.execute("SELECT COUNT(*) FROM job_chunks WHERE job_id = ?", (job.id,)).fetchone()[0] == 0
+
+
+def test_other_workers_follow_a_job_through_the_shared_file(tmp_path):
+    path = str(tmp_path / 'jobs.sqlite3')
+    owner, other = JobQueue(max_workers=1, sqlite_path=path), JobQueue(max_workers=1, sqlite_path=path)
+    chunks = [f"chunk {index} " for index in range(50)]
+    job, _ = owner.submit('rewrite', write_chunks(*chunks))
+    wait_until_stored(other, wait_until_finished(owner, job))
+
+    stored = other.get(job.id)
+    assert stored.snapshot() == job.snapshot()
+    events = frames(other.events(stored))
+    assert [data['text'] for event, data in events if event == 'chunk'] == chunks
+    assert events[-1] == ('done', job.snapshot())
+
+    with sqlite3.connect(path) as conn:
+        # Each chunk is written once, however many times the job was published
+        assert conn.execute("SELECT COUNT(*) FROM job_chunks WHERE job_id = ?", (job.id,)).fetchone()[0] == len(chunks)
+    assert other.get('missing') is None
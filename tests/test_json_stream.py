@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+from json_stream import JsonFieldParser
+
+RESPONSE = {
+    'ats_score': 78,
+    'strengths': '<ul><li>Quoted "keywords", {braces} and [brackets]</li></ul>',
+    'path\\"key': 'escaped \\ backslash',
+    'sections': [{'name': 'Experience', 'scores': [1, 2.5, -3e2]}, {'name': 'Skills, tools', 'scores': []}],
+    'details': {'nested': {'deep': [True, False, None]}, 'empty': {}},
+    'passed': True,
+    'notes': None,
+    'unicode': 'café — 東京 ✓',
+}
+
+
+def feed_in_chunks(text, size):
+    parser = JsonFieldParser()
+    fields = []
+    for start in range(0, len(text), size):
+        fields.extend(parser.feed(text[start:start + size]))
+    return parser, fields
+
+
+@pytest.mark.parametrize('indent', [None, 2])
+def test_every_chunking_yields_each_field_once_in_order(indent):
+    text = json.dumps(RESPONSE, indent=indent, ensure_ascii=False)
+    for size in range(1, len(text) + 1):
+        parser, fields = feed_in_chunks(text, size)
+        assert fields == list(RESPONSE.items()), size
+        assert parser.fields == RESPONSE
+        assert parser.result() == RESPONSE
+
+
+def test_field_is_returned_as_soon_as_its_value_is_complete():
+    parser = JsonFieldParser()
+    assert parser.feed('{"ats_score": 7') == []
+    assert parser.feed('8, "strengths": "half') == [('ats_score', 78)]
+    assert parser.feed(' done"') == []
+    assert parser.feed('}') == [('strengths', 'half done')]
+
+
+def test_cut_off_response_keeps_completed_fields_but_result_raises():
+    parser, fields = feed_in_chunks('{"ats_score": 78, "strengths": "unfinished', 5)
+    assert fields == [('ats_score', 78)]
+    with pytest.raises(ValueError):
+        parser.result()
+
+
+def test_result_rejects_a_non_object():
+    parser = JsonFieldParser()
+    assert parser.feed('[1, 2, 3]') == []
+    with pytest.raises(ValueError):
+        parser.result()
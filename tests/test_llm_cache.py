@@ -0,0 +1,123 @@
+import time
+import threading
+
+import pytest
+
+from llm import ResponseCache, SingleFlight
+
+
+# --- ResponseCache ---
+
+def test_entries_expire_after_the_ttl():
+    cache = ResponseCache(ttl=0.05)
+    cache.put('key', 'answer')
+    assert cache.get('key') == 'answer'
+    time.sleep(0.06)
+    assert cache.get('key') is None
+    assert cache.stats()['entries'] == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = ResponseCache(max_entries=2)
+    cache.put('a', '1')
+    cache.put('b', '2')
+    assert cache.get('a') == '1'
+    cache.put('c', '3')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == '1' and cache.get('c') == '3'
+    assert cache.stats()['evictions'] == 1
+
+
+def test_sqlite_tier_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / 'llm_cache.sqlite3')
+    ResponseCache(sqlite_path=path).put('key', 'answer')
+
+    other = ResponseCache(sqlite_path=path)
+    assert other.get('key') == 'answer'
+    assert other.stats()['entries'] == 1
+    assert other.get('missing') is None
+
+
+def test_expired_sqlite_rows_are_not_served(tmp_path):
+    path = str(tmp_path / 'llm_cache.sqlite3')
+    ResponseCache(ttl=0.05, sqlite_path=path).put('key', 'answer')
+    time.sleep(0.06)
+    assert ResponseCache(sqlite_path=path).get('key') is None
+
+
+def test_an_unusable_sqlite_file_degrades_to_memory_only(tmp_path):
+    path = str(tmp_path / 'llm_cache.sqlite3')
+    cache = ResponseCache(sqlite_path=path)
+    (tmp_path / 'llm_cache.sqlite3').write_bytes(b'not a database' * 100)
+
+    cache.put('key', 'answer')
+    assert cache.get('key') == 'answer'
+    assert cache.get('missing') is None
+
+
+# --- SingleFlight ---
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    release = threading.Event()
+    calls, results = [], []
+
+    def slow():
+        calls.append(True)
+        release.wait(5)
+        return 'answer'
+
+    threads = [threading.Thread(target=lambda: results.append(flight.do('key', slow))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while flight.coalesced < 7:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert calls == [True]
+    assert results == ['answer'] * 8
+
+
+def test_waiting_callers_receive_the_leaders_exception():
+    flight = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def failing():
+        release.wait(5)
+        raise ValueError('upstream said no')
+
+    def call():
+        try:
+            flight.do('key', failing)
+        except ValueError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    while not flight._calls:
+        time.sleep(0.001)
+    followers = [threading.Thread(target=call) for _ in range(3)]
+    for thread in followers:
+        thread.start()
+    while flight.coalesced < 3:
+        time.sleep(0.001)
+    release.set()
+    for thread in [leader, *followers]:
+        thread.join(5)
+
+    assert len(errors) == 4 and len({id(e) for e in errors}) == 1
+
+
+def test_a_finished_key_runs_again():
+    flight = SingleFlight()
+    assert flight.do('key', lambda: 1) == 1
+    assert flight.do('key', lambda: 2) == 2
+    with pytest.raises(KeyError):
+        flight.do('key', lambda: {}['missing'])
+    assert flight.do('key', lambda: 3) == 3
+    assert flight.coalesced == 0
@@ -0,0 +1,83 @@
+from local_ats import classify_header, detect_sections, score_resume, tfidf_similarity
+
+STRONG_RESUME = """Jane Doe
+jane@example.com | +1 415 555 0100 | linkedin.com/in/janedoe | github.com/janedoe
+
+**SUMMARY**
+Backend engineer building payment systems in Python and PostgreSQL.
+
+EXPERIENCE
+- Led a team of 4 engineers rebuilding the billing platform
+- Reduced checkout latency by 45% with Redis caching
+- Built Kafka pipelines processing 2 million events per day
+- Migrated 30 services to Kubernetes on AWS
+- Designed the Flask API used by 12 partner teams
+
+Education:
+BSc Computer Science, 2015
+
+Skills
+Python, Flask, PostgreSQL, Redis, Kafka, Kubernetes, AWS, Docker, Terraform
+"""
+
+WEAK_RESUME = """John Smith
+I worked at a company.
+I did some things there.
+"""
+
+JOB_DESCRIPTION = """Senior Backend Engineer
+We need Python, Flask and PostgreSQL experience. Kafka and Kubernetes on AWS are a plus.
+Experience with Terraform and Go is preferred.
+"""
+
+
+def test_headers_are_recognized_in_any_common_form():
+    assert classify_header("**WORK EXPERIENCE**") == 'experience'
+    assert classify_header("Technical Skills:") == 'skills'
+    assert classify_header("Education") == 'education'
+    assert classify_header("Led a team of four engineers on the billing platform") is None
+    assert detect_sections("Skills and Certifications\n") == {'skills', 'certifications'}
+
+
+def test_scorecard_has_the_gemini_fields_and_adds_up():
+    result = score_resume(STRONG_RESUME, JOB_DESCRIPTION)
+    assert {'ats_score', 'strengths', 'improvements', 'overall_assessment'} <= set(result)
+    assert result['mode'] == 'local'
+    assert result['ats_score'] == sum(result['breakdown'].values())
+    assert result['strengths'].startswith('<ul><li>') and result['improvements'].endswith('</li></ul>')
+
+
+def test_structure_contact_verbs_and_metrics_are_scored():
+    breakdown = score_resume(STRONG_RESUME, JOB_DESCRIPTION)['breakdown']
+    # All three required sections, plus a summary as the one optional section
+    assert breakdown['sections'] == 20 + round(2.5)
+    assert breakdown['contact'] == 15
+    assert breakdown['action_verbs'] == 15
+    assert breakdown['quantified_achievements'] == 15
+
+    weak = score_resume(WEAK_RESUME)
+    assert weak['breakdown']['sections'] == 0 and weak['breakdown']['contact'] == 0
+    assert weak['ats_score'] < 25
+    assert 'Add a clearly labelled Experience section header' in weak['improvements']
+
+
+def test_keywords_from_the_job_description_are_matched_and_missing_ones_listed():
+    result = score_resume(STRONG_RESUME, JOB_DESCRIPTION)
+    assert {'python', 'flask', 'postgresql', 'kafka', 'kubernetes', 'aws', 'terraform'} <= set(result['matched_keywords'])
+    assert 'go' in result['missing_keywords']
+    assert 0 < result['keyword_similarity'] <= 1
+    # A resume with the JD's skills outscores the same resume without them
+    assert score_resume(WEAK_RESUME, JOB_DESCRIPTION)['breakdown']['keywords'] < result['breakdown']['keywords']
+
+
+def test_score_is_deterministic_and_bounded():
+    assert score_resume(STRONG_RESUME, JOB_DESCRIPTION) == score_resume(STRONG_RESUME, JOB_DESCRIPTION)
+    for text in ('', '\n\n', 'x', STRONG_RESUME * 20):
+        assert 0 <= score_resume(text)['ats_score'] <= 100
+        assert 0 <= score_resume(text, JOB_DESCRIPTION)['ats_score'] <= 100
+
+
+def test_similarity_of_unrelated_or_empty_texts():
+    assert tfidf_similarity('', JOB_DESCRIPTION) == (0.0, [], [])
+    similarity, matched, _ = tfidf_similarity('Watercolor painting and pottery', JOB_DESCRIPTION)
+    assert similarity == 0.0 and matched == []
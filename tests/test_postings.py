@@ -0,0 +1,129 @@
+import math
+import heapq
+import random
+from collections import Counter
+
+import pytest
+
+from local_ats import tokenize
+from postings import PostingIndex
+
+VOCABULARY = ['python', 'flask', 'django', 'sql', 'postgres', 'aws', 'docker', 'kubernetes', 'react', 'typescript',
+              'java', 'spring', 'kafka', 'spark', 'airflow', 'terraform', 'golang', 'redis', 'graphql', 'linux',
+              'backend', 'frontend', 'senior', 'engineer', 'platform', 'data', 'machine', 'learning', 'team', 'remote']
+
+
+def random_postings(rng, count, prefix='p'):
+    postings = []
+    for index in range(count):
+        # A skewed draw gives a few very common terms and many rare ones, like real postings
+        words = [VOCABULARY[min(int(rng.expovariate(0.15)), len(VOCABULARY) - 1)] for _ in range(rng.randint(1, 60))]
+        postings.append({'id': f"{prefix}{index}", 'title': rng.choice(VOCABULARY), 'text': ' '.join(words)})
+    return postings
+
+
+def exhaustive_scores(postings, query_text, k1=1.2, b=0.75, max_query_terms=64):
+    """Reference BM25: scores every live posting against the query, with no index and no pruning."""
+    live = {}
+    for posting in postings:
+        live[posting['id']] = Counter(tokenize(f"{posting.get('title', '')}\n{posting['text']}"))
+    lengths = {posting_id: sum(counts.values()) for posting_id, counts in live.items()}
+    average = sum(lengths.values()) / len(live)
+    doc_freq = Counter(term for counts in live.values() for term in counts)
+
+    def idf(term):
+        return math.log(1 + max(0, len(live) - doc_freq[term] + 0.5) / (doc_freq[term] + 0.5))
+
+    query = Counter(tokenize(query_text))
+    weights = {term: (1 + math.log(count)) * idf(term) for term, count in query.items() if term in doc_freq}
+    terms = heapq.nlargest(max_query_terms, weights, key=weights.__getitem__)
+    scores = {}
+    for posting_id, counts in live.items():
+        score = 0.0
+        for term in terms:
+            tf = counts.get(term)
+            if tf:
+                score += (1 + math.log(query[term])) * idf(term) * tf * (k1 + 1) / (
+                    tf + k1 * (1 - b + b * lengths[posting_id] / average))
+        if score > 0:
+            scores[posting_id] = score
+    return scores
+
+
+def assert_top_k(matches, scores, top_k):
+    expected = sorted(scores.values(), reverse=True)[:top_k]
+    assert [match['score'] for match in matches] == pytest.approx(expected, abs=1e-3)
+    for match in matches:
+        # Ties may come back in either order, but every result must carry its true score
+        assert match['score'] == pytest.approx(scores[match['id']], abs=1e-3)
+    assert len({match['id'] for match in matches}) == len(matches)
+    assert [match['rank'] for match in matches] == list(range(1, len(matches) + 1))
+
+
+@pytest.mark.parametrize('seed', range(6))
+def test_search_matches_an_exhaustive_scan(seed):
+    rng = random.Random(seed)
+    postings = random_postings(rng, rng.choice([50, 300, 1500]))
+    index = PostingIndex()
+    index.add(postings)
+
+    for _ in range(10):
+        query = ' '.join(rng.choice(VOCABULARY) for _ in range(rng.randint(1, 40)))
+        top_k = rng.choice([1, 3, 10, 50])
+        assert_top_k(index.search(query, top_k), exhaustive_scores(postings, query), top_k)
+
+
+def test_replaced_postings_are_scored_from_their_new_text():
+    rng = random.Random(11)
+    postings = random_postings(rng, 400)
+    index = PostingIndex()
+    index.add(postings)
+    # Re-sent ids replace the earlier postings
+    replacements = random_postings(random.Random(12), 150)
+    index.add(replacements)
+    current = {posting['id']: posting for posting in postings}
+    current.update((posting['id'], posting) for posting in replacements)
+
+    assert index.stats()['postings'] == 400
+    for query in ('python flask sql', 'kafka spark airflow remote senior', 'team'):
+        assert_top_k(index.search(query, 10), exhaustive_scores(list(current.values()), query), 10)
+
+
+def test_long_queries_keep_their_most_distinctive_terms():
+    rng = random.Random(5)
+    postings = random_postings(rng, 500)
+    index = PostingIndex(max_query_terms=4)
+    index.add(postings)
+    query = ' '.join(VOCABULARY)
+    assert_top_k(index.search(query, 10), exhaustive_scores(postings, query, max_query_terms=4), 10)
+
+
+def test_matches_carry_metadata_and_shared_keywords():
+    index = PostingIndex()
+    ids = index.add([
+        {'text': 'Python and Flask backend role', 'title': 'Backend Engineer', 'company': 'Acme', 'url': 'https://x'},
+        {'text': 'Java Spring role', 'title': 'Java Engineer'},
+    ])
+    assert ids[0].startswith('post_')
+    # Ids derive from the content, so sending a posting again replaces it
+    assert index.add([{'text': 'Python and Flask backend role', 'title': 'Backend Engineer', 'company': 'Acme'}]) == ids[:1]
+    assert index.stats()['postings'] == 2
+
+    matches = index.search('Senior Python developer, Flask', 5)
+    assert [match['id'] for match in matches] == ids[:1]
+    assert matches[0]['company'] == 'Acme' and matches[0]['url'] == ''
+    assert set(matches[0]['matched_keywords']) == {'python', 'flask'}
+    assert index.get(ids[1])['text'] == 'Java Spring role'
+    assert index.search('nothing shared here', 5) == []
+
+
+def test_workers_sharing_a_file_search_the_same_corpus(tmp_path):
+    path = str(tmp_path / 'postings.jsonl')
+    first, second = PostingIndex(path=path), PostingIndex(path=path)
+    postings = random_postings(random.Random(3), 200)
+    first.add(postings[:120])
+    second.add(postings[120:])
+
+    query = 'python sql docker kubernetes'
+    assert first.search(query, 10) == second.search(query, 10)
+    assert_top_k(first.search(query, 10), exhaustive_scores(postings, query), 10)
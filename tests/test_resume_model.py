@@ -0,0 +1,75 @@
+from resume_model import parse_resume, split_entries, split_skills
+
+RESUME = """**Jane Doe**
+jane@example.com | +1 415 555 0100 | linkedin.com/in/janedoe
+
+SUMMARY
+Backend engineer building payment systems.
+
+EXPERIENCE
+Acme Corp | Senior Engineer
+Jan 2020 - Present
+- Led the billing rebuild
+- Cut latency by 45%
+Globex
+Software Engineer, 2016 - 2019
+- Built Kafka pipelines
+
+Education
+BSc Computer Science, 2012 - 2016
+
+Skills
+Languages: Python, Go; SQL
+- Python | Flask
+VOLUNTEERING
+Code club mentor
+"""
+
+
+def test_contact_details_come_from_the_header():
+    contact = parse_resume(RESUME).contact
+    assert contact == {
+        'name': 'Jane Doe',
+        'email': 'jane@example.com',
+        'phone': '+1 415 555 0100',
+        'linkedin': 'linkedin.com/in/janedoe',
+        'website': None,
+    }
+
+
+def test_experience_is_split_into_entries_with_dates_and_bullets():
+    model = parse_resume(RESUME)
+    assert model.summary == 'Backend engineer building payment systems.'
+    assert model.experience == [
+        {'heading': 'Acme Corp | Senior Engineer | Jan 2020 - Present', 'dates': 'Jan 2020 - Present',
+         'bullets': ['Led the billing rebuild', 'Cut latency by 45%']},
+        {'heading': 'Globex | Software Engineer, 2016 - 2019', 'dates': '2016 - 2019',
+         'bullets': ['Built Kafka pipelines']},
+    ]
+    assert model.education[0]['dates'] == '2012 - 2016'
+
+
+def test_a_second_date_range_starts_a_new_entry():
+    entries = split_entries(['Acme Corp, 2020 - 2022', 'Globex, 2018 - 2020', 'Platform team'])
+    assert [entry['heading'] for entry in entries] == ['Acme Corp, 2020 - 2022', 'Globex, 2018 - 2020 | Platform team']
+
+
+def test_skills_drop_categories_and_duplicates():
+    assert parse_resume(RESUME).skills == ['Python', 'Go', 'SQL', 'Flask']
+    assert split_skills(['**Tools:** Docker • Terraform.', 'docker']) == ['Docker', 'Terraform']
+
+
+def test_unknown_headers_and_repeated_sections():
+    text = RESUME + "\nExperience\nInitech\n- Wrote the first API\n"
+    model = parse_resume(text)
+    assert model.sections['volunteering'] == 'Code club mentor'
+    # A header repeated further down is merged into the first
+    assert [entry['heading'] for entry in model.experience][-1] == 'Initech'
+    assert set(model.sections) == {'summary', 'experience', 'education', 'skills', 'volunteering'}
+
+
+def test_empty_text_gives_an_empty_model():
+    assert parse_resume('').to_dict() == {
+        'contact': {'name': None, 'email': None, 'phone': None, 'linkedin': None, 'website': None},
+        'summary': '', 'experience': [], 'education': [], 'skills': [], 'sections': {},
+    }
@@ -0,0 +1,28 @@
+import httpx
+
+from governance import DeadlineExceeded, UpstreamUnavailable
+from routing import should_fall_back
+
+
+class FakeAPIError(Exception):
+    def __init__(self, code):
+        super().__init__(f"{code} from upstream")
+        self.code = code
+
+
+def test_overload_quota_outage_and_unknown_model_fall_back():
+    for code in (404, 429, 500, 502, 503, 504):
+        assert should_fall_back(FakeAPIError(code))
+
+
+def test_network_failures_and_a_governed_model_fall_back():
+    assert should_fall_back(httpx.ConnectError('refused'))
+    assert should_fall_back(httpx.ReadTimeout('timed out'))
+    assert should_fall_back(ConnectionResetError('reset'))
+    assert should_fall_back(UpstreamUnavailable('circuit open', 30))
+
+
+def test_bad_requests_bugs_and_deadlines_do_not_fall_back():
+    for error in (FakeAPIError(400), FakeAPIError(403), ValueError('bad config'), KeyError('text'),
+                  AttributeError('candidates'), DeadlineExceeded('too late')):
+        assert not should_fall_back(error)
@@ -0,0 +1,92 @@
+import random
+
+from skills import SkillMatcher, load_taxonomy, normalize
+
+TAXONOMY = {
+    'Languages': {
+        'Java': [],
+        'JavaScript': ['js', 'ecmascript'],
+        'C++': ['cpp'],
+        'Go': ['golang'],
+    },
+    'Data': {
+        'SQL': [],
+        'MySQL': [],
+        'PostgreSQL': ['postgres'],
+    },
+    'Web': {
+        'Node.js': ['node', 'nodejs'],
+        'Machine Learning': ['ml'],
+    },
+}
+
+
+def scan(taxonomy, text):
+    """Reference extractor: tries every pattern at every position, then keeps leftmost-longest matches."""
+    text = normalize(text)
+    patterns = {}
+    for skills in taxonomy.values():
+        for skill, aliases in skills.items():
+            for pattern in {normalize(skill), *(normalize(alias) for alias in aliases)}:
+                patterns[pattern] = skill
+
+    def boundary(index):
+        return index < 0 or index >= len(text) or not text[index].isalnum()
+
+    matches = []
+    for start in range(len(text)):
+        for pattern, skill in patterns.items():
+            end = start + len(pattern)
+            if text.startswith(pattern, start) and boundary(start - 1) and boundary(end):
+                matches.append((start, -len(pattern), skill))
+    found, covered_until = {}, 0
+    for start, negative_length, skill in sorted(matches):
+        if start >= covered_until:
+            covered_until = start - negative_length
+            found[skill] = found.get(skill, 0) + 1
+    return found
+
+
+def test_aliases_case_and_counts():
+    matcher = SkillMatcher(TAXONOMY)
+    found = matcher.extract("Golang and GO services; postgres, PostgreSQL and ML.\nMachine\n  learning too")
+    assert found == {'Go': 2, 'PostgreSQL': 2, 'Machine Learning': 2}
+
+
+def test_whole_words_only():
+    matcher = SkillMatcher(TAXONOMY)
+    # "java" inside "javascript" and "sql" inside "mysql" are not separate skills
+    assert matcher.extract("JavaScript, MySQL") == {'JavaScript': 1, 'MySQL': 1}
+    assert matcher.extract("gopher, nosql, javanese") == {}
+
+
+def test_longest_match_wins_over_its_parts():
+    matcher = SkillMatcher(TAXONOMY)
+    assert matcher.extract("Node.js and C++ (cpp)") == {'Node.js': 1, 'C++': 2}
+
+
+def test_matches_an_exhaustive_scan_on_random_text():
+    matcher = SkillMatcher(TAXONOMY)
+    words = ['java', 'javascript', 'js', 'c++', 'go', 'golang', 'sql', 'mysql', 'node', 'node.js', 'nodejs',
+             'machine', 'learning', 'ml', 'postgres', 'the', 'x', '.', ',', '-', '/', 'cpp', 'ecma', 'script']
+    rng = random.Random(7)
+    for _ in range(300):
+        text = ''.join(rng.choice(words) + rng.choice([' ', '', '\n', ', ', '.']) for _ in range(rng.randint(0, 30)))
+        assert matcher.extract(text) == scan(TAXONOMY, text), text
+
+
+def test_default_taxonomy_matches_an_exhaustive_scan():
+    taxonomy = load_taxonomy()
+    matcher = SkillMatcher(taxonomy)
+    text = ("Senior engineer: Python, JavaScript (ES6), TypeScript and C++; React, Node.js, Django. "
+            "PostgreSQL / MySQL / SQL, AWS, Docker, Kubernetes, Terraform, CI/CD; machine learning with PyTorch.")
+    found = matcher.extract(text)
+    assert found == scan(taxonomy, text)
+    assert {'Python', 'JavaScript', 'C++'} <= set(found)
+
+
+def test_skill_gap_and_grouping():
+    matcher = SkillMatcher(TAXONOMY)
+    gap = matcher.skill_gap("Java, SQL and Node.js", "I write SQL and Go")
+    assert gap == {'matched': ['SQL'], 'missing': ['Java', 'Node.js'], 'additional': ['Go']}
+    assert matcher.group_by_category(['SQL', 'Java', 'Rust']) == {'Data': ['SQL'], 'Languages': ['Java'], 'Other': ['Rust']}
@@ -0,0 +1,66 @@
+import time
+import threading
+
+from sse import sse_event, with_heartbeat
+
+
+def test_closing_the_stream_stops_and_closes_the_producer():
+    produced = []
+    closed = threading.Event()
+
+    def events():
+        try:
+            for index in range(1000):
+                produced.append(index)
+                time.sleep(0.01)
+                yield sse_event('chunk', {'index': index})
+        finally:
+            closed.set()
+
+    stream = with_heartbeat(events(), interval=5, buffer=2)
+    next(stream)
+    next(stream)
+    stream.close()
+
+    assert closed.wait(2)
+    count = len(produced)
+    time.sleep(0.1)
+    assert len(produced) == count < 10
+
+
+def test_slow_consumer_bounds_the_frames_read_ahead():
+    produced = []
+
+    def events():
+        for index in range(100):
+            produced.append(index)
+            yield sse_event('chunk', {'index': index})
+
+    stream = with_heartbeat(events(), interval=5, buffer=4)
+    next(stream)
+    time.sleep(0.2)
+    # The queue holds `buffer` frames and the producer waits on one more
+    assert len(produced) <= 7
+    assert sum(1 for _ in stream) == 99
+
+
+def test_heartbeat_while_producer_is_blocked():
+    release = threading.Event()
+
+    def events():
+        release.wait(2)
+        yield sse_event('done', {})
+
+    stream = with_heartbeat(events(), interval=0.05)
+    assert next(stream) == ": keep-alive\n\n"
+    release.set()
+    assert list(stream)[-1].startswith('event: done')
+
+
+def test_producer_error_becomes_an_error_event():
+    def events():
+        yield sse_event('chunk', {'text': 'a'})
+        raise RuntimeError('boom')
+
+    frames = list(with_heartbeat(events(), interval=5))
+    assert frames[-1] == sse_event('error', {'error': 'boom'})
@@ -0,0 +1,87 @@
+from flask import Blueprint, current_app, request, jsonify
+from werkzeug.utils import secure_filename
+from extraction import content_hash
+from documents import DocumentNotFound, ID_PREFIXES, json_object
+from resume_model import parse_resume
+from export import EXPORT_FORMATS, render_document
+from services import document_store, export_cache, pdf_fonts, resume_from_upload
+
+# --- Upload + Document Routes ---
+# Resume uploads for each tool, server-side documents referenced by id, and downloads of
+# generated documents.
+
+bp = Blueprint('upload', __name__)
+
+@bp.route('/upload_resume_for_ats', methods=['POST'])
+def upload_resume_for_ats():
+    """Handles resume upload for ATS analysis only."""
+    if 'resume' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    resume_text = resume_from_upload(request.files['resume'])
+    return jsonify({'original_resume': resume_text, 'resume_id': document_store.put(resume_text, 'resume')})
+
+@bp.route('/upload_resume_for_cover_letter', methods=['POST'])
+def upload_resume_for_cover_letter():
+    """Handles resume upload for cover letter generation only."""
+    if 'resume' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    resume_text = resume_from_upload(request.files['resume'])
+    return jsonify({'resume_text': resume_text, 'resume_id': document_store.put(resume_text, 'resume')})
+
+@bp.route('/upload_resume_for_skill_gap', methods=['POST'])
+def upload_resume_for_skill_gap():
+    """Handles resume upload for skill gap analysis only."""
+    if 'resume' not in request.files:
+        return jsonify({'error': 'No file uploaded'}), 400
+
+    resume_text = resume_from_upload(request.files['resume'])
+    return jsonify({'resume_text': resume_text, 'resume_id': document_store.put(resume_text, 'resume')})
+
+@bp.route('/documents', methods=['POST'])
+def store_document():
+    """Stores a job description (or other text) server-side and returns an id to use in later calls."""
+    body = json_object(request.get_json(silent=True))
+    text = body.get('text')
+    kind = body.get('kind', 'job_description')
+
+    if not isinstance(text, str) or not text.strip():
+        return jsonify({'error': 'Missing text in JSON body'}), 400
+    if kind not in ID_PREFIXES:
+        return jsonify({'error': f"Invalid kind. Use one of: {', '.join(ID_PREFIXES)}."}), 400
+
+    return jsonify({'document_id': document_store.put(text, kind), 'kind': kind})
+
+@bp.route('/documents/<document_id>/structure', methods=['GET'])
+def document_structure(document_id):
+    """Returns a stored resume segmented into contact details, summary, experience, education and skills."""
+    text = document_store.get(document_id)
+    if text is None:
+        raise DocumentNotFound(document_id)
+    return jsonify(parse_resume(text).to_dict())
+
+# --- EXPORT ROUTE ---
+
+@bp.route('/export', methods=['POST'])
+def export_document():
+    """Renders a generated resume or cover letter (Markdown) to a text-based PDF or DOCX download.
+
+    Rendered files are cached by the hash of their content, so repeat downloads skip rendering.
+    """
+    body = json_object(request.get_json(silent=True))
+    markdown = document_store.resolve(body, 'markdown', 'document_id')
+    export_format = body.get('format', 'pdf')
+
+    if not markdown or not markdown.strip():
+        return jsonify({'error': 'Missing document content to export'}), 400
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}."}), 400
+
+    filename = secure_filename(body.get('filename') or '') or 'document'
+    key = content_hash(f"{export_format}\0{filename}\0{markdown}".encode('utf-8'))
+    data = export_cache.get_or_render(key, lambda: render_document(markdown, export_format, title=filename, fonts=pdf_fonts))
+
+    response = current_app.response_class(data, mimetype=EXPORT_FORMATS[export_format])
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}.{export_format}"'
+    return response